@@ -0,0 +1,57 @@
+"""
+Prompt evaluation with and without context reuse, against a local Ollama.
+
+    python -m benchmarks.chat_session [model]     (from the project root; default llama3.2)
+
+"resend" rebuilds the prompt from the system prompt and the whole history on
+every turn (the old way); "session" is a ChatSession (core/chat_session.py),
+which sends the system prompt once and afterwards only the new turn together
+with the context Ollama returned. Both report prompt_eval_count and latency per turn.
+"""
+import asyncio
+import logging
+import sys
+import time
+
+from config.ollama_settings import KEEP_ALIVE
+from core import ollama_client
+from core.chat_session import ChatSession, turn_metrics
+
+SYSTEM = "You are PEARL, a helpful assistant. " + " ".join(
+    f"Function {n}: does task number {n}." for n in range(150)
+)
+TURNS = ["Hi, who are you?", "What can you do?", "Tell me a short joke.", "Explain it.", "Thanks!"]
+
+
+async def measure(model: str, system: str = SYSTEM, turns=TURNS) -> dict:
+    """Per-turn metrics (see turn_metrics) for both ways: {"resend": [...], "session": [...]}."""
+    results = {"resend": [], "session": []}
+    history = []
+    for turn in turns:
+        history.append(f"User: {turn}")
+        started = time.monotonic()
+        response = await ollama_client.generate(model, system + "\n" + "\n".join(history), keep_alive=KEEP_ALIVE)
+        history.append(f"Assistant: {response.get('response', '').strip()}")
+        results["resend"].append(turn_metrics(response, started))
+
+    session = ChatSession(0, "benchmark", model, system)
+    for turn in turns:
+        await session.generate(turn)
+    results["session"] = list(session.metrics)
+    return results
+
+
+async def main(model: str):
+    try:
+        results = await measure(model)
+    finally:
+        await ollama_client.close_clients()
+    print(f"{'turn':>4} | {'resend tokens':>13} {'latency':>8} | {'session tokens':>14} {'latency':>8}")
+    for n, (before, after) in enumerate(zip(results["resend"], results["session"]), 1):
+        print(f"{n:>4} | {before['prompt_tokens']:>13} {before['latency']:>7.2f}s"
+              f" | {after['prompt_tokens']:>14} {after['latency']:>7.2f}s")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    asyncio.run(main(sys.argv[1] if len(sys.argv) > 1 else "llama3.2"))
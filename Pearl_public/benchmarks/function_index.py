@@ -0,0 +1,62 @@
+"""
+Routing prompt size with the full function catalog vs. top-k retrieval as modules grow.
+
+    python -m benchmarks.function_index [counts ...]     (from the project root; default 10 100 1000)
+
+Uses the offline hashing embedder, so no Ollama is needed. Token counts are
+estimated at 4 characters per token.
+"""
+import asyncio
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+
+from core.function_index import FunctionIndex, HashingEmbedder
+from core.modules_loader import FunctionRegistry
+
+VERBS = ["play", "pause", "search", "remind", "list", "create", "delete", "summarize", "analyze", "count"]
+NOUNS = ["song", "news", "task", "note", "weather", "stock", "email", "file", "timer", "number"]
+QUERY = "please play that song again"
+
+
+def write_modules(directory: str, count: int):
+    """Write `count` generated modules with one verb_noun function each."""
+    for n in range(count):
+        verb, noun = VERBS[n % len(VERBS)], NOUNS[(n // len(VERBS)) % len(NOUNS)]
+        with open(os.path.join(directory, f"generated_{n}.py"), "w") as f:
+            f.write(f'async def {verb}_{noun}_{n}(query: str):\n    """{verb.title()} a {noun}."""\n    return query\n')
+
+
+async def measure(count: int, query: str = QUERY) -> dict:
+    """Characters of the full catalog and of the top-k section, the search time and the best match."""
+    with tempfile.TemporaryDirectory() as directory:
+        write_modules(directory, count)
+        registry = FunctionRegistry(directory)
+        index = FunctionIndex(registry, HashingEmbedder())
+        await index.refresh()
+        started = time.perf_counter()
+        section = await index.relevant_functions(query, pinned=[])
+        elapsed = time.perf_counter() - started
+        return {
+            "modules": count,
+            "full_chars": len(json.dumps(registry.functions(), indent=2)),
+            "top_k_chars": len(section),
+            "search_seconds": elapsed,
+            "best": section.splitlines()[0],
+        }
+
+
+def main(counts=(10, 100, 1000)):
+    logging.getLogger().setLevel(logging.WARNING)
+    print(f"{'modules':>8} {'full catalog':>13} {'top-k':>8} {'search':>9}  best match")
+    for count in counts:
+        row = asyncio.run(measure(count))
+        print(f"{count:>8} {row['full_chars'] // 4:>7} tokens {row['top_k_chars'] // 4:>4} tok "
+              f"{row['search_seconds'] * 1000:>7.2f}ms  {row['best']}")
+
+
+if __name__ == "__main__":
+    main([int(count) for count in sys.argv[1:]] or (10, 100, 1000))
@@ -0,0 +1,21 @@
+# Configuration for the LLM response cache (core/llm_cache.py)
+
+CACHE_DATABASE = "llm_cache.db"
+
+# Responses kept in memory (least recently used are evicted first; SQLite keeps the rest)
+CACHE_MEMORY_ENTRIES = 256
+
+# Seconds a cached response stays valid, per call site; sites not listed are never cached
+CACHE_TTLS = {
+    "startup_greeting": 6 * 3600,
+    "daily_greeting": 12 * 3600,
+    "summarize_page": 24 * 3600,
+    "research_analysis": 6 * 3600,
+    "sentiment_summary": 3600,
+}
+
+# Prompts mentioning any of these depend on the current time and always bypass the cache
+TIME_SENSITIVE_WORDS = (
+    "today", "tonight", "tomorrow", "yesterday", "now", "right now",
+    "current time", "current date", "this week", "what time",
+)
@@ -0,0 +1,49 @@
+# Configuration for the function job executor (core/function_executor.py)
+
+# Number of concurrent worker tasks executing commands
+EXECUTOR_WORKERS = 4
+# Workers of the separate background lane (memory compaction, model training),
+# so upkeep never takes a worker from user commands
+BACKGROUND_WORKERS = 1
+
+# Seconds a job may run before it is cancelled
+DEFAULT_JOB_TIMEOUT = 120
+FUNCTION_TIMEOUTS = {
+    "research.conduct_research": 600,
+    "internet_search.search_news": 300,
+    "machine_learning.build_model_from_internet_search": 1800,
+}
+
+# Extra attempts when a function raises (core/function_executor.py); timeouts,
+# unknown functions and missing or invalid arguments are not retried. Only
+# list functions that are safe to run twice (not a toggle like play_pause)
+FUNCTION_RETRIES = {
+    "spotify.pause": 1,
+    "spotify.resume": 1,
+    "spotify.get_current_track": 1,
+}
+RETRY_BACKOFF = 1.0  # Seconds before the first retry, doubled on each further attempt
+
+# Latency samples kept per function for latency_report()
+LATENCY_SAMPLES = 200
+
+# Offloading of blocking functions (core/offload.py)
+IO_THREADS = 8      # Thread pool for synchronous I/O (HTTP clients, subprocess waits, file access)
+CPU_PROCESSES = 2   # Process pool for CPU-heavy work (HTML parsing, model training)
+# Crawled pages shorter than this (characters) are parsed in the thread pool:
+# the parse is cheaper than the round trip to a worker process, and too short
+# to stall the event loop noticeably while it holds the GIL
+PARSE_IN_PROCESS_MIN_CHARS = 8 * 1024
+
+# Execution kind for synchronous functions without an @io_bound/@cpu_bound marker
+# ("io" runs in the thread pool, "cpu" in the process pool); unlisted ones default to "io"
+FUNCTION_EXECUTION = {}
+
+# Parameter that receives the raw user request when the caller did not pass it
+# (core/dispatch_table.py); a parameter named user_input always does
+USER_INPUT_PARAMETERS = {
+    "internet_search.search_news": "query",
+    "research.conduct_research": "topic",
+    "spotify.play_song": "query",
+    "machine_learning.build_model_from_internet_search": "user_request",
+}
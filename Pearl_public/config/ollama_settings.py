@@ -0,0 +1,98 @@
+# Configuration for the local Ollama server
+
+# None falls back to $OLLAMA_HOST, then http://localhost:11434
+OLLAMA_HOST = None
+
+# Backend pool (core/ollama_pool.py). Empty: every call goes to OLLAMA_HOST.
+# Without "models" a node serves whatever its health probe lists.
+OLLAMA_BACKENDS = [
+    # {"host": "http://localhost:11434", "models": ["llama3.2", "codellama:13b"], "weight": 1},
+    # {"host": "http://gpu-box:11434", "weight": 2},
+]
+HEALTH_CHECK_INTERVAL = 15  # Seconds between /api/tags probes
+HEALTH_CHECK_TIMEOUT = 2
+UNHEALTHY_AFTER = 2         # Consecutive failed requests before a node is taken out
+POOL_LATENCY_SAMPLES = 100  # Generation latencies kept per node and per model
+# Interactive generations still running after the model's p95 latency are sent to a second node
+HEDGE_INTERACTIVE = True
+HEDGE_MIN_SAMPLES = 20      # Latencies needed before hedging starts
+HEDGE_MIN_DELAY = 0.5       # Never hedge earlier than this (seconds)
+
+# Seconds to wait for a full generation (large models on CPU can be slow)
+REQUEST_TIMEOUT = 300
+CONNECT_TIMEOUT = 5
+
+# Connection pool shared by every LLM call in the process
+MAX_CONNECTIONS = 10
+MAX_KEEPALIVE_CONNECTIONS = 10
+KEEPALIVE_EXPIRY = 120
+
+# LLM scheduler (core/llm_scheduler.py): generations admitted at once, by priority
+MAX_GENERATIONS = 3          # Across all models
+INTERACTIVE_RESERVED = 1     # Slots only interactive replies may use
+DEFAULT_MODEL_CONCURRENCY = 2
+MODEL_CONCURRENCY = {"codellama:13b": 1}
+SCHEDULER_WAIT_SAMPLES = 200  # Queue waits kept per priority class
+SLOW_WAIT_SECONDS = 1.0       # Waits at least this long are logged
+
+# Context window requested for every generation (the same for all calls, so a
+# model is never reloaded just to change it); the token budgets below stay inside it
+NUM_CTX = 8192
+
+# How long Ollama keeps the interactive model loaded after a request
+KEEP_ALIVE = "30m"
+
+# Generation profiles (core/generation_profiles.py), referenced by name from
+# each call site. "model" and "keep_alive" pick the model and how long it stays
+# loaded; every other key is an Ollama option (num_ctx, num_predict = max output
+# tokens, temperature, stop, ...). Profiles sharing a model must use the same
+# num_ctx: Ollama reloads the model whenever the context size changes.
+GENERATION_PROFILES = {
+    "chat": {"model": "llama3.2", "keep_alive": KEEP_ALIVE, "num_ctx": NUM_CTX, "num_predict": 1024},
+    "router": {"model": "llama3.2", "keep_alive": KEEP_ALIVE, "num_ctx": NUM_CTX, "num_predict": 400,
+               "temperature": 0.2},
+    "greeting": {"model": "llama3.2", "keep_alive": KEEP_ALIVE, "num_ctx": NUM_CTX, "num_predict": 150,
+                 "temperature": 0.9},
+    "summarize_page": {"model": "llama3.2", "keep_alive": KEEP_ALIVE, "num_ctx": NUM_CTX, "num_predict": 250,
+                       "temperature": 0.3},
+    # Asked for ~150 words
+    "research_analysis": {"model": "llama3.2", "keep_alive": KEEP_ALIVE, "num_ctx": NUM_CTX, "num_predict": 350,
+                          "temperature": 0.4},
+    # Streamed parsers (core/early_stop.py) usually end it before num_predict
+    "codegen": {"model": "codellama:13b", "keep_alive": "10m", "num_ctx": 4096, "num_predict": 1024,
+                "temperature": 0.2, "stop": ["\nif __name__"]},
+    # deepseek-r1 (core/ollama_deepseek.py); its <think> block counts against num_predict
+    "reasoning": {"model": "deepseek-r1", "keep_alive": "10m", "num_ctx": NUM_CTX, "num_predict": 4096},
+}
+PROFILE_METRIC_SAMPLES = 200  # Measured generations kept per profile
+# Slowest output speed (tokens/s) of a healthy generation: a profile's adaptive
+# timeout never drops below its num_predict at this speed
+MIN_TOKENS_PER_SECOND = 5
+# Streamed <think> tokens after which a deepseek-r1 generation is stopped (None: no limit)
+THINK_BUDGET_TOKENS = 2048
+
+# Model residency (core/model_residency.py)
+PRELOAD_PROFILES = ["router"]  # Loaded in the background at startup, with the profile's num_ctx
+PINNED_MODELS = ["llama3.2"]   # Never unloaded to make room, and loaded again when Ollama dropped them
+# keep_alive forced on every request to a pinned model (e.g. -1: forever);
+# None keeps the keep_alive of each request's profile
+PIN_KEEP_ALIVE = None
+# Heavy models are only loaded when this much RAM (GB) is available; idle,
+# unpinned models are unloaded first to make room
+MODEL_MEMORY_GB = {"codellama:13b": 9.0}
+MEMORY_HEADROOM_GB = 1.0
+HEAVY_MODEL_WAIT = 120          # Seconds to wait for memory before giving up
+RESIDENCY_CHECK_INTERVAL = 300  # Re-load pinned models Ollama dropped (e.g. after a restart)
+LOAD_SECONDS_THRESHOLD = 0.5    # A load_duration above this counts as a model load
+
+# Per-chat sessions (core/chat_session.py) reuse the context Ollama returns;
+# once a session's context grows past this many tokens it starts over
+SESSION_MAX_CONTEXT_TOKENS = 6000
+SESSION_METRIC_TURNS = 50  # Per-turn measurements kept per session
+SESSION_MAX_SESSIONS = 100  # Least recently used sessions beyond this are dropped
+
+# Conversation memory (core/conversation_memory.py)
+MEMORY_MAX_CHATS = 100       # Least recently active chats beyond this are forgotten
+MEMORY_TOKEN_BUDGET = 1500   # Recent turns kept word for word per chat
+MEMORY_SUMMARY_TOKENS = 300  # Running summary of the turns that fell off
+SUMMARY_MODEL = "llama3.2"
@@ -0,0 +1,31 @@
+# Circuit breakers and adaptive timeouts per external dependency (core/resilience.py)
+#
+# failures:    consecutive failures that open the circuit (calls then fail fast)
+# reset:       seconds the circuit stays open before one trial call is let through
+# timeout:     seconds allowed until enough latencies were observed
+# min_timeout / max_timeout: bounds of the adaptive timeout
+# multiplier:  adaptive timeout = multiplier x the observed latency percentile
+DEPENDENCIES = {
+    # Generations; timeouts are tracked per generation profile (and per first token for streams)
+    "ollama": {"failures": 3, "reset": 20, "timeout": 120, "min_timeout": 15, "max_timeout": 300,
+               "multiplier": 3.0},
+    "telegram": {"failures": 4, "reset": 15, "timeout": 30, "min_timeout": 5, "max_timeout": 30,
+                 "multiplier": 3.0},
+    # getUpdates long polls; a circuit of their own, so a 50s poll never holds the
+    # half-open trial of the one above and sends go on while polling fails (fixed timeout)
+    "telegram_poll": {"failures": 4, "reset": 15, "timeout": 30, "min_timeout": 5, "max_timeout": 30,
+                      "multiplier": 3.0},
+    "duckduckgo": {"failures": 3, "reset": 120, "timeout": 20, "min_timeout": 5, "max_timeout": 30,
+                   "multiplier": 2.0},
+    # One circuit per crawled host; the timeout adapts over all hosts together
+    "crawl": {"failures": 2, "reset": 600, "timeout": 9, "min_timeout": 3, "max_timeout": 9,
+              "multiplier": 2.0},
+}
+
+TIMEOUT_PERCENTILE = 0.95
+TIMEOUT_MIN_SAMPLES = 10   # Latencies needed before the timeout adapts
+LATENCY_WINDOW = 100       # Recent latencies kept per timeout
+
+# Waits between retries of one call (seconds, doubled on each attempt)
+RETRY_BACKOFF = 1.0
+TELEGRAM_RETRY_DELAY = 1.0  # Between getUpdates attempts while the circuit is closed
@@ -0,0 +1,47 @@
+# Configuration for routing user messages to module functions (core/command_handler.py)
+# The router's model and generation options are GENERATION_PROFILES["router"] (config/ollama_settings.py)
+
+# "json": one structured generation returns either a reply or a function with
+# typed arguments, constrained by a schema built from the function signatures
+# (core/tool_calls.py). "text": the model answers `execute:module.function`.
+ROUTER_OUTPUT = "json"
+
+# A JSON decision may be a plan of several calls (core/plan_runner.py); steps
+# without dependencies between them run concurrently
+PLAN_MAX_STEPS = 5
+
+# Function retrieval (core/function_index.py): only the top-k most relevant
+# functions are put in the routing prompt
+ROUTER_TOP_K = 8
+EMBEDDING_BACKEND = "ollama"  # "ollama", or "hashing" for the deterministic offline embedder
+EMBEDDING_MODEL = "nomic-embed-text"
+HASHING_DIMENSIONS = 512
+
+# Functions the routing rules refer to by name; always offered to the model
+PINNED_FUNCTIONS = [
+    "internet_search.search_news",
+    "research.conduct_research",
+    "spotify.pause",
+    "spotify.resume",
+]
+
+# Fast path (core/intent_router.py): messages matching a rule are dispatched
+# without asking the LLM. Patterns are matched against the lowercased message
+# without greeting/"please"/punctuation. A rule is skipped while its function is not exposed.
+# Named groups become the function's arguments, converted to its parameter types.
+# Rules only name explicit actions: "pause" must never reach a toggle that
+# could start the music again
+ROUTING_RULES = [
+    (r"^(pause|stop)( (the )?(music|song|spotify))?$", "spotify.pause"),
+    (r"^(play|resume)( (the )?(music|song|spotify))?$", "spotify.resume"),
+    (r"^(skip|next)( (track|song))?$", "spotify.skip_track"),
+    (r"^(previous|go back)( (track|song))?$", "spotify.previous_track"),
+    (r"^(set )?(the )?volume( to)? (?P<volume>\d{1,3}) ?%?$", "spotify.set_volume"),
+    (r"^what('s| is) (playing|this song)$", "spotify.get_current_track"),
+    (r"^(remind me|set an alarm)\b.*\b\d{1,2}(:\d{2})? ?(am|pm)?\b", "notification.handle_user_request"),
+]
+
+# Intent model trained from the routes recorded in learning.db (user_knowledge.route)
+INTENT_CONFIDENCE = 0.85    # Minimum predicted probability for the fast path
+INTENT_MIN_SAMPLES = 30     # Routed messages needed before a model is trained
+INTENT_RETRAIN_EVERY = 20   # Retrain after this many newly recorded routes
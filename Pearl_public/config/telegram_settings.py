@@ -4,4 +4,27 @@
 BOT_TOKEN = "<your-Telegram_bot_token"  # Your bot token
 CHAT_ID = int("<your-chat-id>")  # Your chat ID
 # Telegram API base URL
-TELEGRAM_API_BASE_URL = f"https://api.telegram.org/bot{BOT_TOKEN}"
\ No newline at end of file
+TELEGRAM_API_BASE_URL = f"https://api.telegram.org/bot{BOT_TOKEN}"
+
+# Streamed LLM replies: send the first tokens at once, then edit the message at most once per interval (seconds)
+STREAM_RESPONSES = True
+STREAM_EDIT_INTERVAL = 1.0
+
+# getUpdates long polling: Telegram holds the request open up to this many seconds until an update arrives
+LONG_POLL_TIMEOUT = 50
+
+# How updates are received: "polling" (getUpdates) or "webhook" (Telegram pushes to a local aiohttp server)
+RECEIVE_MODE = "polling"
+
+# Webhook mode: public HTTPS URL Telegram posts to (must reach WEBHOOK_LISTEN_HOST:WEBHOOK_LISTEN_PORT via a proxy/tunnel)
+WEBHOOK_URL = "<your-public-https-url>/telegram/webhook"
+WEBHOOK_LISTEN_HOST = "0.0.0.0"
+WEBHOOK_LISTEN_PORT = 8080
+WEBHOOK_PATH = "/telegram/webhook"
+WEBHOOK_SECRET = "<random-secret-token>"  # Sent back by Telegram in X-Telegram-Bot-Api-Secret-Token
+WEBHOOK_QUEUE_SIZE = 100
+
+# Update processing: chats are handled concurrently (in order within a chat), at most this many at once
+UPDATE_CONCURRENCY = 4
+# Pending updates above which the receive loop waits before accepting more
+UPDATE_HIGH_WATER = 50
\ No newline at end of file
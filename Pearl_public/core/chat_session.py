@@ -0,0 +1,149 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+from contextlib import aclosing
+
+from core import ollama_client
+from config.ollama_settings import (
+    KEEP_ALIVE,
+    SESSION_MAX_CONTEXT_TOKENS,
+    SESSION_METRIC_TURNS,
+    SESSION_MAX_SESSIONS,
+)
+
+
+def turn_metrics(response, started: float) -> dict:
+    """Prompt-eval tokens and timings of one finished generation."""
+    return {
+        "prompt_tokens": response.get("prompt_eval_count") or 0,
+        "prompt_seconds": (response.get("prompt_eval_duration") or 0) / 1e9,
+        "output_tokens": response.get("eval_count") or 0,
+        "latency": time.monotonic() - started,
+    }
+
+
+class ChatSession:
+    """
+    One chat's running conversation with a model.
+
+    The system prompt is sent on the first turn only. Every response carries
+    Ollama's `context` (the tokens of the conversation so far), which is sent
+    back with the next turn, so the model only evaluates the new message
+    instead of re-reading the whole history. keep_alive keeps the model, and
+    with it the evaluated prefix, loaded between turns. With a generation
+    profile, its options and keep_alive apply to every turn.
+    """
+
+    def __init__(self, chat_id, name: str, model: str, system: str = "", profile: str = None):
+        self.chat_id = chat_id
+        self.name = name
+        self.model = model
+        self.system = system
+        self.profile = profile
+        self.context = None
+        self.turns = 0
+        self.metrics = deque(maxlen=SESSION_METRIC_TURNS)
+        # Turns must not interleave: both would continue from the same context
+        self.lock = asyncio.Lock()
+
+    def _request(self, kwargs: dict) -> dict:
+        request = dict(kwargs)
+        if self.profile:
+            request.setdefault("profile", self.profile)
+        else:
+            request.setdefault("keep_alive", KEEP_ALIVE)
+        if self.context:
+            request["context"] = self.context
+        elif self.system:
+            request["system"] = self.system
+        return request
+
+    def _finish(self, response, started: float):
+        self.turns += 1
+        self.context = response.get("context") or None
+        if self.context and len(self.context) > SESSION_MAX_CONTEXT_TOKENS:
+            logging.info(f"♻️ Session {self.name}/{self.chat_id} reached {len(self.context)} tokens, starting over")
+            self.context = None
+
+        metrics = turn_metrics(response, started)
+        self.metrics.append(metrics)
+        logging.info(
+            f"🧮 Session {self.name}/{self.chat_id} turn {self.turns}: "
+            f"{metrics['prompt_tokens']} prompt tokens in {metrics['prompt_seconds']:.2f}s, "
+            f"{metrics['output_tokens']} output tokens, {metrics['latency']:.2f}s total"
+        )
+
+    async def generate(self, prompt: str, **kwargs):
+        """Run one turn and return the Ollama response."""
+        async with self.lock:
+            started = time.monotonic()
+            response = await ollama_client.generate(self.model, prompt, **self._request(kwargs))
+            self._finish(response, started)
+            return response
+
+    async def stream_generate(self, prompt: str, **kwargs):
+        """
+        Run one turn as a stream, yielding each response part.
+
+        A stream closed before its final part (an early stop) leaves the
+        context at the previous turn, since Ollama only returns it at the end.
+        """
+        async with self.lock:
+            started = time.monotonic()
+            async with aclosing(ollama_client.stream_generate(self.model, prompt, **self._request(kwargs))) as stream:
+                async for part in stream:
+                    if part.get("done"):
+                        self._finish(part, started)
+                    yield part
+
+    def reset(self):
+        """Forget the conversation; the next turn sends the system prompt again."""
+        self.context = None
+
+    def report(self) -> dict:
+        """Mean prompt tokens and latency over the recorded turns."""
+        if not self.metrics:
+            return {"turns": self.turns}
+        count = len(self.metrics)
+        return {
+            "turns": self.turns,
+            "context_tokens": len(self.context or []),
+            "prompt_tokens_mean": sum(m["prompt_tokens"] for m in self.metrics) / count,
+            "latency_mean": sum(m["latency"] for m in self.metrics) / count,
+        }
+
+
+class SessionManager:
+    """
+    Sessions per (chat, purpose, model); a changed system prompt starts a new session.
+
+    At most `max_sessions` are kept; the least recently used are dropped.
+    """
+
+    def __init__(self, max_sessions: int = SESSION_MAX_SESSIONS):
+        self.max_sessions = max_sessions
+        self.sessions = OrderedDict()
+
+    def get(self, chat_id, name: str, model: str, system: str = "", profile: str = None) -> ChatSession:
+        key = (chat_id, name, model)
+        session = self.sessions.get(key)
+        if session is None or session.system != system:
+            session = self.sessions[key] = ChatSession(chat_id, name, model, system, profile)
+        self.sessions.move_to_end(key)
+        while len(self.sessions) > self.max_sessions:
+            self.sessions.popitem(last=False)
+        return session
+
+    def drop(self, chat_id):
+        """Forget every session of a chat."""
+        for key in [key for key in self.sessions if key[0] == chat_id]:
+            del self.sessions[key]
+
+    def report(self) -> dict:
+        return {f"{name}/{chat_id}": session.report() for (chat_id, name, _), session in self.sessions.items()}
+
+
+# Shared by the command router and ask_ollama
+sessions = SessionManager()
+
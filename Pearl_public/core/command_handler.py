@@ -1,28 +1,27 @@
 import logging
 import re
 import json
-from main import execute_command_immediately, execute_function
+import time
+from main import execute_command_immediately, execute_command
+from core.function_executor import PRIORITY_INTERACTIVE
 from core.modules_loader import available_functions
-from core.ollama_integration import ask_ollama
+from core.ollama_integration import ask_ollama, ask_ollama_stream, degraded_reply
+from core.resilience import CircuitOpenError
+from core.chat_session import sessions
+from core.conversation_memory import conversation_memory
+from core.function_index import get_function_index, describe_function
+from core.tool_calls import ToolCallError, tool_call_schema, parse_tool_call, output_kind, partial_reply
+from core.plan_runner import run_plan, summarize_results
+from core.intent_router import intent_router, CHAT_ROUTE
+from core.early_stop import stop_when_complete, CommandLineParser, JsonObjectParser
+from core.generation_profiles import profile_model
+from config.telegram_settings import STREAM_RESPONSES
+from config.router_settings import ROUTER_OUTPUT
 
-async def process_user_input(chat_id: int, user_input: str, telegram_client) -> None:
-    """
-    Process user input and determine the best response or function to execute.
+COMMAND_PREFIX = "execute:"
 
-    - If execution is required, AI must return: `execute:module.function
-    - If no execution is required, AI must return a brief response.
-    - The function ensures AI only selects functions that exist.
-    """
-    
-    logging.info(f"📩 Processing user input from chat_id {chat_id}: {user_input}")
-
-    # Dynamically fetch available functions to ensure AI picks valid ones
-    functions = available_functions()
-    
-    # Generate a strict AI prompt using the user input as the topic (i.e. query)
-    functions = available_functions()
-
-    prompt = f"""
+# Routing rules; the functions relevant to each message are sent with the message
+ROUTER_RULES = """
 SYSTEM: You are PEARL, an AI assistant responsible for executing predefined functions based on user requests.
 Your job is to analyze the user input and determine whether a function needs to be executed.
 You must **always prioritize internal functions** and **only use `internet_search` as a last resort**.
@@ -47,26 +46,259 @@ if user asks for new function use the self_editor module
 self_editor = PearlSelfEditor(repo_path)
 await self_editor.self_modify(user_input)
 
-### USER INPUT:
-{user_input}
-
-### AVAILABLE FUNCTIONS:
-{json.dumps(available_functions(), indent=2)}
+"""
 
+RESPONSE_FORMATS = {
+    "text": """
 ### RESPONSE FORMAT:
 - **If execution is required:** `execute:module.function`
 - **If no execution is needed:** A brief natural language response.
 -
-Now determine the best response.
-"""
+""",
+    "json": """
+### RESPONSE FORMAT:
+Answer with one JSON object and nothing else.
+- **If execution is required:** `{"function": "module.function", "arguments": {...}}`
+  Fill the arguments listed for the function from the user input; leave out those you cannot tell.
+- **If the request needs several functions:** `{"plan": [{"id": "1", "function": "module.function", "arguments": {...}}, ...]}`
+  Add `"after": ["1"]` to a step only if it must wait for that step; steps without it run at the same time.
+- **If no execution is needed:** `{"reply": "a brief natural language response"}`
+""",
+}
+
+# System prompt for routing, sent once per session
+ROUTER_SYSTEM = ROUTER_RULES + RESPONSE_FORMATS[ROUTER_OUTPUT]
+
+
+async def read_until_decided(stream):
+    """
+    Consume a response stream until it is clear whether it is a command.
+
+    Returns:
+        tuple: (text so far, is_command, finished). While the visible text is
+        still a prefix of COMMAND_PREFIX nothing is decided; as soon as it
+        diverges, the reply is plain text and can be shown while it streams.
+    """
+    text = ""
+    async for text in stream:
+        head = text.lstrip()
+        if head.startswith(COMMAND_PREFIX):
+            break
+        if head and not COMMAND_PREFIX.startswith(head):
+            return text, False, False
+    else:
+        text = text.strip()
+        is_command = text.startswith(COMMAND_PREFIX)
+        return (text.split("\n", 1)[0] if is_command else text), is_command, True
+
+    # A command: only its first line is needed (the caller's stop_when_complete
+    # ends the generation there)
+    async for text in stream:
+        pass
+    return text.strip().split("\n", 1)[0], True, True
+
+
+async def resume_stream(first, stream):
+    """Yield an already consumed snapshot, then the rest of the stream."""
+    yield first
+    async for text in stream:
+        yield text
+
+async def read_until_kind(stream):
+    """
+    JSON counterpart of read_until_decided for raw tool-call streams.
+
+    Returns:
+        tuple: (raw text so far, "reply"/"call"/None, finished). A reply can
+        be shown while it streams; a call needs the complete object.
+    """
+    raw, kind = "", None
+    async for raw in stream:
+        kind = output_kind(raw)
+        if kind == "reply":
+            return raw, kind, False
+        if kind == "call":
+            break
+    else:
+        return raw, kind, True
+
+    async for raw in stream:
+        pass
+    return raw, kind, True
+
+
+async def raw_text(parts):
+    """Yield the accumulated raw response text of an Ollama stream."""
+    text = ""
+    async for part in parts:
+        text += part.get("response", "")
+        yield text
+
+
+def call_context(chat_id: int, user_input: str, telegram_client, arguments: dict = None) -> dict:
+    """Keyword arguments for a module function: the model's arguments plus what the binder may fill in."""
+    return {**(arguments or {}), "telegram_client": telegram_client, "chat_id": chat_id, "user_input": user_input}
+
+async def run_function(chat_id: int, module_name: str, function_name: str, user_input: str, telegram_client,
+                       arguments: dict = None) -> None:
+    """Execute module.function for a user message and send the result to the chat."""
+    logging.info(f"⚡ Executing: {module_name}.{function_name}")
+    try:
+        # Run on the job executor; arguments chosen by the model are passed as
+        # keywords and the dispatch entry's binder fills the remaining required
+        # parameters from user_input/chat_id
+        result = await execute_command(
+            f"execute:{module_name}.{function_name}", priority=PRIORITY_INTERACTIVE,
+            call_kwargs=call_context(chat_id, user_input, telegram_client, arguments),
+        )
+        logging.info(f"✅ Execution Result: {result}")
+        conversation_memory.add(chat_id, "Assistant", f"{function_name} executed: {str(result)[:500]}")
+        await telegram_client.send_message(chat_id, f" {function_name} executed successfully: {result}")
+    except Exception as e:
+        logging.error(f"❌ Error executing {module_name}.{function_name}: {e}")
+        await telegram_client.send_message(chat_id, f"❌ Failed to execute {function_name}. Error: {str(e)}")
+
+async def run_plan_steps(chat_id: int, steps: list, user_input: str, telegram_client) -> None:
+    """Execute a plan's calls, independent ones concurrently, and send one combined reply."""
+    logging.info(f"🧩 Executing plan: {steps}")
 
+    async def run_step(step):
+        return await execute_command(
+            f"execute:{step.function}", priority=PRIORITY_INTERACTIVE,
+            call_kwargs=call_context(chat_id, user_input, telegram_client, step.arguments),
+        )
 
+    results = await run_plan(steps, run_step)
+    reply = summarize_results(results)
+    conversation_memory.add(chat_id, "Assistant", reply[:500])
+    await telegram_client.send_message(chat_id, reply)
+
+async def route_with_tool_call(chat_id: int, user_input: str, prompt: str, session, specs: dict,
+                               telegram_client, started: float) -> None:
+    """
+    Route a message with one structured generation.
+
+    The model's output is constrained to the tool-call schema of the offered
+    functions, so a single round trip yields either a reply, streamed to the
+    chat as it is generated, a function with validated, typed arguments, or
+    a plan of several calls for compound requests.
+    """
+    schema = tool_call_schema(specs)
+    raw = ""
+    try:
+        if STREAM_RESPONSES:
+            # Generation stops as soon as the JSON object is closed
+            stream = stop_when_complete(
+                raw_text(session.stream_generate(prompt, format=schema)),
+                JsonObjectParser(),
+            )
+            raw, kind, finished = await read_until_kind(stream)
+            if kind == "reply" and not finished:
+                intent_router.record_llm(chat_id, user_input, CHAT_ROUTE, time.monotonic() - started)
+                replies = (partial_reply(text) async for text in resume_stream(raw, stream))
+                response = await telegram_client.stream_message(chat_id, replies)
+                logging.info(f"🧠 AI Response (streamed): {response}")
+                conversation_memory.add(chat_id, "Assistant", response)
+                return
+        else:
+            raw = (await session.generate(prompt, format=schema)).get("response", "")
+        logging.info(f"🧠 AI Decision: {raw}")
+        call = parse_tool_call(raw, specs)
+    except ToolCallError as e:
+        logging.warning(f"⚠️ Invalid tool call from AI ({e}): {raw}")
+        await telegram_client.send_message(chat_id, "⚠️ I couldn't find a matching function for that request.")
+        return
+    except CircuitOpenError as e:
+        # Commands the intent router recognises keep working; everything else waits for Ollama
+        logging.warning(f"🔌 {e}; sending a degraded reply")
+        await telegram_client.send_message(chat_id, degraded_reply(e))
+        return
+    except Exception as e:
+        logging.error(f"❌ Error processing AI response: {e}")
+        await telegram_client.send_message(chat_id, "Error processing AI response.")
+        return
+
+    routing_latency = time.monotonic() - started
+    if not call.is_call:
+        intent_router.record_llm(chat_id, user_input, CHAT_ROUTE, routing_latency)
+        conversation_memory.add(chat_id, "Assistant", call.reply)
+        await telegram_client.send_message(chat_id, call.reply.strip())
+        return
+    if call.is_plan:
+        # Compound requests are not training data for the single-route intent model
+        await run_plan_steps(chat_id, call.plan, user_input, telegram_client)
+        return
+
+    intent_router.record_llm(chat_id, user_input, call.function, routing_latency)
+    module_name, function_name = call.function.split(".")
+    await run_function(chat_id, module_name, function_name, user_input, telegram_client, call.arguments)
+
+async def process_user_input(chat_id: int, user_input: str, telegram_client) -> None:
+    """
+    Process user input and determine the best response or function to execute.
+
+    - Obvious commands are recognised locally by the intent router and run directly.
+    - In "json" router output mode, one structured generation returns a reply or a
+      function with typed arguments (see route_with_tool_call).
+    - In "text" mode, if execution is required, AI must return: `execute:module.function
+    - If no execution is required, AI must return a brief response.
+    - The function ensures AI only selects functions that exist.
+    """
+    
+    logging.info(f"📩 Processing user input from chat_id {chat_id}: {user_input}")
+    started = time.monotonic()
+
+    # Fast path: no LLM call for commands the rules or the intent model recognise
+    fast = intent_router.route(user_input)
+    if fast:
+        route, source, confidence, arguments = fast
+        intent_router.record_hit(route, source, time.monotonic() - started)
+        logging.info(f"🏎️ Fast path ({source}, confidence {confidence:.2f}): {route}({arguments})")
+        conversation_memory.add(chat_id, "User", user_input)
+        module_name, function_name = route.split(".")
+        await run_function(chat_id, module_name, function_name, user_input, telegram_client, arguments)
+        return
+
+    # The rules form a stable system prompt sent once per session; each turn adds
+    # only the functions retrieved for this message and the message itself, so the
+    # prompt stays the same size however many modules exist
+    session = sessions.get(chat_id, "router", profile_model("router"), ROUTER_SYSTEM, profile="router")
+    specs = await get_function_index().relevant(user_input)
+    functions = "\n".join(describe_function(key, spec) for key, spec in specs.items())
+    prompt = (
+        f"### AVAILABLE FUNCTIONS:\n{functions}\n\n"
+        f"### USER INPUT:\n{user_input}\n\nNow determine the best response."
+    )
+    if session.context is None:
+        # New or restarted session: bring in what is remembered of the conversation
+        history = conversation_memory.render(chat_id)
+        if history:
+            prompt = f"### CONVERSATION SO FAR:\n{history}\n\n{prompt}"
+    conversation_memory.add(chat_id, "User", user_input)
+
+    if ROUTER_OUTPUT == "json":
+        await route_with_tool_call(chat_id, user_input, prompt, session, specs, telegram_client, started)
+        return
 
-    from main import execute_function
-    from modules.notification import handle_user_request as handle_notifier
     # Get AI response
-    response = await ask_ollama(prompt)
+    if STREAM_RESPONSES:
+        # A command reply ends the generation once its line is complete
+        stream = stop_when_complete(ask_ollama_stream(prompt, session=session), CommandLineParser())
+        response, is_command, finished = await read_until_decided(stream)
+        if not is_command:
+            intent_router.record_llm(chat_id, user_input, CHAT_ROUTE, time.monotonic() - started)
+            # Plain reply: show the first tokens now and keep editing the same message
+            if finished:
+                await telegram_client.send_message(chat_id, response)
+            else:
+                response = await telegram_client.stream_message(chat_id, resume_stream(response, stream))
+            logging.info(f"🧠 AI Response (streamed): {response}")
+            conversation_memory.add(chat_id, "Assistant", response)
+            return
+    else:
+        response = await ask_ollama(prompt, session=session)
     logging.info(f"🧠 AI Response: {response}")
+    routing_latency = time.monotonic() - started
 
     # Process the AI response ensuring it follows the strict format
     if response.startswith("execute:"):
@@ -77,29 +309,12 @@ Now determine the best response.
             # Validate function existence before execution
             available_funcs = available_functions()
             if module_name in available_funcs and function_name in available_funcs[module_name]:
-                logging.info(f"⚡ Executing: {module_name}.{function_name}")
-
-                try:
-                    # Pass user_input as the required argument for functions that need it
-                    if module_name == "internet_search" and function_name == "search_news":
-                        result = await execute_function(module_name, function_name, query=user_input)
-                    elif module_name == "research" and function_name == "conduct_research":
-                        result = await execute_function(module_name, function_name, topic=user_input)
-                    elif module_name == "spotify"  and function_name == "play_pause":
-                        result = await execute_function(module_name, function_name)
-                    elif module_name == "self_editor" and function_name == "self_modify":
-                        result = await execute_function(module_name, function_name, user_input)              
-                    elif module_name == "generated_unnamed" and function_name == "async_count":
-                        result = await execute_function(module_name, function_name, user_input)
-                    elif module_name == "notification" and function_name == "parse_notification_request":
-                        result = await execute_function(handle_notifier, chat_id, user_input)
-                    logging.info(f"✅ Execution Result: {result}")
-                    await telegram_client.send_message(chat_id, f" {function_name} executed successfully: {result}")
-                except Exception as e:
-                    logging.error(f"❌ Error executing {module_name}.{function_name}: {e}")
-                    await telegram_client.send_message(chat_id, f"❌ Failed to execute {function_name}. Error: {str(e)}")
+                intent_router.record_llm(chat_id, user_input, f"{module_name}.{function_name}", routing_latency)
+                await run_function(chat_id, module_name, function_name, user_input, telegram_client)
             else:
                 logging.warning(f"⚠️ Function {function_name} not found in {module_name}")
                 await telegram_client.send_message(chat_id, f"⚠️ I couldn't find a matching function for that request.")
     else:
+        intent_router.record_llm(chat_id, user_input, CHAT_ROUTE, routing_latency)
+        conversation_memory.add(chat_id, "Assistant", response)
         await telegram_client.send_message(chat_id, response.strip())
@@ -0,0 +1,133 @@
+import logging
+from collections import OrderedDict, deque
+
+from core import ollama_client
+from core.function_executor import background_executor
+from core.llm_scheduler import LLM_SUMMARY
+from config.ollama_settings import (
+    MEMORY_MAX_CHATS,
+    MEMORY_TOKEN_BUDGET,
+    MEMORY_SUMMARY_TOKENS,
+    SUMMARY_MODEL,
+)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token), good enough for budgeting."""
+    return len(text) // 4 + 1
+
+
+class ChatMemory:
+    """Recent turns of one chat plus a running summary of the older ones."""
+
+    def __init__(self):
+        self.turns = deque()  # (role, text, tokens)
+        self.tokens = 0
+        self.summary = ""
+        self.evicted = []  # Turns waiting to be folded into the summary
+        self.compacting = False
+
+    def add(self, role: str, text: str, budget: int):
+        tokens = estimate_tokens(text)
+        self.turns.append((role, text, tokens))
+        self.tokens += tokens
+        # Keep at least the newest turn, even when it alone exceeds the budget
+        while self.tokens > budget and len(self.turns) > 1:
+            old = self.turns.popleft()
+            self.tokens -= old[2]
+            self.evicted.append(old)
+
+    def render(self) -> str:
+        lines = [f"Summary of earlier conversation: {self.summary}"] if self.summary else []
+        lines.extend(f"{role}: {text}" for role, text, _ in self.turns)
+        return "\n".join(lines)
+
+
+class ConversationMemory:
+    """
+    Bounded conversation memory for all chats.
+
+    Each chat keeps its user messages and the assistant's replies (never the
+    generated prompts) up to a token budget. Turns that fall off the budget
+    are compacted into a running summary by a job on the background lane
+    (background_executor), never on a worker serving user commands. Chats
+    are kept in LRU order and the least recently active ones are forgotten
+    beyond `max_chats`, so memory stays flat no matter how long the bot runs.
+    """
+
+    def __init__(self, max_chats: int = MEMORY_MAX_CHATS, token_budget: int = MEMORY_TOKEN_BUDGET,
+                 summary_tokens: int = MEMORY_SUMMARY_TOKENS, summary_model: str = SUMMARY_MODEL):
+        self.max_chats = max_chats
+        self.token_budget = token_budget
+        self.summary_tokens = summary_tokens
+        self.summary_model = summary_model
+        self.chats = OrderedDict()
+
+    def _chat(self, chat_id) -> ChatMemory:
+        memory = self.chats.get(chat_id)
+        if memory is None:
+            memory = self.chats[chat_id] = ChatMemory()
+            while len(self.chats) > self.max_chats:
+                forgotten, _ = self.chats.popitem(last=False)
+                logging.info(f"🧹 Conversation memory of chat {forgotten} dropped (least recently active)")
+        self.chats.move_to_end(chat_id)
+        return memory
+
+    def add(self, chat_id, role: str, text: str):
+        """Record a turn ("User" or "Assistant") and schedule compaction if turns fell off."""
+        if chat_id is None or not text:
+            return
+        memory = self._chat(chat_id)
+        memory.add(role, text.strip(), self.token_budget)
+        if memory.evicted and not memory.compacting:
+            memory.compacting = True
+            background_executor.submit_call(f"compact_memory:{chat_id}", self._compact, memory)
+
+    def render(self, chat_id) -> str:
+        """Summary and recent turns of a chat, ready to put in a prompt ("" if nothing is known)."""
+        memory = self.chats.get(chat_id)
+        return memory.render() if memory else ""
+
+    def user_texts(self, chat_id) -> list:
+        """The chat's remembered user messages, oldest first."""
+        memory = self.chats.get(chat_id)
+        return [text for role, text, _ in memory.turns if role == "User"] if memory else []
+
+    def forget(self, chat_id):
+        self.chats.pop(chat_id, None)
+
+    async def _compact(self, memory: ChatMemory):
+        """Fold evicted turns into the running summary (runs as a background job)."""
+        try:
+            while memory.evicted:
+                turns, memory.evicted = memory.evicted, []
+                transcript = "\n".join(f"{role}: {text}" for role, text, _ in turns)
+                words = self.summary_tokens * 3 // 4
+                prompt = (
+                    f"Update the summary of a conversation between a user and the assistant PEARL.\n\n"
+                    f"Current summary:\n{memory.summary or '(none)'}\n\n"
+                    f"Older messages to add:\n{transcript}\n\n"
+                    f"Return only the updated summary, at most {words} words. "
+                    f"Keep facts about the user, their preferences and open requests."
+                )
+                response = await ollama_client.generate(self.summary_model, prompt, priority=LLM_SUMMARY)
+                summary = response.get("response", "").strip()
+                # Hard cap in case the model ignores the length limit
+                memory.summary = summary[:self.summary_tokens * 4]
+                logging.info(f"🗜️ Compacted {len(turns)} turns into the conversation summary")
+        except Exception as e:
+            logging.warning(f"⚠️ Conversation summary failed, older turns dropped: {e}")
+            memory.evicted = []
+        finally:
+            memory.compacting = False
+
+    def stats(self) -> dict:
+        return {
+            "chats": len(self.chats),
+            "turns": sum(len(m.turns) for m in self.chats.values()),
+            "tokens": sum(m.tokens for m in self.chats.values()),
+        }
+
+
+# Shared memory used by ollama_integration and the command router
+conversation_memory = ConversationMemory()
@@ -0,0 +1,158 @@
+import inspect
+import logging
+
+from config.executor_settings import USER_INPUT_PARAMETERS
+from core.modules_loader import get_registry
+from core.offload import execution_kind, run_blocking
+
+logger = logging.getLogger(__name__)
+
+USER_INPUT = "user_input"
+
+
+class MissingArgumentsError(TypeError):
+    """A function was called without values for some of its required parameters."""
+
+    def __init__(self, key, missing):
+        names = ", ".join(f"`{name}`" for name in missing)
+        super().__init__(f"{key} needs a value for {names}")
+        self.key = key
+        self.missing = list(missing)
+
+
+class FunctionNotFoundError(LookupError):
+    """A module.function that is not exposed was called."""
+
+    def __init__(self, module_name, function_name, available=()):
+        message = f"Function `{function_name}` not found in `{module_name}`"
+        if available:
+            message += f". Try one of: {', '.join(available)}"
+        super().__init__(message)
+        self.key = f"{module_name}.{function_name}"
+
+
+class DispatchEntry:
+    """A resolved `module.function` with everything needed to call it."""
+
+    def __init__(self, module_name, function_name, function, digest, decorators=()):
+        self.key = f"{module_name}.{function_name}"
+        self.module_name = module_name
+        self.function_name = function_name
+        self.function = function
+        self.digest = digest
+        self.signature = inspect.signature(function)
+        self.is_coroutine = inspect.iscoroutinefunction(function)
+        # "async", "io" (thread pool) or "cpu" (process pool)
+        self.execution = execution_kind(function, decorators, self.key)
+
+    def bind(self, args=(), kwargs=None, context=None):
+        """
+        Bind explicit arguments, then fill missing required parameters from context.
+
+        Context keys are matched by parameter name, so context["user_input"]
+        only fills a parameter named user_input, or the one USER_INPUT_PARAMETERS
+        names for this function. Nothing is guessed from types or other names.
+
+        Returns:
+            tuple: (args, kwargs) ready for the call.
+        Raises:
+            TypeError: if the explicit arguments do not fit the signature.
+            MissingArgumentsError: if required parameters are still without a value.
+        """
+        kwargs = dict(kwargs or {})
+        context = dict(context or {})
+        bound = self.signature.bind_partial(*args, **kwargs)
+        marked = USER_INPUT_PARAMETERS.get(self.key)
+        if marked and context.get(USER_INPUT) is not None:
+            context.setdefault(marked, context[USER_INPUT])
+
+        missing = []
+        for name, param in self.signature.parameters.items():
+            if name in bound.arguments or param.default is not inspect.Parameter.empty:
+                continue
+            if param.kind in (inspect.Parameter.VAR_POSITIONAL, inspect.Parameter.VAR_KEYWORD):
+                continue
+            if context.get(name) is not None:
+                bound.arguments[name] = context[name]
+            else:
+                missing.append(name)
+        if missing:
+            raise MissingArgumentsError(self.key, missing)
+
+        return bound.args, bound.kwargs
+
+    async def call(self, args=(), kwargs=None):
+        """
+        Invoke the function without blocking the event loop.
+
+        Coroutine functions are awaited directly; synchronous functions run in
+        the thread pool, or in the process pool when marked CPU-bound.
+        """
+        if self.is_coroutine:
+            return await self.function(*args, **(kwargs or {}))
+        return await run_blocking(self.execution, self.function, *args, **(kwargs or {}))
+
+
+class DispatchTable:
+    """
+    O(1) `module.function` -> DispatchEntry lookup built from the function registry.
+
+    Entries are resolved on first use and cached together with the content
+    hash of their module file. When a module changes (e.g. self_editor writes
+    a new generated_*.py) only that module's entries are resolved again.
+    """
+
+    def __init__(self, registry):
+        self.registry = registry
+        self.entries = {}
+
+    def lookup(self, module_name, function_name):
+        """
+        Return the DispatchEntry for module.function, or None if it is not exposed.
+
+        Raises:
+            ModuleNotFoundError: if the module cannot be imported.
+            AttributeError: if the module does not define the function.
+        """
+        module_entry = self.registry.entries.get(module_name)
+        if module_entry is None:
+            # Unknown module: let the registry pick up newly created files
+            self.registry.functions()
+            module_entry = self.registry.entries.get(module_name)
+        if module_entry is None or function_name not in module_entry.specs:
+            return None
+
+        key = f"{module_name}.{function_name}"
+        entry = self.entries.get(key)
+        if entry is not None and entry.digest == module_entry.digest:
+            return entry
+
+        if entry is not None:
+            self.drop_module(module_name)
+        module = self.registry.load(module_name)
+        function = getattr(module, function_name, None)
+        if function is None:
+            raise AttributeError(f"Could not load function `{function_name}` from module `{module_name}`")
+        spec = module_entry.specs[function_name]
+        entry = self.entries[key] = DispatchEntry(module_name, function_name, function, module_entry.digest,
+                                                  spec.decorators)
+        logger.debug(f"Dispatch entry built: {key} {entry.signature} ({entry.execution})")
+        return entry
+
+    def drop_module(self, module_name):
+        """Forget every cached entry of a module."""
+        prefix = f"{module_name}."
+        for key in [key for key in self.entries if key.startswith(prefix)]:
+            del self.entries[key]
+
+
+_tables = {}
+
+
+def get_dispatch_table(modules_path="modules"):
+    """Return the shared DispatchTable for a modules directory."""
+    registry = get_registry(modules_path)
+    table = _tables.get(id(registry))
+    if table is None:
+        table = _tables[id(registry)] = DispatchTable(registry)
+    return table
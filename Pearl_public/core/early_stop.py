@@ -0,0 +1,138 @@
+import ast
+import logging
+import textwrap
+from contextlib import aclosing
+
+from core import ollama_client
+
+COMMAND_PREFIX = "execute:"
+
+# Generations cut short per parser, for the shutdown report
+early_stops = {}
+
+
+class FunctionBlockParser:
+    """
+    Complete once the first `async def` block has ended.
+
+    The block ends at the first non-blank line indented no deeper than the
+    `def` (the next top-level statement, a closing ``` fence, trailing prose)
+    provided everything before it parses as Python, so a signature spread over
+    several lines is not mistaken for the end. Only newly completed lines are
+    examined on each update.
+    """
+
+    def __init__(self):
+        self.scanned = 0      # Complete lines already examined
+        self.start = None     # Index of the `async def` line
+        self.indent = 0
+
+    def update(self, text: str):
+        lines = text.split("\n")[:-1]  # The last element is an unfinished line
+        for index in range(self.scanned, len(lines)):
+            line = lines[index]
+            if self.start is None:
+                if line.strip().startswith("async def "):
+                    self.start = index
+                    self.indent = len(line) - len(line.lstrip())
+                continue
+            if not line.strip() or len(line) - len(line.lstrip()) > self.indent:
+                continue
+            block = "\n".join(lines[self.start:index]).rstrip()
+            try:
+                ast.parse(textwrap.dedent(block))
+            except SyntaxError:
+                continue
+            self.scanned = len(lines)
+            return block.strip()
+        self.scanned = len(lines)
+        return None
+
+
+class CommandLineParser:
+    """Complete once an `execute:module.function` reply has its whole first line; plain replies never complete."""
+
+    def update(self, text: str):
+        head = text.lstrip()
+        if head.startswith(COMMAND_PREFIX) and "\n" in head:
+            return head.split("\n", 1)[0].strip()
+        return None
+
+
+class JsonObjectParser:
+    """Complete once the top-level JSON object is closed; tracks nesting and strings incrementally."""
+
+    def __init__(self):
+        self.position = 0
+        self.depth = 0
+        self.started = False
+        self.in_string = False
+        self.escaped = False
+
+    def update(self, text: str):
+        for index in range(self.position, len(text)):
+            char = text[index]
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == "\\":
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = True
+            elif char in "{[":
+                self.depth += 1
+                self.started = True
+            elif char in "}]":
+                self.depth -= 1
+                if self.started and self.depth == 0:
+                    self.position = len(text)
+                    return text[:index + 1].strip()
+        self.position = len(text)
+        return None
+
+
+def _count_stop(parser):
+    name = type(parser).__name__
+    early_stops[name] = early_stops.get(name, 0) + 1
+
+
+async def stop_when_complete(snapshots, parser):
+    """
+    Pass through a stream of growing text snapshots, ending it as soon as the
+    parser has a complete result. Closing the source stream closes the HTTP
+    request, and Ollama stops generating.
+    """
+    async with aclosing(snapshots):
+        async for text in snapshots:
+            yield text
+            if parser.update(text) is not None:
+                _count_stop(parser)
+                logging.info(f"✂️ {type(parser).__name__}: result complete after {len(text)} chars, generation stopped")
+                return
+
+
+async def generate_until(model: str, prompt: str, parser, **kwargs):
+    """
+    Stream a generation into an incremental parser and stop once it has a result.
+
+    Args:
+        model (str): Ollama model name.
+        prompt (str): The prompt.
+        parser: Object whose update(text so far) returns the result once complete, else None.
+        **kwargs: Passed to ollama_client.stream_generate (profile, options, priority, ...).
+    Returns:
+        tuple: (result or None if the generation ended first, raw text generated).
+    """
+    text = ""
+    async with aclosing(ollama_client.stream_generate(model, prompt, **kwargs)) as stream:
+        async for part in stream:
+            text += part.get("response", "")
+            result = parser.update(text)
+            if result is not None:
+                _count_stop(parser)
+                logging.info(f"✂️ {model}: {type(parser).__name__} complete after {len(text)} chars, generation stopped")
+                return result, text
+    return None, text
+
@@ -1,50 +1,240 @@
 import asyncio
+import itertools
 import logging
+import time
+from collections import deque
 
-# Assume execute_command is defined elsewhere (or see the previous example)
-# from command_executor import execute_command
+from config.executor_settings import (
+    EXECUTOR_WORKERS,
+    BACKGROUND_WORKERS,
+    DEFAULT_JOB_TIMEOUT,
+    FUNCTION_TIMEOUTS,
+    FUNCTION_RETRIES,
+    RETRY_BACKOFF,
+    LATENCY_SAMPLES,
+)
 
-# For demonstration, here is a dummy execute_command function.
-# In your actual code, this should call your dynamic executor (e.g., using execute_function).
-async def execute_command(command: str, *args, **kwargs):
-    logging.info(f"Executing command: {command}")
-    # Here you would parse and execute the command.
-    # For now, we simulate execution by returning a dummy result.
-    await asyncio.sleep(1)
-    return f"Result for {command}"
+# Lower numbers run first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_NORMAL = 5
+PRIORITY_BACKGROUND = 10
 
-# Create an asyncio queue for command strings.
-command_queue = asyncio.Queue()
+# Failures a retry would only repeat: a malformed command, an unknown function,
+# missing or invalid arguments
+NOT_RETRIED = (ValueError, LookupError, TypeError)
 
-async def function_executor():
+
+def command_key(command: str) -> str:
+    """'execute:module.function' -> 'module.function' (used for per-function policies)."""
+    return command[len("execute:"):].strip() if command.startswith("execute:") else command
+
+
+class Job:
+    """One queued command execution. Await `job.future` for its result."""
+
+    def __init__(self, job_id, command, args, kwargs, priority, timeout, retries, func=None):
+        self.id = job_id
+        self.command = command
+        self.key = command_key(command)
+        self.args = args
+        self.kwargs = kwargs
+        self.priority = priority
+        self.timeout = timeout
+        self.retries = retries
+        self.func = func  # async callable run instead of the executor's runner
+        self.attempts = 0
+        self.future = asyncio.get_running_loop().create_future()
+        self.task = None
+        self.submitted_at = time.monotonic()
+        self.started_at = None
+
+    def cancel(self) -> bool:
+        """Cancel the job whether it is still queued or already running."""
+        if self.task is not None:
+            self.task.cancel()
+        return self.future.cancel()
+
+
+class FunctionExecutor:
     """
-    Continuously check for new commands in the command queue and execute them.
-    Each command is expected to be a string in the format:
-        "execute:module_name.function_name"
+    Bounded pool of async workers executing commands from a priority queue.
+
+    Workers block on queue.get() (no polling). Each job gets a timeout
+    (per function via FUNCTION_TIMEOUTS), can be cancelled while queued or
+    running, is retried with exponential backoff when its runner raises
+    (FUNCTION_RETRIES, except for NOT_RETRIED errors), and records queue-wait
+    and run latency per function. The runner must raise on failure; the final
+    error is set on the job's future for the submitter to report.
     """
-    logging.info("Function Executor started.")
-    while True:
-        if not command_queue.empty():
-            command = await command_queue.get()
-            logging.info(f"Function Executor: Received command: {command}")
+
+    def __init__(self, runner=None, workers: int = EXECUTOR_WORKERS):
+        # runner: async callable(command, *args, **kwargs) doing the actual work
+        self.runner = runner
+        self.worker_count = workers
+        self.queue = None
+        self.workers = []
+        self._ids = itertools.count(1)
+        self.latencies = {}
+
+    def start(self):
+        """Start the worker tasks on the running loop (done lazily by submit)."""
+        if self.workers:
+            return
+        self.queue = asyncio.PriorityQueue()
+        self.workers = [asyncio.create_task(self._worker(n)) for n in range(self.worker_count)]
+        logging.info(f"⚡ Function executor started with {self.worker_count} workers.")
+
+    async def stop(self):
+        """Cancel the workers and every job still queued."""
+        for task in self.workers:
+            task.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+        while self.queue is not None and not self.queue.empty():
+            _, _, job = self.queue.get_nowait()
+            job.cancel()
+
+    def submit(self, command: str, *args, call_kwargs: dict = None, priority: int = PRIORITY_NORMAL,
+               timeout: float = None, retries: int = None) -> Job:
+        """
+        Queue a command and return its Job; `await job.future` for the result.
+
+        Args:
+            command (str): "execute:module.function", passed to the runner.
+            *args: Positional arguments for the runner.
+            call_kwargs (dict, optional): Keyword arguments for the runner. Kept
+                apart from the job controls below, so a function may have
+                parameters called priority, timeout or retries.
+            priority (int): Lower runs first.
+            timeout (float, optional): Seconds before the job is cancelled
+                (default from FUNCTION_TIMEOUTS).
+            retries (int, optional): Extra attempts after a failure (default from FUNCTION_RETRIES).
+        """
+        self.start()
+        key = command_key(command)
+        if timeout is None:
+            timeout = FUNCTION_TIMEOUTS.get(key, DEFAULT_JOB_TIMEOUT)
+        if retries is None:
+            retries = FUNCTION_RETRIES.get(key, 0)
+        job = Job(next(self._ids), command, args, dict(call_kwargs or {}), priority, timeout, retries)
+        self.queue.put_nowait((priority, job.id, job))
+        logging.info(f"📌 Job #{job.id} queued: {command} (priority {priority}, {self.queue.qsize()} in queue)")
+        return job
+
+    def submit_call(self, name: str, func, *args, call_kwargs: dict = None, priority: int = PRIORITY_BACKGROUND,
+                    timeout: float = None, retries: int = 0) -> Job:
+        """Queue `await func(*args, **call_kwargs)` as a job (e.g. background upkeep); `name` labels it."""
+        self.start()
+        timeout = DEFAULT_JOB_TIMEOUT if timeout is None else timeout
+        job = Job(next(self._ids), name, args, dict(call_kwargs or {}), priority, timeout, retries, func=func)
+        self.queue.put_nowait((priority, job.id, job))
+        logging.info(f"📌 Job #{job.id} queued: {name} (priority {priority}, {self.queue.qsize()} in queue)")
+        return job
+
+    async def run(self, command: str, *args, call_kwargs: dict = None, **controls):
+        """
+        Submit a command and wait for its result. Cancelling the caller cancels the job.
+
+        `controls` are submit()'s priority, timeout and retries.
+        """
+        job = self.submit(command, *args, call_kwargs=call_kwargs, **controls)
+        try:
+            return await job.future
+        except asyncio.CancelledError:
+            job.cancel()
+            raise
+
+    async def _worker(self, number: int):
+        while True:
+            _, _, job = await self.queue.get()
             try:
-                # Execute the command.
-                result = await execute_command(command)
-                logging.info(f"Function Executor: Command '{command}' executed with result: {result}")
+                if not job.future.done():
+                    await self._execute(job)
+            except asyncio.CancelledError:
+                job.cancel()
+                raise
             except Exception as e:
-                logging.error(f"Function Executor: Error executing command '{command}': {e}")
+                logging.error(f"❌ Worker {number}: unexpected error on job #{job.id}: {e}")
             finally:
-                command_queue.task_done()
-        await asyncio.sleep(1)  # Add a small delay to prevent tight loop
-
-# Example usage
-if __name__ == "__main__":
-    async def main():
-        # Add some commands to the queue for testing
-        await command_queue.put("execute:module.function1")
-        await command_queue.put("execute:module.function2")
-        
-        # Start the function executor
-        await function_executor()
-
-    asyncio.run(main())
+                self.queue.task_done()
+
+    async def _execute(self, job: Job):
+        job.attempts += 1
+        job.started_at = time.monotonic()
+        if job.func is not None:
+            job.task = asyncio.ensure_future(job.func(*job.args, **job.kwargs))
+        else:
+            job.task = asyncio.ensure_future(self.runner(job.command, *job.args, **job.kwargs))
+        try:
+            # Not wait_for: on 3.11 it drops a cancellation that arrives as the job
+            # finishes, and stop() would then wait forever for this worker
+            async with asyncio.timeout(job.timeout):
+                result = await job.task
+        except asyncio.TimeoutError:
+            self._record(job)
+            logging.error(f"⏱️ Job #{job.id} {job.command} timed out after {job.timeout}s")
+            if not job.future.done():
+                job.future.set_exception(asyncio.TimeoutError(f"{job.key} timed out after {job.timeout}s"))
+            return
+        except asyncio.CancelledError:
+            if job.future.cancelled():
+                logging.info(f"🛑 Job #{job.id} {job.command} cancelled")
+                return
+            raise
+        except Exception as e:
+            self._record(job)
+            if job.attempts <= job.retries and not isinstance(e, NOT_RETRIED):
+                delay = RETRY_BACKOFF * 2 ** (job.attempts - 1)
+                logging.warning(f"🔁 Job #{job.id} {job.command} failed ({e}), retry {job.attempts}/{job.retries} in {delay}s")
+                job.task = None
+                asyncio.get_running_loop().call_later(delay, self._requeue, job)
+                return
+            logging.error(f"❌ Job #{job.id} {job.command} failed: {e}")
+            if not job.future.done():
+                job.future.set_exception(e)
+            return
+        finally:
+            job.task = None
+
+        wait, run = self._record(job)
+        logging.info(f"✅ Job #{job.id} {job.command} done in {run:.2f}s (waited {wait:.2f}s)")
+        if not job.future.done():
+            job.future.set_result(result)
+
+    def _requeue(self, job: Job):
+        if not job.future.done():
+            self.queue.put_nowait((job.priority, job.id, job))
+
+    def _record(self, job: Job):
+        now = time.monotonic()
+        wait, run = job.started_at - job.submitted_at, now - job.started_at
+        samples = self.latencies.setdefault(job.key, deque(maxlen=LATENCY_SAMPLES))
+        samples.append((wait, run))
+        return wait, run
+
+    def latency_report(self) -> dict:
+        """Per-function job count and queue-wait / run latency (mean, p95, max) in seconds."""
+        report = {}
+        for key, samples in self.latencies.items():
+            waits = sorted(w for w, _ in samples)
+            runs = sorted(r for _, r in samples)
+            p95 = min(len(runs) - 1, int(len(runs) * 0.95))
+            report[key] = {
+                "jobs": len(runs),
+                "wait_mean": sum(waits) / len(waits),
+                "run_mean": sum(runs) / len(runs),
+                "run_p95": runs[p95],
+                "run_max": runs[-1],
+            }
+        return report
+
+
+# Shared executor; main.py installs the runner that parses and executes commands
+executor = FunctionExecutor()
+# Low-priority lane for upkeep jobs (submit_call), with workers of its own
+background_executor = FunctionExecutor(workers=BACKGROUND_WORKERS)
+
+
+async def execute_command(command: str, *args, call_kwargs: dict = None, **controls):
+    """Run a command through the shared executor and return its result (arguments as for FunctionExecutor.run)."""
+    return await executor.run(command, *args, call_kwargs=call_kwargs, **controls)
@@ -0,0 +1,178 @@
+import hashlib
+import logging
+import re
+import time
+
+import numpy as np
+
+from core import ollama_client
+from core.modules_loader import get_registry
+from config.router_settings import (
+    ROUTER_TOP_K,
+    EMBEDDING_BACKEND,
+    EMBEDDING_MODEL,
+    HASHING_DIMENSIONS,
+    PINNED_FUNCTIONS,
+)
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def function_text(key: str, spec) -> str:
+    """Text embedded for a function: qualified name, signature, the name as words, docstring."""
+    words = key.replace(".", " ").replace("_", " ")
+    return f"{key}{spec.signature}\n{words}\n{spec.doc or ''}"
+
+
+def describe_function(key: str, spec) -> str:
+    """One prompt line for a function: `- module.function(signature): first docstring line`."""
+    doc = (spec.doc or "").strip().splitlines()
+    return f"- {key}{spec.signature}" + (f": {doc[0].strip()}" if doc else "")
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class HashingEmbedder:
+    """
+    Deterministic stand-in for an embedding model.
+
+    Words and their character trigrams are hashed into a fixed number of
+    signed buckets. No model or network is needed and the same text always
+    gives the same vector, which makes it suitable for tests and as a
+    fallback when the Ollama embedding model is not available.
+    """
+
+    def __init__(self, dimensions: int = HASHING_DIMENSIONS):
+        self.dimensions = dimensions
+        self.name = f"hashing:{dimensions}"
+
+    def vector(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        words = TOKEN_PATTERN.findall(text.lower())
+        features = words + [w[i:i + 3] for w in words if len(w) > 3 for i in range(len(w) - 2)]
+        for feature in features:
+            digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+            index = int.from_bytes(digest[:4], "little") % self.dimensions
+            vector[index] += 1.0 if digest[4] & 1 else -1.0
+        return vector
+
+    async def embed(self, texts) -> np.ndarray:
+        return np.stack([self.vector(text) for text in texts])
+
+
+class OllamaEmbedder:
+    """Embeddings from a local Ollama embedding model."""
+
+    def __init__(self, model: str = EMBEDDING_MODEL):
+        self.model = model
+        self.name = f"ollama:{model}"
+
+    async def embed(self, texts) -> np.ndarray:
+        return np.asarray(await ollama_client.embed(self.model, list(texts)), dtype=np.float32)
+
+
+class FunctionIndex:
+    """
+    Cosine-similarity index over every exposed module function.
+
+    Each function's name, signature and docstring is embedded once; vectors
+    are cached by (function, text), so after a module changes only its new or
+    edited functions are embedded again. search() embeds the user's message
+    and returns the k closest functions, which keeps the routing prompt the
+    same size however many modules exist.
+    """
+
+    def __init__(self, registry, embedder=None):
+        self.registry = registry
+        self.embedder = embedder or (OllamaEmbedder() if EMBEDDING_BACKEND == "ollama" else HashingEmbedder())
+        self.cache = {}  # (key, text) -> vector
+        self.keys = []
+        self.specs = {}
+        self.matrix = None
+
+    async def refresh(self):
+        """Bring the index in line with the registry, embedding only new or changed functions."""
+        specs = {
+            f"{module}.{name}": spec
+            for module, functions in self.registry.specs().items()
+            for name, spec in functions.items()
+        }
+        texts = {key: function_text(key, spec) for key, spec in specs.items()}
+        keys = sorted(texts)
+        if keys == self.keys and all((key, texts[key]) in self.cache for key in keys):
+            self.specs = specs
+            return
+
+        missing = [key for key in keys if (key, texts[key]) not in self.cache]
+        if missing:
+            started = time.monotonic()
+            vectors = await self._embed([texts[key] for key in missing])
+            if vectors is None:
+                # The embedder was replaced: every function has to be embedded again
+                missing = keys
+                vectors = await self._embed([texts[key] for key in keys])
+            for key, vector in zip(missing, vectors):
+                self.cache[(key, texts[key])] = vector
+            logging.info(f"🧭 Embedded {len(missing)} functions with {self.embedder.name} "
+                         f"in {time.monotonic() - started:.2f}s")
+
+        current = {(key, texts[key]) for key in keys}
+        self.cache = {item: vector for item, vector in self.cache.items() if item in current}
+        self.keys = keys
+        self.specs = specs
+        self.matrix = _normalize(np.stack([self.cache[(key, texts[key])] for key in keys])) if keys else None
+
+    async def _embed(self, texts):
+        """Embed texts; on failure switch to the hashing embedder and return None."""
+        try:
+            return await self.embedder.embed(texts)
+        except Exception as e:
+            if isinstance(self.embedder, HashingEmbedder):
+                raise
+            logging.warning(f"⚠️ Embedding with {self.embedder.name} failed ({e}), using the hashing embedder")
+            self.embedder = HashingEmbedder()
+            self.cache.clear()
+            return None
+
+    async def search(self, query: str, k: int = ROUTER_TOP_K) -> list:
+        """Return [(module.function, cosine score)] for the k functions closest to the query."""
+        await self.refresh()
+        if self.matrix is None:
+            return []
+        vectors = await self._embed([query])
+        if vectors is None:
+            await self.refresh()
+            vectors = await self._embed([query])
+        scores = self.matrix @ _normalize(vectors)[0]
+        k = min(k, len(self.keys))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self.keys[i], float(scores[i])) for i in top]
+
+    async def relevant(self, query: str, k: int = ROUTER_TOP_K, pinned=PINNED_FUNCTIONS) -> dict:
+        """{"module.function": FunctionSpec} of the k most relevant functions plus the pinned ones."""
+        keys = [key for key, _ in await self.search(query, k)]
+        keys += [key for key in pinned if key in self.specs and key not in keys]
+        return {key: self.specs[key] for key in keys}
+
+    async def relevant_functions(self, query: str, k: int = ROUTER_TOP_K, pinned=PINNED_FUNCTIONS) -> str:
+        """Prompt section listing the pinned functions plus the k most relevant ones."""
+        specs = await self.relevant(query, k, pinned)
+        return "\n".join(describe_function(key, spec) for key, spec in specs.items())
+
+
+_indexes = {}
+
+
+def get_function_index(modules_path="modules") -> FunctionIndex:
+    """Return the shared FunctionIndex for a modules directory."""
+    registry = get_registry(modules_path)
+    index = _indexes.get(id(registry))
+    if index is None:
+        index = _indexes[id(registry)] = FunctionIndex(registry)
+    return index
+
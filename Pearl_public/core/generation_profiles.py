@@ -0,0 +1,119 @@
+import logging
+from collections import deque
+
+from config.ollama_settings import GENERATION_PROFILES, PROFILE_METRIC_SAMPLES, MIN_TOKENS_PER_SECOND
+
+# Profile keys that are request parameters rather than Ollama options
+REQUEST_KEYS = {"model", "keep_alive"}
+
+
+def get_profile(name: str) -> dict:
+    """The named profile from GENERATION_PROFILES ({} with a warning when it does not exist)."""
+    profile = GENERATION_PROFILES.get(name)
+    if profile is None:
+        logging.warning(f"⚠️ Unknown generation profile {name!r}, using Ollama defaults")
+        return {}
+    return profile
+
+
+def profile_model(name: str) -> str:
+    return get_profile(name).get("model", "llama3.2")
+
+
+def profile_options(name: str, options: dict = None) -> dict:
+    """The profile's Ollama options, overridden by the ones passed explicitly."""
+    merged = dict(options or {})
+    for key, value in get_profile(name).items():
+        if key not in REQUEST_KEYS:
+            merged.setdefault(key, value)
+    return merged
+
+
+def apply_profile(name: str, kwargs: dict) -> dict:
+    """
+    Generation keyword arguments with the profile's keep_alive and options filled in.
+
+    Values the caller passed explicitly (including single options) win over the profile.
+    """
+    profile = get_profile(name)
+    request = dict(kwargs)
+    if "keep_alive" in profile:
+        request.setdefault("keep_alive", profile["keep_alive"])
+    request["options"] = profile_options(name, request.get("options"))
+    return request
+
+
+def profile_min_timeout(name: str) -> float:
+    """Seconds a full generation may take: num_predict tokens at MIN_TOKENS_PER_SECOND (0 without num_predict)."""
+    num_predict = get_profile(name).get("num_predict")
+    if not num_predict or num_predict < 0:
+        return 0.0
+    return num_predict / MIN_TOKENS_PER_SECOND
+
+
+def num_ctx_conflicts() -> dict:
+    """{model: {num_ctx values}} for models whose profiles disagree on num_ctx (each switch reloads the model)."""
+    sizes = {}
+    for profile in GENERATION_PROFILES.values():
+        if "num_ctx" in profile:
+            sizes.setdefault(profile.get("model"), set()).add(profile["num_ctx"])
+    return {model: values for model, values in sizes.items() if len(values) > 1}
+
+
+def _percentile(values, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+class ProfileStats:
+    """
+    Measured latency and generation speed per profile.
+
+    Complete generations report Ollama's own counters (eval_count and
+    eval_duration for output tokens/sec, prompt_eval_count for the prompt).
+    Streams stopped early have no final counters; for them each streamed part
+    counts as one token and the time since the first part is used instead.
+    """
+
+    def __init__(self, samples: int = PROFILE_METRIC_SAMPLES):
+        self.samples = samples
+        self.metrics = {}
+
+    def _add(self, name: str, latency: float, output_tokens: int, tokens_per_second, prompt_tokens=None):
+        self.metrics.setdefault(name, deque(maxlen=self.samples)).append(
+            (latency, output_tokens, tokens_per_second, prompt_tokens)
+        )
+
+    def record(self, name: str, response, latency: float):
+        """Record a finished generation (non-streamed response or final stream part)."""
+        output_tokens = response.get("eval_count") or 0
+        eval_seconds = (response.get("eval_duration") or 0) / 1e9
+        tokens_per_second = output_tokens / eval_seconds if eval_seconds else None
+        self._add(name, latency, output_tokens, tokens_per_second, response.get("prompt_eval_count"))
+
+    def record_partial(self, name: str, parts: int, latency: float, streaming_seconds: float):
+        """Record a stream that was closed before its final part."""
+        tokens_per_second = parts / streaming_seconds if streaming_seconds > 0 else None
+        self._add(name, latency, parts, tokens_per_second)
+
+    def report(self) -> dict:
+        """Per profile: calls, latency mean/p95 (s), output tokens mean, tokens/sec mean, prompt tokens mean."""
+        report = {}
+        for name, samples in self.metrics.items():
+            latencies = [s[0] for s in samples]
+            speeds = [s[2] for s in samples if s[2]]
+            prompts = [s[3] for s in samples if s[3] is not None]
+            report[name] = {
+                "calls": len(samples),
+                "latency_mean": sum(latencies) / len(latencies),
+                "latency_p95": _percentile(latencies, 0.95),
+                "output_tokens_mean": sum(s[1] for s in samples) / len(samples),
+                "tokens_per_second": sum(speeds) / len(speeds) if speeds else None,
+                "prompt_tokens_mean": sum(prompts) / len(prompts) if prompts else None,
+            }
+        return report
+
+
+# Shared measurements; ollama_client records every generation made with a profile
+profile_stats = ProfileStats()
+
@@ -0,0 +1,186 @@
+import logging
+import re
+import time
+from collections import deque
+
+from core.learning import store_routed_inputs, retrieve_routed_inputs
+from core.modules_loader import available_functions, get_registry
+from core.tool_calls import typed_arguments, ToolCallError
+from core.offload import run_cpu
+from core.function_executor import background_executor
+from config.router_settings import (
+    ROUTING_RULES,
+    INTENT_CONFIDENCE,
+    INTENT_MIN_SAMPLES,
+    INTENT_RETRAIN_EVERY,
+)
+
+# Label for messages the LLM answered in text; never taken by the fast path
+CHAT_ROUTE = "chat"
+
+FILLER_PATTERN = re.compile(r"^(hey |hi |ok |okay )?(pearl)?[, ]*|[, ]*(please|pearl|thanks)?[.!? ]*$")
+
+
+def normalize_message(text: str) -> str:
+    """Lowercase a message and strip greetings, 'please' and trailing punctuation."""
+    return FILLER_PATTERN.sub("", text.strip().lower()).strip()
+
+
+def train_intent_model(texts, labels):
+    """Fit a character n-gram TF-IDF + logistic regression classifier (runs in a worker process)."""
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.pipeline import make_pipeline
+
+    model = make_pipeline(
+        TfidfVectorizer(analyzer="char_wb", ngram_range=(2, 4), sublinear_tf=True),
+        LogisticRegression(max_iter=1000, C=5.0),
+    )
+    model.fit(texts, labels)
+    return model
+
+
+class IntentRouter:
+    """
+    Local fast path in front of the LLM router.
+
+    Compiled regex rules catch obvious commands ("pause", "next song"), with
+    arguments taken from their named groups ("volume 40" -> {"volume": 40}); a
+    small sklearn model trained on the routes the LLM chose before (stored in
+    learning.db) catches the rest when it is confident. Anything else returns
+    None and goes to the LLM, whose decision is recorded as new training data.
+    Decisions are written to learning.db in batches and the model is trained
+    on the background lane (background_executor), so neither the reply nor the
+    command workers wait for sqlite or sklearn.
+    """
+
+    def __init__(self, rules=ROUTING_RULES, confidence: float = INTENT_CONFIDENCE):
+        self.rules = [(re.compile(pattern, re.IGNORECASE), route) for pattern, route in rules]
+        self.confidence = confidence
+        self.model = None
+        self.trained_on = 0
+        self.new_routes = 0
+        self.training = False
+        self.pending = []  # (chat_id, text, route) not written to learning.db yet
+        self.storing = False
+        self.messages = 0
+        self.routes = {}  # route -> {"rule": hits, "model": hits, "latency": summed routing seconds}
+        self.llm_latency = deque(maxlen=200)
+
+    @staticmethod
+    def _exposed(route: str) -> bool:
+        module_name, _, function_name = route.partition(".")
+        return function_name in available_functions().get(module_name, [])
+
+    @staticmethod
+    def _arguments(route: str, match):
+        """The rule's named groups converted to the function's parameter types; None if they do not fit."""
+        captured = {name: value for name, value in match.groupdict().items() if value is not None}
+        if not captured:
+            return {}
+        module_name, _, function_name = route.partition(".")
+        spec = get_registry().specs().get(module_name, {}).get(function_name)
+        try:
+            return typed_arguments(route, captured, spec)
+        except (ToolCallError, AttributeError) as e:
+            logging.warning(f"⚠️ Routing rule for {route} captured unusable arguments {captured}: {e}")
+            return None
+
+    def route(self, text: str):
+        """
+        Return (route, source, confidence, arguments) for a confidently recognised command, else None.
+
+        source is "rule" or "model"; route is "module.function"; arguments
+        are the rule's captured values ({} for the model).
+        """
+        self.messages += 1
+        message = normalize_message(text)
+        for pattern, route in self.rules:
+            match = pattern.search(message)
+            if match and self._exposed(route):
+                arguments = self._arguments(route, match)
+                if arguments is not None:
+                    return route, "rule", 1.0, arguments
+
+        if self.model is not None and message:
+            probabilities = self.model.predict_proba([message])[0]
+            best = probabilities.argmax()
+            route = self.model.classes_[best]
+            if probabilities[best] >= self.confidence and route != CHAT_ROUTE and self._exposed(route):
+                return route, "model", float(probabilities[best]), {}
+        return None
+
+    def record_hit(self, route: str, source: str, latency: float):
+        """Count a fast-path dispatch and how long the routing decision took."""
+        stats = self.routes.setdefault(route, {"rule": 0, "model": 0, "latency": 0.0})
+        stats[source] += 1
+        stats["latency"] += latency
+
+    def record_llm(self, chat_id, text: str, route: str, latency: float):
+        """Queue the LLM's routing decision as training data; it is stored in the background."""
+        self.llm_latency.append(latency)
+        self.pending.append((chat_id, text, route))
+        if not self.storing:
+            self.storing = True
+            background_executor.submit_call("store_routes", self.flush)
+
+    async def flush(self, retrain: bool = True):
+        """Write the queued routing decisions in one batch, then retrain when enough is new."""
+        try:
+            while self.pending:
+                rows = self.pending[:]
+                try:
+                    await store_routed_inputs(rows)
+                    self.new_routes += len(rows)
+                except Exception as e:
+                    logging.error(f"Error storing routed inputs: {e}")
+                # Only dropped once written (or failed), so a cancelled flush leaves them queued
+                del self.pending[:len(rows)]
+        finally:
+            self.storing = False
+        if retrain and self.new_routes >= INTENT_RETRAIN_EVERY and not self.training:
+            self.training = True
+            self.new_routes = 0
+            background_executor.submit_call("train_intent_model", self.train)
+
+    async def train(self):
+        """(Re)train the intent model from every recorded route."""
+        self.training = True
+        try:
+            rows = await retrieve_routed_inputs()
+            labels = [route for _, route in rows]
+            if len(rows) < INTENT_MIN_SAMPLES or len(set(labels)) < 2:
+                logging.info(f"🧭 Intent model not trained yet ({len(rows)} routed messages recorded)")
+                return
+            texts = [normalize_message(text) for text, _ in rows]
+            self.model = await run_cpu(train_intent_model, texts, labels)
+            self.trained_on = len(rows)
+            logging.info(f"🧭 Intent model trained on {len(rows)} messages, {len(set(labels))} routes")
+        except Exception as e:
+            logging.warning(f"⚠️ Intent model training failed: {e}")
+        finally:
+            self.training = False
+
+    def report(self) -> dict:
+        """Per-route fast-path hits and hit rates, and the routing time saved versus the LLM."""
+        llm_mean = sum(self.llm_latency) / len(self.llm_latency) if self.llm_latency else 0.0
+        report = {}
+        for route, stats in self.routes.items():
+            hits = stats["rule"] + stats["model"]
+            report[route] = {
+                "rule_hits": stats["rule"],
+                "model_hits": stats["model"],
+                "hit_rate": hits / self.messages if self.messages else 0.0,
+                "seconds_saved": max(0.0, hits * llm_mean - stats["latency"]),
+            }
+        return {
+            "messages": self.messages,
+            "fast_path": sum(s["rule"] + s["model"] for s in self.routes.values()),
+            "llm_routing_mean": llm_mean,
+            "model_trained_on": self.trained_on,
+            "routes": report,
+        }
+
+
+# Shared router used by core/command_handler.py
+intent_router = IntentRouter()
@@ -9,6 +9,7 @@ DATABASE_NAME = "learning.db"
 async def init_learning_db():
     """
     Creates (if needed) a table for storing user input.
+    The route column holds the module.function (or "chat") the input was routed to.
     """
     async with aiosqlite.connect(DATABASE_NAME) as db:
         await db.execute("""
@@ -16,27 +17,48 @@ async def init_learning_db():
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 chat_id INTEGER,
                 user_input TEXT,
-                timestamp TEXT
+                timestamp TEXT,
+                route TEXT
             )
         """)
+        # Databases created before the route column existed
+        async with db.execute("PRAGMA table_info(user_knowledge)") as cursor:
+            columns = [row[1] async for row in cursor]
+        if "route" not in columns:
+            await db.execute("ALTER TABLE user_knowledge ADD COLUMN route TEXT")
         await db.commit()
 
-async def store_user_input(chat_id: int, text: str):
+async def store_user_input(chat_id: int, text: str, route: str = None):
     """
-    Store the user's input text into the user_knowledge table.
+    Store the user's input text into the user_knowledge table,
+    optionally with the route it was given (module.function or "chat").
     """
     try:
         timestamp = datetime.datetime.now().isoformat()
         async with aiosqlite.connect(DATABASE_NAME) as db:
             await db.execute(
-                "INSERT INTO user_knowledge (chat_id, user_input, timestamp) VALUES (?, ?, ?)",
-                (chat_id, text, timestamp)
+                "INSERT INTO user_knowledge (chat_id, user_input, timestamp, route) VALUES (?, ?, ?, ?)",
+                (chat_id, text, timestamp, route)
             )
             await db.commit()
         logging.info(f"Learning module: Stored user input -> {text}")
     except Exception as e:
         logging.error(f"Error storing user input: {e}")
 
+async def store_routed_inputs(rows):
+    """
+    Store several (chat_id, text, route) rows in one transaction.
+    Used by the intent router, which batches its routing decisions.
+    """
+    timestamp = datetime.datetime.now().isoformat()
+    async with aiosqlite.connect(DATABASE_NAME) as db:
+        await db.executemany(
+            "INSERT INTO user_knowledge (chat_id, user_input, timestamp, route) VALUES (?, ?, ?, ?)",
+            [(chat_id, text, timestamp, route) for chat_id, text, route in rows]
+        )
+        await db.commit()
+    logging.info(f"Learning module: Stored {len(rows)} routed inputs")
+
 async def retrieve_all_user_input(chat_id: int):
     """
     Retrieve ALL user input stored for the given chat_id.
@@ -66,3 +88,17 @@ async def retrieve_recent_user_input(chat_id: int, limit: int = 5):
                 rows.append(row)
     # Because we used DESC in the query, reverse rows so the oldest is first
     return list(reversed(rows))
+
+async def retrieve_routed_inputs():
+    """
+    Retrieve (user_input, route) for every input with a recorded route, oldest first.
+    Used to train the intent router.
+    """
+    rows = []
+    async with aiosqlite.connect(DATABASE_NAME) as db:
+        async with db.execute(
+            "SELECT user_input, route FROM user_knowledge WHERE route IS NOT NULL ORDER BY id ASC"
+        ) as cursor:
+            async for row in cursor:
+                rows.append(row)
+    return rows
@@ -0,0 +1,154 @@
+import hashlib
+import json
+import logging
+import re
+import time
+import unicodedata
+from collections import OrderedDict
+
+import aiosqlite
+
+from config.cache_settings import CACHE_DATABASE, CACHE_MEMORY_ENTRIES, CACHE_TTLS, TIME_SENSITIVE_WORDS
+
+WHITESPACE_PATTERN = re.compile(r"\s+")
+TIME_SENSITIVE_PATTERN = re.compile(
+    r"\b(" + "|".join(re.escape(word) for word in TIME_SENSITIVE_WORDS) + r")\b", re.IGNORECASE
+)
+
+
+def normalize_prompt(text: str) -> str:
+    """Canonical form of a prompt: Unicode NFKC, case-folded, whitespace collapsed."""
+    text = unicodedata.normalize("NFKC", text).casefold()
+    return WHITESPACE_PATTERN.sub(" ", text).strip()
+
+
+def cache_key(model: str, prompt: str, options: dict = None) -> str:
+    """Key for (model, normalised prompt, generation options)."""
+    material = json.dumps([model, normalize_prompt(prompt), options or {}], sort_keys=True, default=str)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+def is_time_sensitive(prompt: str) -> bool:
+    """True when the prompt refers to the current time, so its answer must not be reused."""
+    return bool(TIME_SENSITIVE_PATTERN.search(prompt))
+
+
+class ResponseCache:
+    """
+    Cache of LLM responses in front of ask_ollama.
+
+    Lookups hit an in-memory LRU first, then the SQLite store, which survives
+    restarts. Every entry expires after the TTL of the call site that stored
+    it (CACHE_TTLS). Each entry remembers how long the model took to produce
+    it, so hits add up to the GPU time the cache saved.
+    """
+
+    def __init__(self, database: str = CACHE_DATABASE, memory_entries: int = CACHE_MEMORY_ENTRIES,
+                 ttls: dict = None):
+        self.database = database
+        self.memory_entries = memory_entries
+        self.ttls = CACHE_TTLS if ttls is None else ttls
+        self.memory = OrderedDict()  # key -> (response, expires_at, generation_seconds)
+        self.counters = {"hits": 0, "memory_hits": 0, "disk_hits": 0, "misses": 0, "bypassed": 0, "stored": 0,
+                         "stale_hits": 0}
+        self.gpu_seconds_saved = 0.0
+
+    async def init_db(self):
+        """Create the cache table and drop expired rows."""
+        async with aiosqlite.connect(self.database) as db:
+            await db.execute("""
+                CREATE TABLE IF NOT EXISTS llm_cache (
+                    key TEXT PRIMARY KEY,
+                    site TEXT,
+                    model TEXT,
+                    response TEXT,
+                    expires_at REAL,
+                    generation_seconds REAL
+                )
+            """)
+            await db.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (time.time(),))
+            await db.commit()
+
+    def cacheable(self, site: str, prompt: str) -> bool:
+        """Whether a call from `site` with this prompt may use the cache."""
+        if not site or site not in self.ttls:
+            return False
+        if is_time_sensitive(prompt):
+            self.counters["bypassed"] += 1
+            logging.debug(f"Cache bypassed for time-dependent prompt ({site})")
+            return False
+        return True
+
+    async def get(self, key: str, allow_expired: bool = False):
+        """
+        Return the cached response for a key, or None.
+
+        allow_expired=True also returns entries past their TTL (kept until the
+        next restart), for answering while the model is unavailable.
+        """
+        now = 0.0 if allow_expired else time.time()
+        entry = self.memory.get(key)
+        if entry is not None:
+            if entry[1] > now:
+                self.memory.move_to_end(key)
+                return self._hit(entry, "stale_hits" if allow_expired else "memory_hits")
+            del self.memory[key]
+
+        try:
+            async with aiosqlite.connect(self.database) as db:
+                async with db.execute(
+                    "SELECT response, expires_at, generation_seconds FROM llm_cache WHERE key=? AND expires_at>?",
+                    (key, now),
+                ) as cursor:
+                    row = await cursor.fetchone()
+        except Exception as e:
+            logging.warning(f"⚠️ LLM cache read failed: {e}")
+            row = None
+
+        if row is None:
+            self.counters["misses"] += 1
+            return None
+        self._remember(key, tuple(row))
+        return self._hit(row, "stale_hits" if allow_expired else "disk_hits")
+
+    async def put(self, key: str, site: str, model: str, response: str, generation_seconds: float = 0.0):
+        """Store a response under the TTL of its call site."""
+        expires_at = time.time() + self.ttls.get(site, 0)
+        self._remember(key, (response, expires_at, generation_seconds))
+        self.counters["stored"] += 1
+        try:
+            async with aiosqlite.connect(self.database) as db:
+                await db.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, site, model, response, expires_at, generation_seconds) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, site, model, response, expires_at, generation_seconds),
+                )
+                await db.commit()
+        except Exception as e:
+            logging.warning(f"⚠️ LLM cache write failed: {e}")
+
+    def _remember(self, key, entry):
+        self.memory[key] = entry
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_entries:
+            self.memory.popitem(last=False)
+
+    def _hit(self, entry, counter):
+        self.counters["hits"] += 1
+        self.counters[counter] += 1
+        self.gpu_seconds_saved += entry[2] or 0.0
+        return entry[0]
+
+    def stats(self) -> dict:
+        """Hit/miss counters, hit rate and GPU seconds saved so far."""
+        lookups = self.counters["hits"] + self.counters["misses"]
+        return {
+            **self.counters,
+            "hit_rate": self.counters["hits"] / lookups if lookups else 0.0,
+            "gpu_seconds_saved": round(self.gpu_seconds_saved, 2),
+            "memory_entries": len(self.memory),
+        }
+
+
+# Shared cache used by ask_ollama
+response_cache = ResponseCache()
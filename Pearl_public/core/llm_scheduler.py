@@ -0,0 +1,132 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+
+from config.ollama_settings import (
+    MAX_GENERATIONS,
+    INTERACTIVE_RESERVED,
+    MODEL_CONCURRENCY,
+    DEFAULT_MODEL_CONCURRENCY,
+    SCHEDULER_WAIT_SAMPLES,
+    SLOW_WAIT_SECONDS,
+)
+
+# Priority classes, lower numbers are served first
+LLM_INTERACTIVE = 0  # Replies the user is waiting for
+LLM_REMINDER = 1     # Scheduled messages (greetings, reminder text)
+LLM_SUMMARY = 2      # Background summarisation (page summaries, research, memory)
+LLM_CODEGEN = 3      # Code generation for self_editor
+
+PRIORITY_NAMES = {
+    LLM_INTERACTIVE: "interactive",
+    LLM_REMINDER: "reminder",
+    LLM_SUMMARY: "summary",
+    LLM_CODEGEN: "codegen",
+}
+
+
+class LLMScheduler:
+    """
+    Admission control for generations on the local Ollama server.
+
+    A generation runs once both its model (MODEL_CONCURRENCY) and the server
+    as a whole (MAX_GENERATIONS) have a free slot. Waiting requests are
+    admitted in priority order, FIFO within a class; a request whose model is
+    full does not hold up requests for other models. INTERACTIVE_RESERVED
+    slots are kept for interactive requests, so a reply never queues behind
+    summaries or a 13B code generation. Queue waits are recorded per class.
+    """
+
+    def __init__(self, max_generations: int = MAX_GENERATIONS, reserved: int = INTERACTIVE_RESERVED,
+                 model_limits: dict = None, default_limit: int = DEFAULT_MODEL_CONCURRENCY):
+        self.max_generations = max_generations
+        self.reserved = reserved
+        self.model_limits = MODEL_CONCURRENCY if model_limits is None else model_limits
+        self.default_limit = default_limit
+        self.total = 0
+        self.running = {}
+        self.waiting = []
+        self._seq = itertools.count()
+        self.waits = {}
+
+    def _can_run(self, model: str, priority: int) -> bool:
+        limit = self.max_generations if priority == LLM_INTERACTIVE else self.max_generations - self.reserved
+        return self.total < limit and self.running.get(model, 0) < self.model_limits.get(model, self.default_limit)
+
+    def _take(self, model: str):
+        self.total += 1
+        self.running[model] = self.running.get(model, 0) + 1
+
+    def _release(self, model: str):
+        self.total -= 1
+        self.running[model] -= 1
+        if not self.running[model]:
+            del self.running[model]
+        self._dispatch()
+
+    def _dispatch(self):
+        """Admit every waiting request that fits, highest priority first."""
+        blocked = []
+        while self.waiting:
+            entry = heapq.heappop(self.waiting)
+            priority, _, model, future = entry
+            if future.done():
+                continue  # Cancelled while waiting
+            if self._can_run(model, priority):
+                self._take(model)
+                future.set_result(None)
+            else:
+                blocked.append(entry)
+        for entry in blocked:
+            heapq.heappush(self.waiting, entry)
+
+    @asynccontextmanager
+    async def slot(self, model: str, priority: int = LLM_INTERACTIVE):
+        """Hold a generation slot for `model` for the duration of the block."""
+        started = time.monotonic()
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self.waiting, (priority, next(self._seq), model, future))
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Admitted just before the cancellation arrived
+                self._release(model)
+            else:
+                future.cancel()
+            raise
+
+        self._record(model, priority, time.monotonic() - started)
+        try:
+            yield
+        finally:
+            self._release(model)
+
+    def _record(self, model: str, priority: int, wait: float):
+        name = PRIORITY_NAMES.get(priority, str(priority))
+        self.waits.setdefault(name, deque(maxlen=SCHEDULER_WAIT_SAMPLES)).append(wait)
+        if wait >= SLOW_WAIT_SECONDS:
+            logging.info(f"⏳ {name} request for {model} waited {wait:.2f}s for a generation slot")
+
+    def report(self) -> dict:
+        """Queue-wait statistics (seconds) per priority class, plus current load."""
+        report = {"running": dict(self.running), "queued": sum(1 for e in self.waiting if not e[3].done())}
+        for name, samples in self.waits.items():
+            waits = sorted(samples)
+            report[name] = {
+                "requests": len(waits),
+                "wait_mean": sum(waits) / len(waits),
+                "wait_p95": waits[min(len(waits) - 1, int(len(waits) * 0.95))],
+                "wait_max": waits[-1],
+            }
+        return report
+
+
+# Shared scheduler; every generation in ollama_client goes through it
+llm_scheduler = LLMScheduler()
+
@@ -0,0 +1,205 @@
+import asyncio
+import logging
+import time
+
+import psutil
+
+from config.ollama_settings import (
+    KEEP_ALIVE,
+    PRELOAD_PROFILES,
+    PINNED_MODELS,
+    PIN_KEEP_ALIVE,
+    MODEL_MEMORY_GB,
+    MEMORY_HEADROOM_GB,
+    HEAVY_MODEL_WAIT,
+    RESIDENCY_CHECK_INTERVAL,
+    LOAD_SECONDS_THRESHOLD,
+)
+from core.generation_profiles import profile_model, apply_profile
+from core.llm_scheduler import llm_scheduler, LLM_SUMMARY
+from core.ollama_pool import normalize_model
+
+GB = 1024 ** 3
+MEMORY_POLL_SECONDS = 5
+
+
+class ModelMemoryError(RuntimeError):
+    """A heavy model could not be loaded because not enough memory became available."""
+
+
+class ModelResidency:
+    """
+    Keep the interactive model loaded and load heavy models only when they fit.
+
+    At startup the PRELOAD_PROFILES models are loaded in the background (an
+    empty prompt makes Ollama load a model without generating) with the
+    profile's num_ctx and keep_alive, so the first message does not pay for
+    the load. Loads and unloads take a scheduler slot like any generation and
+    reach every node of the backend pool serving the model. PINNED_MODELS are
+    never unloaded to make room and are re-loaded when Ollama dropped them;
+    when PIN_KEEP_ALIVE is set, every request to them uses it instead of the
+    profile's keep_alive. Before a request to a model listed in
+    MODEL_MEMORY_GB that is not loaded yet, idle unpinned models are unloaded
+    if RAM is short, and the request waits until the model fits. Every
+    response's load_duration is recorded, so model loads and their cost show
+    up in the report.
+    """
+
+    def __init__(self):
+        self.loads = {}
+        self.locks = {}
+        self.task = None
+
+    def request_kwargs(self, model: str, kwargs: dict) -> dict:
+        """Generation kwargs with PIN_KEEP_ALIVE for pinned models, when one is set."""
+        if PIN_KEEP_ALIVE is not None and normalize_model(model) in {normalize_model(m) for m in PINNED_MODELS}:
+            return {**kwargs, "keep_alive": PIN_KEEP_ALIVE}
+        return kwargs
+
+    def observe(self, model: str, response):
+        """Record the load time of a finished generation when it had to load the model."""
+        seconds = (response.get("load_duration") or 0) / 1e9
+        if seconds >= LOAD_SECONDS_THRESHOLD:
+            self.loads.setdefault(normalize_model(model), []).append(seconds)
+            logging.info(f"📦 {model} was loaded for a request ({seconds:.2f}s)")
+
+    async def resident_models(self) -> list:
+        """Models Ollama currently holds in memory (GET /api/ps)."""
+        from core import ollama_client
+
+        response = await ollama_client.get_client().ps()
+        return [
+            {
+                "model": m["model"],
+                "size_gb": round((m["size"] or 0) / GB, 2),
+                "expires_at": m["expires_at"].isoformat() if m["expires_at"] else None,
+            }
+            for m in response["models"]
+        ]
+
+    async def _set_keep_alive(self, model: str, keep_alive, options: dict = None, priority: int = LLM_SUMMARY):
+        """
+        Load (or, with keep_alive=0, unload) a model without generating anything.
+
+        Returns the longest load time of the nodes in seconds.
+
+        Raises:
+            Exception: the first node's error when no node could do it.
+        """
+        from core import ollama_client
+
+        def call(client):
+            return client.generate(model=model, prompt="", keep_alive=keep_alive, options=options)
+
+        async with llm_scheduler.slot(model, priority):
+            if ollama_client.backend_pool.enabled:
+                results = await ollama_client.backend_pool.broadcast(model, call)
+            else:
+                results = [await call(ollama_client.get_client())]
+        responses = [r for r in results if not isinstance(r, BaseException)]
+        if not responses:
+            raise results[0] if results else LookupError(f"No Ollama backend serves {model}")
+        for result in results:
+            if isinstance(result, BaseException):
+                logging.warning(f"⚠️ Could not set keep_alive {keep_alive} for {model} on every node: {result}")
+        return max((r.get("load_duration") or 0) / 1e9 for r in responses)
+
+    async def preload(self, profile: str) -> float:
+        """Load a profile's model with the profile's options and keep_alive; returns the load time in seconds."""
+        model = profile_model(profile)
+        request = self.request_kwargs(model, apply_profile(profile, {}))
+        keep_alive = request.get("keep_alive", KEEP_ALIVE)
+        seconds = await self._set_keep_alive(model, keep_alive, request["options"])
+        if seconds >= LOAD_SECONDS_THRESHOLD:
+            self.loads.setdefault(normalize_model(model), []).append(seconds)
+        logging.info(f"📦 Preloaded {model} for '{profile}' in {seconds:.2f}s (keep_alive {keep_alive})")
+        return seconds
+
+    async def reserve_memory(self, model: str, priority: int = LLM_SUMMARY):
+        """
+        Wait until a heavy model can be loaded. Models not in MODEL_MEMORY_GB,
+        and models already loaded, pass straight through. Idle models are
+        unloaded at the priority of the request waiting for the memory.
+
+        Raises:
+            ModelMemoryError: if the model still does not fit after HEAVY_MODEL_WAIT seconds.
+        """
+        required = MODEL_MEMORY_GB.get(model)
+        if required is None:
+            return
+        async with self.locks.setdefault(model, asyncio.Lock()):
+            deadline = time.monotonic() + HEAVY_MODEL_WAIT
+            unloaded = False
+            while True:
+                resident = {normalize_model(m["model"]) for m in await self.resident_models()}
+                if normalize_model(model) in resident:
+                    return
+                available = psutil.virtual_memory().available / GB
+                if available >= required + MEMORY_HEADROOM_GB:
+                    return
+                if not unloaded:
+                    unloaded = True
+                    if await self._unload_idle(resident, exclude=model, priority=priority):
+                        continue
+                if time.monotonic() >= deadline:
+                    raise ModelMemoryError(
+                        f"{model} needs {required:.1f} GB but only {available:.1f} GB is available"
+                    )
+                logging.info(f"⏳ Waiting for memory to load {model}: {available:.1f}/{required:.1f} GB available")
+                await asyncio.sleep(MEMORY_POLL_SECONDS)
+
+    async def _unload_idle(self, resident: set, exclude: str, priority: int = LLM_SUMMARY) -> bool:
+        """Unload resident models that are neither pinned nor generating; True if any was unloaded."""
+        pinned = {normalize_model(m) for m in PINNED_MODELS}
+        busy = {normalize_model(m) for m in llm_scheduler.running}
+        idle = [m for m in resident if m not in pinned and m not in busy and m != normalize_model(exclude)]
+        for name in idle:
+            await self._set_keep_alive(name, 0, priority=priority)
+            logging.info(f"📤 Unloaded idle {name} to make room for {exclude}")
+        return bool(idle)
+
+    async def _keep_resident(self):
+        for profile in PRELOAD_PROFILES:
+            try:
+                await self.preload(profile)
+            except Exception as e:
+                logging.warning(f"⚠️ Could not preload the '{profile}' model: {e}")
+        try:
+            logging.info(f"📦 Resident models: {await self.resident_models()}")
+        except Exception as e:
+            logging.warning(f"⚠️ Could not list resident models: {e}")
+
+        pinned = {normalize_model(m) for m in PINNED_MODELS}
+        while True:
+            await asyncio.sleep(RESIDENCY_CHECK_INTERVAL)
+            try:
+                resident = {normalize_model(m["model"]) for m in await self.resident_models()}
+                for profile in PRELOAD_PROFILES:
+                    model = normalize_model(profile_model(profile))
+                    if model in pinned and model not in resident:
+                        logging.info(f"📦 Pinned {model} is no longer loaded, loading it again")
+                        await self.preload(profile)
+            except Exception as e:
+                logging.warning(f"⚠️ Model residency check failed: {e}")
+
+    def start(self):
+        """Preload in the background, then keep the pinned models loaded."""
+        if self.task is None:
+            self.task = asyncio.create_task(self._keep_resident())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+
+    def report(self) -> dict:
+        """Observed loads per model: count, last and mean load time (seconds)."""
+        return {
+            model: {"loads": len(times), "last_load_seconds": times[-1], "mean_load_seconds": sum(times) / len(times)}
+            for model, times in self.loads.items()
+        }
+
+
+# Shared manager; ollama_client consults it on every generation
+model_residency = ModelResidency()
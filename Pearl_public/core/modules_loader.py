@@ -1,4 +1,9 @@
 import os
+import sys
+import ast
+import time
+import hashlib
+import threading
 import importlib.util
 import logging
 import inspect
@@ -6,40 +11,309 @@ import inspect
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
-def available_functions(modules_path="modules"):
+# Minimum number of seconds between two directory scans triggered by queries.
+# Writers (e.g. self_editor) call refresh_file() so they never wait for this.
+SCAN_INTERVAL = 2.0
+
+
+class FunctionSpec:
+    """Description of one exposed function, obtained without running the module."""
+
+    def __init__(self, module, name, signature, doc, is_async, decorators=(), lineno=0):
+        self.module = module
+        self.name = name
+        self.signature = signature
+        self.doc = doc
+        self.is_async = is_async
+        self.decorators = list(decorators)
+        self.lineno = lineno
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "signature": f"{self.name}{self.signature}",
+            "doc": self.doc,
+            "async": self.is_async,
+        }
+
+
+class ModuleEntry:
+    """Cached state for a single file under the modules directory."""
+
+    def __init__(self, name, path, mtime_ns, size, digest, specs, module=None, stale=False):
+        self.name = name
+        self.path = path
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.digest = digest
+        self.specs = specs
+        self.module = module
+        # True when the file changed after a copy of it may have been imported
+        self.stale = stale
+
+    @property
+    def functions(self):
+        return list(self.specs)
+
+
+def parse_module_functions(module_name, source):
     """
-    Returns a dictionary of available modules and their user-defined functions.
-    Filters out non-user-defined functions and internal methods.
+    Statically list the public top-level functions of a module's source code.
+
+    Nothing is imported or executed: names, signatures, docstrings, async-ness
+    and decorator names all come from the AST.
+    """
+    tree = ast.parse(source)
+    specs = {}
+    for node in tree.body:
+        if not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            continue
+        if node.name.startswith("_"):
+            continue
+        signature = f"({ast.unparse(node.args)})"
+        if node.returns is not None:
+            signature += f" -> {ast.unparse(node.returns)}"
+        specs[node.name] = FunctionSpec(
+            module_name,
+            node.name,
+            signature,
+            ast.get_docstring(node) or "",
+            isinstance(node, ast.AsyncFunctionDef),
+            [ast.unparse(d) for d in node.decorator_list],
+            node.lineno,
+        )
+    return dict(sorted(specs.items()))
+
+
+class FunctionRegistry:
+    """
+    Persistent registry of the modules directory and its user-defined functions.
+
+    The directory is scanned once, then only files whose mtime/size changed are
+    hashed again, and only files whose content hash changed are parsed again.
+    With static discovery (the default) plugin code is never executed while
+    listing functions; a module is imported lazily by load() the first time one
+    of its functions runs, and re-executed only if its file changed since.
     """
-    functions_by_module = {}
 
-    if not os.path.exists(modules_path):
-        logger.error(f"❌ Modules directory '{modules_path}' not found.")
-        return functions_by_module
+    def __init__(self, modules_path="modules", scan_interval=SCAN_INTERVAL, static=True):
+        self.modules_path = modules_path
+        self.package = os.path.basename(os.path.normpath(modules_path))
+        self.scan_interval = scan_interval
+        self.static = static
+        self.entries = {}
+        self._snapshot = {}
+        self._last_scan = None
+        self._lock = threading.RLock()
+
+    def functions(self):
+        """Return {module: [functions]}, rescanning at most every scan_interval seconds."""
+        self._maybe_scan()
+        return dict(self._snapshot)
+
+    def specs(self):
+        """Return {module: {function: FunctionSpec}} for every module with exposed functions."""
+        self._maybe_scan()
+        return {name: self.entries[name].specs for name in self._snapshot}
+
+    def describe(self):
+        """Return a JSON-serialisable description of every exposed function."""
+        return {
+            module: [spec.to_dict() for spec in specs.values()]
+            for module, specs in self.specs().items()
+        }
+
+    def load(self, module_name):
+        """
+        Import a module on first use and return it.
+
+        Raises ModuleNotFoundError if the module is unknown or failed to load.
+        """
+        with self._lock:
+            entry = self.entries.get(module_name)
+            if entry is None:
+                self.scan()
+                entry = self.entries.get(module_name)
+            if entry is None:
+                raise ModuleNotFoundError(f"No module named '{self.package}.{module_name}'")
+            if entry.module is None:
+                entry.module = self._load_module(module_name, entry.path, reload=entry.stale)
+                if entry.module is None:
+                    raise ModuleNotFoundError(f"Module '{self.package}.{module_name}' failed to load")
+                entry.stale = False
+            return entry.module
+
+    def _maybe_scan(self):
+        if self._last_scan is None or time.monotonic() - self._last_scan >= self.scan_interval:
+            self.scan()
 
-    logger.info(f"Scanning for modules in '{modules_path}'...")
+    def scan(self):
+        """Stat every module file and rebuild only the entries that changed."""
+        with self._lock:
+            if not os.path.exists(self.modules_path):
+                logger.error(f"❌ Modules directory '{self.modules_path}' not found.")
+                self.entries.clear()
+                self._snapshot = {}
+                self._last_scan = time.monotonic()
+                return self._snapshot
 
-    for file in os.listdir(modules_path):
-        if file.endswith(".py") and file != "__init__.py":
-            module_name = os.path.splitext(file)[0]
-            module_path = os.path.join(modules_path, file)
+            first_scan = self._last_scan is None
+            if first_scan:
+                logger.info(f"Scanning for modules in '{self.modules_path}'...")
 
+            seen = set()
+            changed = False
+            with os.scandir(self.modules_path) as it:
+                for dir_entry in it:
+                    file = dir_entry.name
+                    if not file.endswith(".py") or file == "__init__.py":
+                        continue
+                    module_name = os.path.splitext(file)[0]
+                    seen.add(module_name)
+                    changed |= self._refresh_entry(module_name, dir_entry.path, dir_entry.stat())
+
+            for module_name in [name for name in self.entries if name not in seen]:
+                logger.info(f"🗑️ Module removed: {module_name}")
+                del self.entries[module_name]
+                changed = True
+
+            if changed or first_scan:
+                self._rebuild_snapshot()
+            self._last_scan = time.monotonic()
+            return self._snapshot
+
+    def refresh_file(self, path):
+        """Re-check a single module file immediately (used after writing it)."""
+        with self._lock:
+            module_name = os.path.splitext(os.path.basename(path))[0]
+            module_path = os.path.join(self.modules_path, os.path.basename(path))
+            if os.path.exists(module_path):
+                changed = self._refresh_entry(module_name, module_path, os.stat(module_path))
+            else:
+                changed = self.entries.pop(module_name, None) is not None
+            if changed:
+                self._rebuild_snapshot()
+            return self.entries.get(module_name)
+
+    def invalidate(self):
+        """Force the next query to rescan the directory."""
+        self._last_scan = None
+
+    def _refresh_entry(self, module_name, module_path, stat):
+        """Bring one entry up to date. Returns True if its function list may have changed."""
+        entry = self.entries.get(module_name)
+        if entry is not None and entry.mtime_ns == stat.st_mtime_ns and entry.size == stat.st_size:
+            return False
+
+        with open(module_path, "rb") as f:
+            source = f.read()
+        digest = hashlib.sha256(source).hexdigest()
+
+        if entry is not None and entry.digest == digest:
+            # Touched but not modified: keep the loaded module as is
+            entry.mtime_ns, entry.size = stat.st_mtime_ns, stat.st_size
+            return False
+
+        if self.static:
+            module = None
+            stale = entry is not None
+            if entry is None:
+                # Reuse a copy imported elsewhere before the registry first saw the file
+                existing = sys.modules.get(f"{self.package}.{module_name}")
+                if existing is not None and self._same_file(existing, module_path):
+                    module = existing
+            try:
+                specs = parse_module_functions(module_name, source)
+            except (SyntaxError, ValueError) as e:
+                logger.error(f"❌ Failed to parse module '{module_name}': {e}")
+                specs = {}
+        else:
+            module = self._load_module(module_name, module_path, reload=entry is not None)
+            specs = self._inspect_functions(module_name, module) if module is not None else {}
+            stale = False
+
+        self.entries[module_name] = ModuleEntry(
+            module_name, module_path, stat.st_mtime_ns, stat.st_size, digest, specs, module, stale
+        )
+        if specs:
+            action = "Discovered" if self.static else "Loaded"
+            logger.info(f"✅ {action} module: {module_name} | Functions: {list(specs)}")
+        return True
+
+    def _load_module(self, module_name, module_path, reload=False):
+        """Execute a module file, reusing an already imported copy unless it changed."""
+        qualified_name = f"{self.package}.{module_name}"
+        existing = sys.modules.get(qualified_name)
+        if existing is not None and not reload and self._same_file(existing, module_path):
+            return existing
+
+        try:
+            spec = importlib.util.spec_from_file_location(qualified_name, module_path)
+            module = importlib.util.module_from_spec(spec)
+            sys.modules[qualified_name] = module
+            spec.loader.exec_module(module)
+            return module
+        except Exception as e:
+            if existing is not None:
+                sys.modules[qualified_name] = existing
+            else:
+                sys.modules.pop(qualified_name, None)
+            logger.error(f"❌ Failed to load module '{module_name}': {e}")
+            return None
+
+    @staticmethod
+    def _same_file(module, module_path):
+        module_file = getattr(module, "__file__", None)
+        try:
+            return module_file is not None and os.path.samefile(module_file, module_path)
+        except OSError:
+            return False
+
+    @staticmethod
+    def _inspect_functions(module_name, module):
+        """Collect only user-defined functions in an executed module."""
+        specs = {}
+        for name, obj in inspect.getmembers(module, inspect.isfunction):
+            if obj.__module__ != module.__name__ or name.startswith("_"):
+                continue
             try:
-                spec = importlib.util.spec_from_file_location(module_name, module_path)
-                module = importlib.util.module_from_spec(spec)
-                spec.loader.exec_module(module)
+                signature = str(inspect.signature(obj))
+            except (TypeError, ValueError):
+                signature = "(...)"
+            specs[name] = FunctionSpec(
+                module_name, name, signature, inspect.getdoc(obj) or "",
+                inspect.iscoroutinefunction(obj),
+            )
+        return specs
+
+    def _rebuild_snapshot(self):
+        self._snapshot = {
+            name: entry.functions
+            for name, entry in sorted(self.entries.items())
+            if entry.specs
+        }
+
+
+# One registry per modules directory, shared by every caller
+_registries = {}
+
 
-                collected_functions = []
-                # Collect only user-defined functions in the module
-                for name, obj in inspect.getmembers(module, inspect.isfunction):
-                    if obj.__module__ == module.__name__:
-                        collected_functions.append(name)
+def get_registry(modules_path="modules"):
+    """Return the shared FunctionRegistry for a modules directory."""
+    key = os.path.abspath(modules_path)
+    registry = _registries.get(key)
+    if registry is None:
+        registry = _registries[key] = FunctionRegistry(modules_path)
+    return registry
 
-                if collected_functions:
-                    functions_by_module[module_name] = collected_functions
-                    logger.info(f"✅ Loaded module: {module_name} | Functions: {collected_functions}")
 
-            except Exception as e:
-                logger.error(f"❌ Failed to load module '{module_name}': {e}")
+def available_functions(modules_path="modules"):
+    """
+    Returns a dictionary of available modules and their user-defined functions.
+    Filters out non-user-defined functions and internal methods.
+
+    Served from the shared FunctionRegistry, which discovers functions statically,
+    so listing them never imports or re-executes plugin code.
+    """
+    return get_registry(modules_path).functions()
 
-    return functions_by_module
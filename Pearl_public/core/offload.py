@@ -0,0 +1,113 @@
+import asyncio
+import functools
+import inspect
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from config.executor_settings import IO_THREADS, CPU_PROCESSES, FUNCTION_EXECUTION
+
+EXECUTION_ATTRIBUTE = "__pearl_execution__"
+
+# Decorator names the static registry recognises in module source
+EXECUTION_DECORATORS = {"io_bound": "io", "cpu_bound": "cpu"}
+
+_thread_pool = None
+_process_pool = None
+
+
+def io_bound(function):
+    """Mark a synchronous function as blocking I/O: it runs in the thread pool."""
+    setattr(function, EXECUTION_ATTRIBUTE, "io")
+    return function
+
+
+def cpu_bound(function):
+    """
+    Mark a synchronous function as CPU-heavy: it runs in the process pool.
+
+    The function must be defined at module top level, and its arguments and
+    result must be picklable.
+    """
+    setattr(function, EXECUTION_ATTRIBUTE, "cpu")
+    return function
+
+
+def execution_kind(function, decorators=(), key=None) -> str:
+    """
+    Decide how a function is run.
+
+    Args:
+        function: The callable itself.
+        decorators (list): Decorator expressions from the registry (e.g. ["cpu_bound"]).
+        key (str): "module.function", looked up in FUNCTION_EXECUTION.
+    Returns:
+        str: "async" (awaited on the loop), "io" (thread pool) or "cpu" (process pool).
+    """
+    if inspect.iscoroutinefunction(function):
+        return "async"
+    marked = getattr(function, EXECUTION_ATTRIBUTE, None)
+    if marked:
+        return marked
+    for decorator in decorators:
+        kind = EXECUTION_DECORATORS.get(decorator.split("(")[0].split(".")[-1])
+        if kind:
+            return kind
+    return FUNCTION_EXECUTION.get(key, "io")
+
+
+def _get_thread_pool() -> ThreadPoolExecutor:
+    global _thread_pool
+    if _thread_pool is None:
+        _thread_pool = ThreadPoolExecutor(max_workers=IO_THREADS, thread_name_prefix="pearl-io")
+    return _thread_pool
+
+
+def _get_process_pool() -> ProcessPoolExecutor:
+    global _process_pool
+    if _process_pool is None:
+        # spawn: forking a process that runs an event loop and threads is unsafe
+        _process_pool = ProcessPoolExecutor(max_workers=CPU_PROCESSES,
+                                            mp_context=multiprocessing.get_context("spawn"))
+        logging.info(f"⚙️ Process pool started with {CPU_PROCESSES} workers.")
+    return _process_pool
+
+
+async def run_io(function, *args, **kwargs):
+    """Run a blocking synchronous call in the bounded thread pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_thread_pool(), functools.partial(function, *args, **kwargs))
+
+
+async def run_cpu(function, *args, **kwargs):
+    """Run a CPU-heavy synchronous call in the process pool."""
+    global _process_pool
+    loop = asyncio.get_running_loop()
+    pool = _get_process_pool()
+    try:
+        return await loop.run_in_executor(pool, functools.partial(function, *args, **kwargs))
+    except BrokenProcessPool:
+        # A worker died (e.g. out of memory); start a fresh pool for the next call
+        logging.error("❌ Process pool broke, it will be restarted on the next call.")
+        if _process_pool is pool:
+            _process_pool = None
+        raise
+
+
+async def run_blocking(kind: str, function, *args, **kwargs):
+    """Run a synchronous call according to its execution kind ("io" or "cpu")."""
+    if kind == "cpu":
+        return await run_cpu(function, *args, **kwargs)
+    return await run_io(function, *args, **kwargs)
+
+
+def shutdown_pools():
+    """Shut the pools down, cancelling work that has not started yet."""
+    global _thread_pool, _process_pool
+    if _thread_pool is not None:
+        _thread_pool.shutdown(wait=False, cancel_futures=True)
+        _thread_pool = None
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False, cancel_futures=True)
+        _process_pool = None
@@ -1,8 +1,8 @@
 import logging
 import asyncio
 import re
-import ollama
 from datetime import datetime
+from core import ollama_client
 from core.modules_loader import available_functions
 from core.time_calendar import provide_datetime_context
 from modules.self_editor import implement_feature
@@ -103,13 +103,12 @@ async def ask_ollama(prompt, model="llama3.2", chat_id=chat_id):
     """Ensures PEARL only sends clean responses and prevents backend logs from being sent."""
     try:
         logging.debug(f"Sending prompt to LLM: {prompt}")
-        client = ollama.Client()
 
         history = conversation_history.get(chat_id, [])
         history.append(f"User: {prompt}")
         conversation_context = "\n".join(history[-5:])  # Keep last 5 interactions
 
-        response = client.generate(model=model, prompt=conversation_context)
+        response = await ollama_client.generate(model=model, prompt=conversation_context)
         output = response.get("response", "").strip()
 
         cleaned_output = re.sub(r"(Process User Input:|Received data from|Sending request to).*", "", output, flags=re.IGNORECASE).strip()
@@ -186,8 +185,7 @@ def is_related_topic(current, saved):
 async def ask_ollama_and_implement(prompt, modules_path="modules"):
     """Implement new features from LLM response."""
     try:
-        client = ollama.Client()
-        response = client.generate(model="llama3.2", prompt=prompt)
+        response = await ollama_client.generate(model="llama3.2", prompt=prompt)
         feature_name = response.get("feature_name")
         feature_code = response.get("feature_code")
 
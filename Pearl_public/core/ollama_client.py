@@ -0,0 +1,178 @@
+import asyncio
+import logging
+import time
+from contextlib import aclosing
+
+import httpx
+import ollama
+
+from config.ollama_settings import (
+    OLLAMA_HOST,
+    REQUEST_TIMEOUT,
+    CONNECT_TIMEOUT,
+    MAX_CONNECTIONS,
+    MAX_KEEPALIVE_CONNECTIONS,
+    KEEPALIVE_EXPIRY,
+    NUM_CTX,
+    OLLAMA_BACKENDS,
+)
+from core.llm_scheduler import llm_scheduler, LLM_INTERACTIVE
+from core.ollama_pool import BackendPool, CONNECTION_ERRORS
+from core.generation_profiles import apply_profile, profile_model, profile_stats, profile_min_timeout
+from core.model_residency import model_residency
+from core.resilience import dependency
+
+# One pooled AsyncClient per (host, event loop); httpx connections are bound to a loop
+_clients = {}
+
+
+def get_client(host=None) -> ollama.AsyncClient:
+    """
+    Return the shared async Ollama client for a host.
+
+    The client keeps a pool of keep-alive HTTP connections, so concurrent
+    generations reuse sockets and never block the event loop.
+    """
+    loop = asyncio.get_running_loop()
+    key = (host or OLLAMA_HOST, loop)
+    client = _clients.get(key)
+    if client is None:
+        client = ollama.AsyncClient(
+            host=host or OLLAMA_HOST,
+            timeout=httpx.Timeout(REQUEST_TIMEOUT, connect=CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=MAX_CONNECTIONS,
+                max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=KEEPALIVE_EXPIRY,
+            ),
+        )
+        _clients[key] = client
+        logging.debug(f"Created shared Ollama client for {host or OLLAMA_HOST or 'default host'}")
+    return client
+
+
+# Several Ollama nodes when OLLAMA_BACKENDS is configured; calls without an
+# explicit host are then load-balanced over them
+backend_pool = BackendPool(OLLAMA_BACKENDS, get_client)
+
+# Circuit breaker for the whole Ollama service (every backend of the pool failing
+# counts once); adaptive timeouts are kept per generation profile
+ollama_api = dependency("ollama", CONNECTION_ERRORS + (asyncio.TimeoutError,))
+
+
+def _with_defaults(kwargs):
+    """Add the shared num_ctx to the generation options."""
+    options = dict(kwargs.get("options") or {})
+    options.setdefault("num_ctx", NUM_CTX)
+    return {**kwargs, "options": options}
+
+
+async def generate(model, prompt, host=None, priority=LLM_INTERACTIVE, profile=None, **kwargs):
+    """
+    Run a non-streaming generation on the shared client.
+
+    The generation waits for a slot from the LLM scheduler in its priority
+    class (core/llm_scheduler.py), then runs on the backend pool when one is
+    configured (interactive requests may be hedged). A named profile
+    (core/generation_profiles.py) supplies keep_alive, the options, and the
+    model when `model` is None; the call is then measured under that profile.
+    Pinned models get PIN_KEEP_ALIVE when one is set, and a heavy model first
+    waits until it fits in memory (core/model_residency.py).
+    While Ollama is failing the call raises CircuitOpenError before queueing.
+    The circuit itself only covers the HTTP request, after the memory
+    reservation and the scheduler slot, so a half-open trial call never holds
+    it while it waits in a queue. The generation is limited to the profile's
+    adaptive timeout (core/resilience.py), never shorter than num_predict
+    tokens need at MIN_TOKENS_PER_SECOND. Only that timeout and connection errors count
+    against Ollama; a caller cancelling the call (e.g. with its own shorter
+    timeout) does not. Extra keyword arguments (system, context, options,
+    keep_alive, format, ...) are passed to ollama.AsyncClient.generate.
+    """
+    if profile:
+        model = model or profile_model(profile)
+        kwargs = apply_profile(profile, kwargs)
+    kwargs = model_residency.request_kwargs(model, kwargs)
+    ollama_api.refuse_if_open()
+    await model_residency.reserve_memory(model, priority)
+    async with llm_scheduler.slot(model, priority):
+        async with ollama_api.guard():
+            started = time.monotonic()
+            if host is None and backend_pool.enabled:
+                request = backend_pool.generate(model, prompt, hedge=priority == LLM_INTERACTIVE,
+                                                **_with_defaults(kwargs))
+            else:
+                request = get_client(host).generate(model=model, prompt=prompt, **_with_defaults(kwargs))
+            timeout = ollama_api.timeout(profile, floor=profile_min_timeout(profile) if profile else 0.0)
+            response = await asyncio.wait_for(request, timeout)
+            ollama_api.record_latency(time.monotonic() - started, profile)
+    model_residency.observe(model, response)
+    if profile:
+        profile_stats.record(profile, response, time.monotonic() - started)
+    return response
+
+
+async def stream_generate(model, prompt, host=None, priority=LLM_INTERACTIVE, profile=None, **kwargs):
+    """
+    Run a streaming generation on the shared client, yielding each response part.
+
+    Holds a scheduler slot until the stream ends. Closing this generator early
+    closes the HTTP request, which makes Ollama stop generating. Profiles and
+    the circuit breaker work as for generate() (the circuit covers the stream
+    from the request on, once the slot was granted); the adaptive timeout applies
+    to the first part only, since a stream may legitimately run for long.
+    """
+    if profile:
+        model = model or profile_model(profile)
+        kwargs = apply_profile(profile, kwargs)
+    kwargs = model_residency.request_kwargs(model, kwargs)
+    first_key = f"{profile}/first_part"
+    ollama_api.refuse_if_open()
+    await model_residency.reserve_memory(model, priority)
+    async with llm_scheduler.slot(model, priority):
+        async with ollama_api.guard():
+            started = time.monotonic()
+            first_part, parts, finished = None, 0, False
+            try:
+                # Cleared once the first part arrived; the consumer only runs after that
+                async with asyncio.timeout(ollama_api.timeout(first_key)) as first_deadline:
+                    if host is None and backend_pool.enabled:
+                        stream = backend_pool.stream_generate(model, prompt, **_with_defaults(kwargs))
+                    else:
+                        stream = await get_client(host).generate(model=model, prompt=prompt, stream=True,
+                                                                 **_with_defaults(kwargs))
+                    async with aclosing(stream):
+                        async for part in stream:
+                            parts += 1
+                            if first_part is None:
+                                first_part = time.monotonic()
+                                first_deadline.reschedule(None)
+                                ollama_api.record_latency(first_part - started, first_key)
+                                # Ollama answered: a half-open circuit closes now, not after the consumer
+                                ollama_api.succeeded()
+                            if part.get("done"):
+                                finished = True
+                                model_residency.observe(model, part)
+                                if profile:
+                                    profile_stats.record(profile, part, time.monotonic() - started)
+                            yield part
+            finally:
+                if profile and not finished and first_part is not None:
+                    now = time.monotonic()
+                    profile_stats.record_partial(profile, parts, now - started, now - first_part)
+
+
+async def embed(model, texts, host=None, **kwargs):
+    """Embed a list of texts on the shared client (or the backend pool); returns one vector per text."""
+    if host is None and backend_pool.enabled:
+        response = await ollama_api.call(backend_pool.embed, model, texts, key="embed", **kwargs)
+    else:
+        response = await ollama_api.call(get_client(host).embed, model=model, input=texts, key="embed", **kwargs)
+    return response["embeddings"]
+
+
+async def close_clients():
+    """Close every pooled client created on the running event loop."""
+    loop = asyncio.get_running_loop()
+    for key in [key for key in _clients if key[1] is loop]:
+        client = _clients.pop(key)
+        await client._client.aclose()
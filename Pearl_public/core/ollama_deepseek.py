@@ -57,9 +57,43 @@ def jarvis_prompt(user_input, functions_by_module):
         return "Error generating prompt."
 
 
-import re
+from contextlib import aclosing
 
-async def ask_ollama(prompt, model="deepseek-r1", chat_id=None):
+from config.ollama_settings import THINK_BUDGET_TOKENS
+from config.resilience_settings import RETRY_BACKOFF
+from core.ollama_pool import CONNECTION_ERRORS
+from core.resilience import CircuitOpenError
+from core.stream_filters import ThinkFilter
+
+# Sent instead of an empty answer (e.g. the model used its whole budget thinking)
+NO_ANSWER_REPLY = "⚠️ I could not come up with an answer this time. Please try again or rephrase the question."
+
+async def stream_visible(prompt, model="deepseek-r1", think_budget=THINK_BUDGET_TOKENS):
+    """
+    Stream a DeepSeek generation without its <think> block.
+
+    Yields the visible response so far each time new visible tokens arrive;
+    reasoning tokens are dropped as they stream in, so the answer reaches the
+    user as soon as the model starts writing it. When the think block runs
+    past think_budget streamed tokens the generation is stopped.
+    """
+    from core import ollama_client
+
+    think = ThinkFilter(think_budget)
+    visible = ""
+    async with aclosing(ollama_client.stream_generate(model=model, prompt=prompt, profile="reasoning")) as stream:
+        async for part in stream:
+            text = think.feed(part.get("response", ""))
+            if think.over_budget:
+                logging.warning(f"✂️ {model} thought for more than {think_budget} tokens, generation stopped")
+                break
+            if text:
+                visible += text
+                yield visible
+    visible += think.flush()
+    yield visible
+
+async def ask_ollama(prompt, model="deepseek-r1", chat_id=None, telegram_client=None):
     """
     Interact with DeepSeek LLM and optionally send the response to a Telegram user.
     
@@ -67,15 +101,22 @@ async def ask_ollama(prompt, model="deepseek-r1", chat_id=None):
         prompt (str): The prompt to send to the LLM.
         model (str): The model to use (default: deepseek-r1).
         chat_id (int, optional): Telegram chat ID to send the response to.
+        telegram_client (TelegramClient, optional): Client used to stream the
+            response into the chat while it is generated.
 
     Returns:
         str: The filtered response from the LLM.
+
+    Connection errors and timeouts are retried with exponential backoff. A
+    retry edits the messages an interrupted attempt already sent instead of
+    sending the reply again. While Ollama's circuit is open a degraded reply
+    is returned at once, and an answer without visible text is replaced by
+    NO_ANSWER_REPLY.
     """
-    import ollama  # Local import to avoid circular dependencies
+    from core.ollama_integration import degraded_reply  # Local import to avoid circular dependencies
 
     try:
         logging.debug(f"Sending prompt to DeepSeek: {prompt}")
-        client = ollama.Client()
 
         # Retrieve conversation history for the chat_id
         history = conversation_history.get(chat_id, [])
@@ -83,20 +124,30 @@ async def ask_ollama(prompt, model="deepseek-r1", chat_id=None):
         conversation_context = "\n".join(history)
 
         retries = 3  # Retry up to 3 times on transient errors
+        message_ids = []  # Messages sent so far, shared by every attempt
         for attempt in range(retries):
             try:
-                response = client.generate(model=model, prompt=conversation_context)
-                output = response.get("response", "")
-
-                # Remove text inside <think> tags
-                cleaned_output = re.sub(r"<think>.*?</think>", "", output, flags=re.DOTALL).strip()
+                snapshots = stream_visible(conversation_context, model)
+                if chat_id and telegram_client:
+                    output = await telegram_client.stream_message(chat_id, snapshots, message_ids=message_ids)
+                else:
+                    output = ""
+                    async for output in snapshots:
+                        pass
+                cleaned_output = output.strip()
 
                 logging.debug(f"Filtered response from DeepSeek: {cleaned_output}")
 
-                if chat_id:
-                    from core.telegram_receiver import send_message
-                    await send_message(chat_id, cleaned_output)
+                if not cleaned_output:
+                    logging.warning(f"⚠️ {model} gave no visible answer; sending a fallback reply")
+                    if chat_id and telegram_client:
+                        if message_ids:
+                            await telegram_client.edit_message_text(chat_id, message_ids[0], NO_ANSWER_REPLY)
+                        else:
+                            await telegram_client.send_message(chat_id, NO_ANSWER_REPLY)
+                    return NO_ANSWER_REPLY
 
+                if chat_id:
                     # Update conversation history
                     if f"AI: {cleaned_output}" not in history:
                         history.append(f"AI: {cleaned_output}")
@@ -104,9 +155,14 @@ async def ask_ollama(prompt, model="deepseek-r1", chat_id=None):
 
                 return cleaned_output
 
-            except (ollama.ClientError, ConnectionError) as e:
-                logging.warning(f"Transient error during DeepSeek interaction (attempt {attempt + 1}): {e}")
+            except CircuitOpenError as e:
+                logging.warning(f"🔌 {e}; sending a degraded reply")
+                return degraded_reply(e)
+
+            except CONNECTION_ERRORS + (asyncio.TimeoutError,) as e:
+                logging.warning(f"Transient error during DeepSeek interaction (attempt {attempt + 1}): {e!r}")
                 if attempt < retries - 1:
+                    await asyncio.sleep(RETRY_BACKOFF * 2 ** attempt)
                     continue
                 else:
                     raise
@@ -1,8 +1,15 @@
 import logging
 import asyncio
 import re
-import ollama
-from datetime import datetime
+from contextlib import aclosing
+from core import ollama_client
+from core.stream_filters import clean_response, StreamCleaner
+from core.llm_cache import response_cache, cache_key
+from core.single_flight import single_flight
+from core.conversation_memory import conversation_memory
+from core.llm_scheduler import LLM_INTERACTIVE
+from core.generation_profiles import profile_model, profile_options
+from core.resilience import CircuitOpenError
 from core.modules_loader import available_functions
 from core.time_calendar import provide_datetime_context
 from config.telegram_settings import CHAT_ID as chat_id
@@ -11,9 +18,6 @@ from core.telegram_receiver import TelegramClient
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
 
-# Dictionaries for conversation history
-conversation_history = {}
-conversation_topics = {}
 
 def jarvis_prompt(user_input, functions_by_module):
     """Generate an optimized prompt for PEARL based on user input and available functions."""
@@ -46,7 +50,7 @@ You should always prioritize internal functions over internet search.
 
 ### CONTEXT:
 - **Current Date & Time:** {provide_datetime_context()}
-- **Conversation History (last 5 messages):** {conversation_history.get(chat_id, [])}
+- **Conversation History:** {conversation_memory.render(chat_id)}
 
 ### RULES:
 1. **Prioritize available functions before external searches.**
@@ -86,70 +90,143 @@ def extract_function_call(response):
         return module_name, function_name, args
     return None
 
-async def ask_ollama(prompt, model="llama3.2", chat_id=None):
-    """Ensures PEARL only sends clean responses and prevents backend logs from being sent."""
-    try:
-        logging.debug(f"Sending prompt to LLM: {prompt}")
-        client = ollama.Client()
-
-        history = conversation_history.get(chat_id, [])
-        history.append(f"User: {prompt}")
-        conversation_context = "\n".join(history[-5:])  # Keep last 5 interactions
-
-        response = client.generate(model=model, prompt=conversation_context)
-        output = response.get("response", "").strip()
+def degraded_reply(error: CircuitOpenError) -> str:
+    """Answer given instead of a generation while Ollama's circuit is open."""
+    return f"⚠️ My language model is not reachable right now. Please try again in about {error.retry_after:.0f}s."
 
-        cleaned_output = re.sub(r"(Process User Input:|Received data from|Sending request to).*", "", output, flags=re.IGNORECASE).strip()
-        cleaned_output = re.sub(r"(Next Steps:|Context:).*", "", cleaned_output, flags=re.IGNORECASE).strip()
+def build_conversation_context(prompt, chat_id=None):
+    """Return the text sent to the model: the chat's remembered conversation, then the prompt."""
+    history = conversation_memory.render(chat_id) if chat_id is not None else ""
+    return f"{history}\n\n{prompt}" if history else prompt
 
-        if "internet_search" in prompt.lower():
-            cleaned_output = cleaned_output.replace("Title:", "**News Update:**\n**Title:**")
-            cleaned_output = cleaned_output.replace("Summary:", "\n**Summary:**")
-            cleaned_output = cleaned_output.replace("Latest Updates:", "\n**Latest Updates:**")
+async def ask_ollama(prompt, model=None, chat_id=None, cache_site=None, cache_text=None, options=None,
+                     session=None, priority=LLM_INTERACTIVE, profile="chat"):
+    """
+    Ensures PEARL only sends clean responses and prevents backend logs from being sent.
+
+    Args:
+        prompt (str): The prompt for the model.
+        model (str, optional): Ollama model name; defaults to the profile's model.
+        chat_id (int, optional): Chat whose conversation history is included.
+        cache_site (str, optional): Call-site name from CACHE_TTLS; enables the response
+            cache for this call. Prompts that depend on the current time are never cached.
+        cache_text (str, optional): Text that determines the answer, used for the cache
+            key instead of the full prompt (e.g. the research topic). The chat's
+            conversation history stays part of the key, since the model sees it too.
+        options (dict, optional): Ollama generation options on top of the profile's; part of the cache key.
+        session (ChatSession, optional): Continue this chat session instead: only the new
+            prompt is evaluated, on top of the context of the earlier turns (never cached).
+            The session's own profile applies.
+        priority (int): LLM scheduler class (LLM_INTERACTIVE, LLM_REMINDER, LLM_SUMMARY, ...).
+        profile (str): Generation profile from GENERATION_PROFILES (model, options, keep_alive).
+
+    While Ollama is unavailable the answer comes from the cache, even past its
+    TTL, for cacheable calls, and is a short degraded reply otherwise.
+    """
+    key = None
+    try:
+        logging.debug(f"Sending prompt to LLM: {prompt}")
+        if session is not None:
+            response = await session.generate(prompt, options=options, priority=priority)
+            cleaned_output = clean_response(response.get("response", "").strip(), prompt)
+            logging.info(f"📌 Sending response to user: {cleaned_output}")
+            return cleaned_output
+
+        conversation_context = build_conversation_context(prompt, chat_id)
+        model = model or profile_model(profile)
+        options = profile_options(profile, options)
+
+        key = None
+        if response_cache.cacheable(cache_site, cache_text or conversation_context):
+            key = cache_key(model, build_conversation_context(cache_text, chat_id) if cache_text
+                            else conversation_context, options)
+            cached = await response_cache.get(key)
+            if cached is not None:
+                logging.info(f"📌 Sending cached response ({cache_site}) to user: {cached}")
+                return cached
+
+        # Concurrent identical generations run once and share the answer
+        flight_key = ("llm", cache_key(model, conversation_context, options))
+        cleaned_output = await single_flight.do(
+            flight_key, _generate_cleaned, model, conversation_context, prompt, options, key, cache_site, priority,
+            profile,
+        )
 
         logging.info(f"📌 Sending response to user: {cleaned_output}")
         return cleaned_output
 
+    except CircuitOpenError as e:
+        stale = await response_cache.get(key, allow_expired=True) if key is not None else None
+        if stale is not None:
+            logging.warning(f"🔌 {e}; answering from the cache ({cache_site})")
+            return stale
+        logging.warning(f"🔌 {e}; sending a degraded reply")
+        return degraded_reply(e)
+
     except Exception as e:
         logging.error(f"❌ Error processing AI response: {e}")
         return "Error processing AI response."
 
-def handle_topic_change(chat_id, user_input):
-    """Handle conversation topic changes and context switching."""
-    global conversation_topics, conversation_history
+async def _generate_cleaned(model, conversation_context, prompt, options, key, cache_site, priority, profile):
+    """Generate, clean, and store the response in the cache when the call is cacheable."""
+    # Awaited on the shared pooled client so the event loop keeps running
+    response = await ollama_client.generate(model=model, prompt=conversation_context, options=options,
+                                            priority=priority, profile=profile)
+    output = response.get("response", "").strip()
 
-    if chat_id not in conversation_history:
-        conversation_history[chat_id] = []
-        conversation_topics[chat_id] = []
+    cleaned_output = clean_response(output, prompt)
+    if key is not None and cleaned_output:
+        generation_seconds = (response.get("total_duration") or 0) / 1e9
+        await response_cache.put(key, cache_site, model, cleaned_output, generation_seconds)
+    return cleaned_output
 
-    history = conversation_history[chat_id]
-    history.append(user_input)
+async def ask_ollama_stream(prompt, model=None, chat_id=None, session=None, options=None, profile="chat"):
+    """
+    Streaming variant of ask_ollama (optionally continuing a ChatSession).
 
-    if len(history) > 1:
-        prev_topic = extract_topic(history[-2])
-        current_topic = extract_topic(user_input)
+    Yields the cleaned visible response so far each time new tokens arrive;
+    the last value yielded is the complete cleaned response. Log-line and
+    <think> cleanup is applied incrementally by StreamCleaner. Closing the
+    generator early stops the generation.
+    """
+    cleaner = StreamCleaner(prompt)
+    try:
+        logging.debug(f"Streaming prompt to LLM: {prompt}")
+        if session is not None:
+            stream = session.stream_generate(prompt, options=options)
+        else:
+            conversation_context = build_conversation_context(prompt, chat_id)
+            stream = ollama_client.stream_generate(model=model, prompt=conversation_context, options=options,
+                                                   profile=profile)
 
-        if is_new_topic(prev_topic, current_topic):
-            conversation_topics[chat_id].append({
-                "topic": prev_topic,
-                "history": history[:-1],
-                "timestamp": datetime.now().isoformat()
-            })
-
-            for saved_topic in conversation_topics[chat_id]:
-                if is_related_topic(current_topic, saved_topic["topic"]):
-                    history = saved_topic["history"]
-                    logging.info(f"🔄 Returning to topic: {saved_topic['topic']}")
-                    break
-            else:
-                history = [user_input]
-                logging.info(f"📌 New topic: {current_topic}")
+        async with aclosing(stream):
+            async for part in stream:
+                cleaner.feed(part.get("response", ""))
+                yield cleaner.visible()
 
-            conversation_history[chat_id] = history
+        cleaned_output = cleaner.visible(final=True)
+        logging.info(f"📌 Streamed response to user: {cleaned_output}")
+        yield cleaned_output
+
+    except CircuitOpenError as e:
+        logging.warning(f"🔌 {e}; sending a degraded reply")
+        yield degraded_reply(e)
+
+    except Exception as e:
+        logging.error(f"❌ Error processing AI response: {e}")
+        yield "Error processing AI response."
+
+def handle_topic_change(chat_id, user_input):
+    """Log whether the user continues the topic of their previous message; returns their recent messages."""
+    history = conversation_memory.user_texts(chat_id)
+    if history:
+        prev_topic = extract_topic(history[-1])
+        current_topic = extract_topic(user_input)
+        if is_new_topic(prev_topic, current_topic):
+            logging.info(f"📌 New topic: {current_topic}")
         else:
             logging.info(f"✅ Continuing topic: {current_topic}")
-    
-    return history
+    return history + [user_input]
 
 def extract_topic(text):
     """Extract main topic from text."""
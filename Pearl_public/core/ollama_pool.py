@@ -0,0 +1,271 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from contextlib import aclosing
+
+import httpx
+
+from config.ollama_settings import (
+    OLLAMA_BACKENDS,
+    HEALTH_CHECK_INTERVAL,
+    HEALTH_CHECK_TIMEOUT,
+    UNHEALTHY_AFTER,
+    HEDGE_INTERACTIVE,
+    HEDGE_MIN_SAMPLES,
+    HEDGE_MIN_DELAY,
+    POOL_LATENCY_SAMPLES,
+)
+
+# Failures that say something about the node rather than the request
+CONNECTION_ERRORS = (ConnectionError, httpx.TransportError)
+
+
+def normalize_model(name: str) -> str:
+    """'llama3.2' -> 'llama3.2:latest', the way Ollama lists untagged models."""
+    return name if ":" in name else f"{name}:latest"
+
+
+def p95(samples) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+
+class Backend:
+    """One Ollama endpoint of the pool."""
+
+    def __init__(self, host: str, models=None, weight: float = 1.0):
+        self.host = host
+        # Configured models; without them the models the health probe finds are used
+        self.models = {normalize_model(m) for m in models} if models else None
+        self.available = None
+        self.weight = weight
+        self.healthy = True
+        self.failures = 0
+        self.outstanding = 0
+        self.requests = 0
+        self.errors = 0
+        self.latencies = deque(maxlen=POOL_LATENCY_SAMPLES)
+
+    def serves(self, model: str) -> bool:
+        models = self.models if self.models is not None else self.available
+        return models is None or normalize_model(model) in models
+
+    def load(self) -> float:
+        """Outstanding requests (counting a new one) relative to the node's weight."""
+        return (self.outstanding + 1) / self.weight
+
+
+class BackendPool:
+    """
+    Spread LLM calls over several Ollama endpoints.
+
+    Each request goes to the healthy node serving the model with the fewest
+    outstanding requests relative to its weight. Nodes that fail
+    UNHEALTHY_AFTER requests in a row, or do not answer the periodic
+    /api/tags probe, are taken out until a probe succeeds again; a request
+    that could not reach its node is retried on the next one. Interactive
+    generations can be hedged: when the first node has not answered within
+    the model's recent p95 latency, the same request also goes to a second
+    node and whichever answers first wins.
+    """
+
+    def __init__(self, backends, client_factory, hedge: bool = HEDGE_INTERACTIVE,
+                 probe_interval: float = HEALTH_CHECK_INTERVAL):
+        # client_factory: host -> ollama.AsyncClient (ollama_client.get_client)
+        self.backends = [Backend(**backend) for backend in backends]
+        self.client_factory = client_factory
+        self.hedge = hedge
+        self.probe_interval = probe_interval
+        self.latencies = {}
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.probe_task = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.backends)
+
+    def candidates(self, model: str, exclude=()) -> list:
+        """Nodes serving the model, least loaded first; unhealthy ones only when nothing else is left."""
+        serving = [b for b in self.backends if b.serves(model) and b not in exclude]
+        healthy = [b for b in serving if b.healthy]
+        return sorted(healthy or serving, key=Backend.load)
+
+    def hedge_deadline(self, model: str):
+        """Seconds after which an interactive request is hedged, or None without enough samples."""
+        samples = self.latencies.get(normalize_model(model))
+        if not samples or len(samples) < HEDGE_MIN_SAMPLES:
+            return None
+        return max(p95(samples), HEDGE_MIN_DELAY)
+
+    def _record(self, backend: Backend, model: str, seconds: float):
+        backend.failures = 0
+        backend.latencies.append(seconds)
+        self.latencies.setdefault(normalize_model(model), deque(maxlen=POOL_LATENCY_SAMPLES)).append(seconds)
+
+    def _failed(self, backend: Backend, error: Exception):
+        backend.errors += 1
+        backend.failures += 1
+        if backend.healthy and backend.failures >= UNHEALTHY_AFTER:
+            backend.healthy = False
+            logging.warning(f"🚫 Ollama backend {backend.host} taken out after {backend.failures} failures: {error}")
+
+    async def _run(self, backend: Backend, model: str, call):
+        backend.outstanding += 1
+        backend.requests += 1
+        started = time.monotonic()
+        try:
+            result = await call(self.client_factory(backend.host))
+        except CONNECTION_ERRORS as e:
+            self._failed(backend, e)
+            raise
+        finally:
+            backend.outstanding -= 1
+        self._record(backend, model, time.monotonic() - started)
+        return result
+
+    async def _hedged(self, model: str, call, first: Backend, second: Backend, deadline: float):
+        first_task = asyncio.ensure_future(self._run(first, model, call))
+        second_task = None
+        try:
+            done, _ = await asyncio.wait({first_task}, timeout=deadline)
+            if done:
+                return first_task.result()
+
+            self.hedges += 1
+            logging.info(f"🪁 {model} on {first.host} slower than {deadline:.2f}s, hedging to {second.host}")
+            second_task = asyncio.ensure_future(self._run(second, model, call))
+            pending = {first_task, second_task}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is second_task:
+                            self.hedge_wins += 1
+                        return task.result()
+            raise first_task.exception()
+        finally:
+            # The losing request is cancelled; Ollama stops generating when its connection closes
+            for task in (first_task, second_task):
+                if task is not None:
+                    task.cancel()
+
+    async def request(self, model: str, call, hedge: bool = False):
+        """
+        Run `await call(client)` on the best node for the model.
+
+        Raises:
+            LookupError: if no node serves the model.
+            ConnectionError / httpx.TransportError: if every node serving it failed.
+        """
+        tried, error = [], None
+        while True:
+            candidates = self.candidates(model, exclude=tried)
+            if not candidates:
+                raise error or LookupError(f"No Ollama backend serves {model}")
+            first = candidates[0]
+            tried.append(first)
+            try:
+                deadline = self.hedge_deadline(model) if hedge and self.hedge and len(candidates) > 1 else None
+                if deadline is None:
+                    return await self._run(first, model, call)
+                tried.append(candidates[1])
+                return await self._hedged(model, call, first, candidates[1], deadline)
+            except CONNECTION_ERRORS as e:
+                error = e
+                logging.warning(f"⚠️ Ollama backend {first.host} unreachable ({e}), trying another")
+
+    async def generate(self, model: str, prompt: str, hedge: bool = False, **kwargs):
+        """Non-streaming generation on the pool; hedge=True for latency-critical requests."""
+        return await self.request(model, lambda client: client.generate(model=model, prompt=prompt, **kwargs), hedge)
+
+    async def broadcast(self, model: str, call) -> list:
+        """
+        Run `await call(client)` on every healthy node serving the model (e.g.
+        to load or unload it everywhere). Returns each node's result, or the
+        exception it raised; not counted in the latencies used for hedging.
+        """
+        backends = [b for b in self.backends if b.serves(model) and b.healthy]
+        return await asyncio.gather(*(call(self.client_factory(b.host)) for b in backends), return_exceptions=True)
+
+    async def embed(self, model: str, texts, **kwargs):
+        return await self.request(model, lambda client: client.embed(model=model, input=texts, **kwargs))
+
+    async def stream_generate(self, model: str, prompt: str, **kwargs):
+        """Streaming generation on the pool. Streams fail over only until their first part arrived."""
+        tried, error = [], None
+        while True:
+            candidates = self.candidates(model, exclude=tried)
+            if not candidates:
+                raise error or LookupError(f"No Ollama backend serves {model}")
+            backend = candidates[0]
+            tried.append(backend)
+            backend.outstanding += 1
+            backend.requests += 1
+            started = time.monotonic()
+            streamed = False
+            try:
+                stream = await self.client_factory(backend.host).generate(model=model, prompt=prompt, stream=True,
+                                                                          **kwargs)
+                async with aclosing(stream):
+                    async for part in stream:
+                        streamed = True
+                        yield part
+                self._record(backend, model, time.monotonic() - started)
+                return
+            except CONNECTION_ERRORS as e:
+                self._failed(backend, e)
+                if streamed:
+                    raise
+                error = e
+                logging.warning(f"⚠️ Ollama backend {backend.host} unreachable ({e}), trying another")
+            finally:
+                backend.outstanding -= 1
+
+    async def probe(self, backend: Backend) -> bool:
+        """Lightweight health check (GET /api/tags); also learns the node's models."""
+        try:
+            response = await asyncio.wait_for(self.client_factory(backend.host).list(), HEALTH_CHECK_TIMEOUT)
+        except Exception as e:
+            if backend.healthy:
+                logging.warning(f"🚫 Ollama backend {backend.host} failed its health check: {e!r}")
+            backend.healthy = False
+            return False
+        backend.available = {normalize_model(m["model"]) for m in response["models"] if m["model"]}
+        if not backend.healthy:
+            logging.info(f"✅ Ollama backend {backend.host} is healthy again")
+        backend.healthy = True
+        backend.failures = 0
+        return True
+
+    async def _probe_loop(self):
+        while True:
+            await asyncio.gather(*(self.probe(backend) for backend in self.backends))
+            await asyncio.sleep(self.probe_interval)
+
+    def start(self):
+        """Start the periodic health probe (no-op without configured backends)."""
+        if self.enabled and self.probe_task is None:
+            self.probe_task = asyncio.create_task(self._probe_loop())
+            logging.info(f"🩺 Probing {len(self.backends)} Ollama backends every {self.probe_interval}s")
+
+    async def stop(self):
+        if self.probe_task is not None:
+            self.probe_task.cancel()
+            await asyncio.gather(self.probe_task, return_exceptions=True)
+            self.probe_task = None
+
+    def report(self) -> dict:
+        """Per-node health, load and latency, plus hedging counts."""
+        report = {"hedges": self.hedges, "hedge_wins": self.hedge_wins}
+        for b in self.backends:
+            report[b.host] = {
+                "healthy": b.healthy,
+                "outstanding": b.outstanding,
+                "requests": b.requests,
+                "errors": b.errors,
+                "latency_p95": p95(b.latencies) if b.latencies else None,
+            }
+        return report
+
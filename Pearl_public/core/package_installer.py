@@ -1,4 +1,3 @@
-import subprocess
 import sys
 import asyncio
 import logging
@@ -31,12 +30,12 @@ async def install_package(package_name: str, chat_id: int, telegram_client: Tele
 
         # Install package
         await telegram_client.send_message(chat_id, f"📦 Installing {package_name}...")
-        process = subprocess.Popen(
-            [sys.executable, "-m", "pip", "install", package_name],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE
+        process = await asyncio.create_subprocess_exec(
+            sys.executable, "-m", "pip", "install", package_name,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
         )
-        output, error = process.communicate()
+        output, error = await process.communicate()
 
         if process.returncode == 0:
             await telegram_client.send_message(chat_id, f"✅ Successfully installed {package_name}")
@@ -0,0 +1,79 @@
+import asyncio
+import logging
+import time
+
+
+class StepSkipped(Exception):
+    """A plan step did not run because a step it depends on failed."""
+
+
+class StepResult:
+    """Outcome of one plan step."""
+
+    def __init__(self, step, result=None, error=None, seconds: float = 0.0):
+        self.step = step
+        self.result = result
+        self.error = error
+        self.seconds = seconds
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+async def run_plan(steps, run_step) -> list:
+    """
+    Run plan steps concurrently, each one as soon as its dependencies have finished.
+
+    Args:
+        steps (list): PlanStep objects; dependencies must already be validated
+            as existing and acyclic (see tool_calls.parse_tool_call).
+        run_step: async callable(step) returning the step's result.
+    Returns:
+        list: A StepResult per step, in plan order. A failing step does not
+        stop the others; only the steps depending on it are skipped.
+    """
+    started = time.monotonic()
+    tasks = {}
+
+    async def run(step):
+        for dep in step.after:
+            if not (await tasks[dep]).ok:
+                return StepResult(step, error=StepSkipped(f"step {dep} failed"))
+        step_started = time.monotonic()
+        try:
+            result = await run_step(step)
+        except Exception as e:
+            logging.error(f"❌ Plan step {step.id} {step.function} failed: {e}")
+            return StepResult(step, error=e, seconds=time.monotonic() - step_started)
+        return StepResult(step, result, seconds=time.monotonic() - step_started)
+
+    # Every task exists before any of them runs, so dependencies can be awaited in any order
+    for step in steps:
+        tasks[step.id] = asyncio.ensure_future(run(step))
+    try:
+        results = await asyncio.gather(*tasks.values())
+    except asyncio.CancelledError:
+        for task in tasks.values():
+            task.cancel()
+        raise
+
+    elapsed = time.monotonic() - started
+    sequential = sum(r.seconds for r in results)
+    logging.info(f"🧩 Plan of {len(results)} steps done in {elapsed:.2f}s (one after another: {sequential:.2f}s)")
+    return results
+
+
+def summarize_results(results) -> str:
+    """One chat reply covering every step of a plan."""
+    lines = []
+    for r in results:
+        name = r.step.function.split(".")[-1]
+        if isinstance(r.error, StepSkipped):
+            lines.append(f"⏭️ {name} skipped ({r.error})")
+        elif r.error is not None:
+            lines.append(f"❌ {name} failed: {r.error}")
+        else:
+            lines.append(f"✅ {name}: {r.result}")
+    return "\n".join(lines)
+
@@ -0,0 +1,246 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from urllib.parse import urlsplit
+
+from config.resilience_settings import (
+    DEPENDENCIES,
+    TIMEOUT_PERCENTILE,
+    TIMEOUT_MIN_SAMPLES,
+    LATENCY_WINDOW,
+)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(RuntimeError):
+    """A call was refused without trying because its dependency is failing."""
+
+    def __init__(self, dependency: str, retry_after: float):
+        super().__init__(f"{dependency} is unavailable, retrying in {retry_after:.0f}s")
+        self.dependency = dependency
+        self.retry_after = retry_after
+
+
+class AdaptiveTimeout:
+    """Timeout that follows a percentile of the recently observed latencies."""
+
+    def __init__(self, initial: float, minimum: float, maximum: float, multiplier: float):
+        self.initial = initial
+        self.minimum = minimum
+        self.maximum = maximum
+        self.multiplier = multiplier
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+
+    def record(self, seconds: float):
+        self.latencies.append(seconds)
+
+    def current(self) -> float:
+        if len(self.latencies) < TIMEOUT_MIN_SAMPLES:
+            return self.initial
+        ordered = sorted(self.latencies)
+        observed = ordered[min(len(ordered) - 1, int(len(ordered) * TIMEOUT_PERCENTILE))]
+        return min(self.maximum, max(self.minimum, observed * self.multiplier))
+
+
+class Dependency:
+    """
+    Circuit breaker and adaptive timeouts for one external dependency.
+
+    After `failures` consecutive failures the circuit opens and every call
+    raises CircuitOpenError at once, so callers can answer from a cache or
+    with a degraded reply instead of queueing behind a dead service. After
+    `reset` seconds one trial call is let through (half-open): success closes
+    the circuit, failure opens it again. Only the exception types in
+    `failure_types` (connection errors, timeouts) count as failures; other
+    errors are the caller's problem and leave the circuit alone.
+
+    Timeouts are kept per key (e.g. the generation profile), each adapting to
+    the latencies observed for that key.
+    """
+
+    def __init__(self, name: str, settings: dict, failure_types=(ConnectionError, asyncio.TimeoutError),
+                 timeouts: dict = None):
+        self.name = name
+        self.settings = settings
+        self.failure_types = failure_types
+        self.threshold = settings["failures"]
+        self.reset = settings["reset"]
+        # Shared between dependencies when passed in (the crawl hosts)
+        self.timeouts = {} if timeouts is None else timeouts
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probing = False
+        self.counters = {"calls": 0, "failures": 0, "timeouts": 0, "rejected": 0, "opened": 0}
+
+    def _timeout(self, key) -> AdaptiveTimeout:
+        timeout = self.timeouts.get(key)
+        if timeout is None:
+            s = self.settings
+            timeout = self.timeouts[key] = AdaptiveTimeout(s["timeout"], s["min_timeout"], s["max_timeout"],
+                                                           s["multiplier"])
+        return timeout
+
+    def timeout(self, key=None, floor: float = 0.0) -> float:
+        """Current timeout in seconds for calls with this key, never below `floor`."""
+        return max(floor, self._timeout(key).current())
+
+    @property
+    def retry_after(self) -> float:
+        """Seconds until the open circuit lets a trial call through (0 when closed)."""
+        if self.state != OPEN:
+            return 0.0
+        return max(0.0, self.opened_at + self.reset - time.monotonic())
+
+    def check(self):
+        """
+        Admit a call or refuse it.
+
+        Raises:
+            CircuitOpenError: while the circuit is open, or a trial call is already running.
+        """
+        if self.state == OPEN and self.retry_after == 0:
+            self.state = HALF_OPEN
+            self.probing = False
+        if self.state == OPEN or (self.state == HALF_OPEN and self.probing):
+            self.counters["rejected"] += 1
+            raise CircuitOpenError(self.name, self.retry_after or self.reset)
+        if self.state == HALF_OPEN:
+            self.probing = True
+        self.counters["calls"] += 1
+
+    def refuse_if_open(self):
+        """
+        Fail fast before queueing for a call: refuse while the circuit is open,
+        without taking the half-open trial (check() does that once the call
+        is actually made).
+
+        Raises:
+            CircuitOpenError: while the circuit is open and its reset period has not passed.
+        """
+        if self.state == OPEN and self.retry_after > 0:
+            self.counters["rejected"] += 1
+            raise CircuitOpenError(self.name, self.retry_after)
+
+    def record_latency(self, seconds: float, key=None):
+        """Feed the adaptive timeout of `key` with the duration of a successful call."""
+        self._timeout(key).record(seconds)
+
+    def succeeded(self):
+        if self.state != CLOSED:
+            logging.info(f"✅ {self.name} is reachable again, circuit closed")
+        self.state = CLOSED
+        self.failures = 0
+        self.probing = False
+
+    def failed(self, error: Exception):
+        self.counters["failures"] += 1
+        if isinstance(error, asyncio.TimeoutError):
+            self.counters["timeouts"] += 1
+        self.failures += 1
+        self.probing = False
+        if self.state == HALF_OPEN or (self.state == CLOSED and self.failures >= self.threshold):
+            self.state = OPEN
+            self.opened_at = time.monotonic()
+            self.counters["opened"] += 1
+            logging.warning(f"🔌 {self.name} circuit opened after {self.failures} failures "
+                            f"({error!r}), failing fast for {self.reset}s")
+
+    def released(self):
+        """A call ended with an error that says nothing about the dependency."""
+        self.probing = False
+
+    @asynccontextmanager
+    async def guard(self):
+        """
+        Check the circuit, then record the outcome of the block.
+
+        No timeout is applied and no latency recorded. Keep the block to the
+        call itself: while half-open, other calls are refused until the block
+        ends, so it must not wait in a queue first. A stream closed early by its consumer counts as a success, and a block
+        cancelled by its caller (the caller's own timeout, shutdown) counts as
+        neither success nor failure.
+        """
+        self.check()
+        try:
+            yield
+        except asyncio.CancelledError:
+            self.released()
+            raise
+        except self.failure_types as e:
+            self.failed(e)
+            raise
+        except GeneratorExit:
+            self.succeeded()
+            raise
+        except BaseException:
+            self.released()
+            raise
+        self.succeeded()
+
+    async def call(self, func, *args, key=None, **kwargs):
+        """
+        Await func(*args, **kwargs) behind the circuit, with the adaptive timeout for `key`.
+
+        Raises:
+            CircuitOpenError: without calling func while the circuit is open.
+            asyncio.TimeoutError: if the call took longer than the current timeout.
+        """
+        async with self.guard():
+            started = time.monotonic()
+            result = await asyncio.wait_for(func(*args, **kwargs), self.timeout(key))
+            self.record_latency(time.monotonic() - started, key)
+            return result
+
+    def report(self) -> dict:
+        return {
+            "state": self.state,
+            **self.counters,
+            "timeouts_s": {
+                "default" if key is None else key: round(t.current(), 2) for key, t in self.timeouts.items()
+            },
+        }
+
+
+# Shared breakers, created on first use from DEPENDENCIES
+dependencies = {}
+_crawl_timeouts = {}
+
+
+def dependency(name: str, failure_types=None) -> Dependency:
+    """The shared Dependency for a DEPENDENCIES entry."""
+    found = dependencies.get(name)
+    if found is None:
+        kwargs = {} if failure_types is None else {"failure_types": failure_types}
+        found = dependencies[name] = Dependency(name, DEPENDENCIES[name], **kwargs)
+    return found
+
+
+def crawl_host(url: str, failure_types=None) -> Dependency:
+    """
+    The circuit of the host serving a crawled URL.
+
+    A host that keeps failing is skipped at once for the rest of its reset
+    period. The timeout is shared by all hosts, so it adapts from the first
+    pages crawled instead of starting over for every host.
+    """
+    name = f"crawl {urlsplit(url).hostname}"
+    found = dependencies.get(name)
+    if found is None:
+        kwargs = {} if failure_types is None else {"failure_types": failure_types}
+        found = dependencies[name] = Dependency(name, DEPENDENCIES["crawl"], timeouts=_crawl_timeouts, **kwargs)
+    return found
+
+
+def report() -> dict:
+    """State and counters of every dependency used so far (crawled hosts only once they failed)."""
+    return {
+        name: dep.report() for name, dep in dependencies.items()
+        if not name.startswith("crawl ") or dep.counters["failures"]
+    }
+
@@ -0,0 +1,56 @@
+import asyncio
+import logging
+
+
+class SingleFlight:
+    """
+    Collapse concurrent identical requests into one execution.
+
+    The first caller for a key starts the work as its own task; callers that
+    arrive with the same key while it is running await that task instead of
+    repeating the work. Everyone gets the same result, or the same exception.
+    The work is cancelled only once every waiting caller has been cancelled.
+    Nothing is remembered after completion (that is the response cache's job).
+    Shared results must be treated as read-only.
+    """
+
+    def __init__(self):
+        self.inflight = {}  # key -> [task, waiter count]
+        self.counters = {"executed": 0, "joined": 0}
+
+    async def do(self, key, func, *args, **kwargs):
+        """Run `await func(*args, **kwargs)` once for all concurrent callers with the same key."""
+        flight = self.inflight.get(key)
+        if flight is None:
+            task = asyncio.ensure_future(func(*args, **kwargs))
+            flight = self.inflight[key] = [task, 0]
+            task.add_done_callback(lambda _, key=key, flight=flight: self._land(key, flight))
+            self.counters["executed"] += 1
+        else:
+            self.counters["joined"] += 1
+            logging.debug(f"Joined in-flight request {key!r} ({flight[1]} waiting)")
+
+        flight[1] += 1
+        try:
+            return await asyncio.shield(flight[0])
+        except asyncio.CancelledError:
+            if not flight[0].done() and flight[1] == 1:
+                flight[0].cancel()
+            raise
+        finally:
+            flight[1] -= 1
+
+    def _land(self, key, flight):
+        if self.inflight.get(key) is flight:
+            del self.inflight[key]
+        if not flight[0].cancelled():
+            # Retrieve the exception so an unawaited failure is not reported as never retrieved
+            flight[0].exception()
+
+    def stats(self) -> dict:
+        """Executions started, callers that joined one, and requests in flight right now."""
+        return {**self.counters, "in_flight": len(self.inflight)}
+
+
+# Shared by ask_ollama and DuckDuckGoSearchCrawler.search_and_crawl; keys are namespaced tuples
+single_flight = SingleFlight()
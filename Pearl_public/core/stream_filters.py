@@ -0,0 +1,153 @@
+import re
+
+# Backend log lines the model sometimes echoes; removed from the marker to the end of the line
+LOG_LINE_MARKERS = (
+    "Process User Input:",
+    "Received data from",
+    "Sending request to",
+    "Next Steps:",
+    "Context:",
+)
+
+LOG_LINE_PATTERN = re.compile(r"(Process User Input:|Received data from|Sending request to).*", re.IGNORECASE)
+TRAILER_PATTERN = re.compile(r"(Next Steps:|Context:).*", re.IGNORECASE)
+THINK_OPEN = "<think>"
+THINK_CLOSE = "</think>"
+
+
+def clean_response(output, prompt=""):
+    """Remove echoed backend log lines and apply news formatting to a model response."""
+    cleaned_output = LOG_LINE_PATTERN.sub("", output).strip()
+    cleaned_output = TRAILER_PATTERN.sub("", cleaned_output).strip()
+
+    if "internet_search" in prompt.lower():
+        cleaned_output = cleaned_output.replace("Title:", "**News Update:**\n**Title:**")
+        cleaned_output = cleaned_output.replace("Summary:", "\n**Summary:**")
+        cleaned_output = cleaned_output.replace("Latest Updates:", "\n**Latest Updates:**")
+    return cleaned_output
+
+
+def _partial_suffix(text, markers):
+    """Length of the longest suffix of text that is a proper prefix of one of the markers."""
+    lowered = text[-max(len(m) for m in markers):].lower()
+    for size in range(len(lowered), 0, -1):
+        tail = lowered[-size:]
+        if any(m.lower().startswith(tail) and len(m) > size for m in markers):
+            return size
+    return 0
+
+
+def _tag_prefix(text, tag):
+    """Length of the longest suffix of text that is a proper prefix of tag (a tag split across chunks)."""
+    for size in range(min(len(text), len(tag) - 1), 0, -1):
+        if tag.startswith(text[-size:]):
+            return size
+    return 0
+
+
+class ThinkFilter:
+    """
+    Streaming removal of <think>...</think> blocks (deepseek-r1 reasoning).
+
+    A small state machine: outside a block, visible text is returned by feed()
+    as soon as it arrives; inside one, text is dropped until the matching
+    closing tag (nested blocks are tracked, so an inner </think> does not end
+    the outer one). Only a trailing fragment that may be the start of a tag
+    split across chunks (e.g. "<thi") is held back until the next chunk
+    decides it, so no text is buffered beyond a tag's length. Whitespace
+    before the visible answer (usually right after the block) is dropped, and
+    so is a block still open when the stream ends.
+
+    With think_budget set, over_budget turns True once more than that many
+    chunks (one streamed part is about one token) arrived inside think blocks,
+    so the caller can stop the generation.
+    """
+
+    def __init__(self, think_budget=None):
+        self.think_budget = think_budget
+        self.depth = 0          # Open <think> blocks
+        self.pending = ""       # Held-back possible start of a tag
+        self.think_tokens = 0
+        self.started = False    # Visible text already returned
+
+    @property
+    def in_think(self):
+        return self.depth > 0
+
+    @property
+    def over_budget(self):
+        return self.think_budget is not None and self.think_tokens > self.think_budget
+
+    def feed(self, chunk):
+        """Add a streamed chunk; returns the visible text it completes (possibly "")."""
+        text = self.pending + chunk
+        self.pending = ""
+        visible = []
+        if self.in_think and chunk:
+            self.think_tokens += 1
+        while text:
+            start = text.find(THINK_OPEN)
+            if self.in_think:
+                end = text.find(THINK_CLOSE)
+                if start != -1 and (end == -1 or start < end):
+                    self.depth += 1
+                    text = text[start + len(THINK_OPEN):]
+                    continue
+                if end == -1:
+                    held = max(_tag_prefix(text, THINK_CLOSE), _tag_prefix(text, THINK_OPEN))
+                    self.pending = text[len(text) - held:] if held else ""
+                    break
+                self.depth -= 1
+                text = text[end + len(THINK_CLOSE):]
+            else:
+                if start == -1:
+                    held = _tag_prefix(text, THINK_OPEN)
+                    visible.append(text[:len(text) - held])
+                    self.pending = text[len(text) - held:] if held else ""
+                    break
+                visible.append(text[:start])
+                text = text[start + len(THINK_OPEN):]
+                self.depth = 1
+        return self._strip_gap("".join(visible))
+
+    def flush(self):
+        """End of stream: returns a held-back fragment that turned out not to be a tag."""
+        text = "" if self.in_think else self.pending
+        self.pending = ""
+        return self._strip_gap(text)
+
+    def _strip_gap(self, text):
+        if not self.started:
+            text = text.lstrip()
+            self.started = bool(text)
+        return text
+
+
+class StreamCleaner:
+    """
+    Incremental version of clean_response for streamed generations.
+
+    Chunks are fed as they arrive; visible() returns the cleaned text so far.
+    Anything that could still turn into a removed span is held back: an
+    unclosed <think> block, or a trailing fragment that is the start of a
+    log-line marker. The visible text therefore only ever grows, except for
+    surrounding whitespace, and equals clean_response() once the stream ends.
+    Think blocks are removed by a ThinkFilter as the chunks arrive.
+    """
+
+    def __init__(self, prompt="", think_budget=None):
+        self.prompt = prompt
+        self.buffer = ""
+        self.think = ThinkFilter(think_budget)
+
+    def feed(self, chunk):
+        self.buffer += self.think.feed(chunk)
+
+    def visible(self, final=False):
+        if final:
+            self.buffer += self.think.flush()
+            return clean_response(self.buffer, self.prompt)
+
+        text = self.buffer[:len(self.buffer) - _partial_suffix(self.buffer, LOG_LINE_MARKERS)]
+        return clean_response(text, self.prompt)
+
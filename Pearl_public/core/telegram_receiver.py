@@ -1,22 +1,40 @@
 import aiohttp
 import asyncio
+import json
 import logging
-from typing import Optional, Dict, Any
+import time
+from typing import Optional, Dict, Any, AsyncIterator
 
-from config.telegram_settings import BOT_TOKEN, CHAT_ID
+from config.telegram_settings import BOT_TOKEN, CHAT_ID, STREAM_EDIT_INTERVAL, LONG_POLL_TIMEOUT
+from config.resilience_settings import TELEGRAM_RETRY_DELAY
 from core.modules_loader import available_functions
+from core.resilience import dependency, CircuitOpenError
 from utils.logger import log_error, log_info, log_warning
 
 # API URLs and constants
 TELEGRAM_API_URL = f"https://api.telegram.org/bot{BOT_TOKEN}"
 SEND_MESSAGE_URL = f"{TELEGRAM_API_URL}/sendMessage"
+EDIT_MESSAGE_URL = f"{TELEGRAM_API_URL}/editMessageText"
 GET_UPDATES_URL = f"{TELEGRAM_API_URL}/getUpdates"
+SET_WEBHOOK_URL = f"{TELEGRAM_API_URL}/setWebhook"
+DELETE_WEBHOOK_URL = f"{TELEGRAM_API_URL}/deleteWebhook"
 MAX_MESSAGE_LENGTH = 4096
 DEFAULT_TIMEOUT = 30
 
 # Global list to keep track of messages Pearl sends
 tracking_sent_messages = []
 
+# Circuit breakers for the Bot API; 5xx and 429 responses count as failures too.
+# Long polls have their own, so a held-open getUpdates never blocks sending.
+telegram_api = dependency("telegram", (aiohttp.ClientError, asyncio.TimeoutError))
+telegram_poll = dependency("telegram_poll", (aiohttp.ClientError, asyncio.TimeoutError))
+
+
+def _raise_for_outage(response: aiohttp.ClientResponse, body: str):
+    if response.status >= 500 or response.status == 429:
+        raise aiohttp.ClientResponseError(response.request_info, response.history, status=response.status,
+                                          message=body)
+
 
 class TelegramClient:
     """Persistent Telegram API client with enhanced security."""
@@ -40,45 +58,104 @@ class TelegramClient:
             response_data = await response.json()
             return response_data.get("result", {})
 
-    async def get_updates(self, offset: Optional[int] = None, max_retries: int = 5, timeout: int = 30) -> list:
+    async def get_updates(self, offset: Optional[int] = None, max_retries: int = 5, timeout: int = LONG_POLL_TIMEOUT) -> list:
         """
         Fetch updates from the Telegram API with retry logic.
+
+        Uses long polling: Telegram keeps the request open until an update
+        arrives or `timeout` seconds pass, so no client-side sleep is needed
+        between calls and new messages are delivered immediately. Failed
+        attempts are retried after TELEGRAM_RETRY_DELAY; once the polling
+        circuit opens, this waits until it lets a trial request through and
+        returns no updates. Polls have a circuit of their own (telegram_poll),
+        so sendMessage and editMessageText never wait for a long poll.
         
         Args:
             offset (int, optional): Identifier of the first update to be returned.
             max_retries (int): Maximum number of retries on failure.
-            timeout (int): Timeout for the request in seconds.
+            timeout (int): Long-polling timeout in seconds (0 for a short poll).
             
         Returns:
             list: A list of update objects.
         """
-        params = {'offset': offset} if offset is not None else {}
+        params = {'timeout': timeout}
+        if offset is not None:
+            params['offset'] = offset
+        # The HTTP request must outlive the long poll itself
+        request_timeout = aiohttp.ClientTimeout(total=timeout + DEFAULT_TIMEOUT)
         retries = 0
 
         while retries < max_retries:
             try:
-                async with self.session.get(GET_UPDATES_URL, params=params) as response:
-                    if response.status == 200:
-                        updates = await response.json()
-                        logging.debug(f"Received updates: {updates}")
-                        return updates.get("result", [])
-                    else:
-                        log_error(f"Failed to get updates: {response.status} - {await response.text()}")
+                # The long poll keeps its fixed timeout; only the circuit applies here
+                async with telegram_poll.guard():
+                    async with self.session.get(GET_UPDATES_URL, params=params, timeout=request_timeout) as response:
+                        if response.status == 200:
+                            updates = await response.json()
+                            logging.debug(f"Received updates: {updates}")
+                            return updates.get("result", [])
+                        body = await response.text()
+                        _raise_for_outage(response, body)
+                retries += 1
+                log_error(f"Failed to get updates: {response.status} - {body}")
+            except CircuitOpenError as e:
+                log_warning(f"🔌 {e}; polling again then")
+                await asyncio.sleep(e.retry_after)
+                return []
             except aiohttp.ClientError as e:
                 retries += 1
                 log_warning(f"Connection error, retrying ({retries}/{max_retries}): {e}")
-                await asyncio.sleep(2 ** retries)
             except asyncio.TimeoutError:
                 retries += 1
                 log_warning(f"Request timeout, retrying ({retries}/{max_retries})")
-                await asyncio.sleep(2 ** retries)
             except Exception as e:
                 log_error(f"Unexpected error: {e}")
                 break
+            await asyncio.sleep(TELEGRAM_RETRY_DELAY)
 
         log_error("Max retries reached. Could not fetch updates.")
         return []
 
+    async def set_webhook(self, url: str, secret_token: Optional[str] = None) -> bool:
+        """Ask Telegram to push updates to `url` instead of serving getUpdates."""
+        payload = {"url": url, "allowed_updates": ["message"]}
+        if secret_token:
+            payload["secret_token"] = secret_token
+        async with self.session.post(SET_WEBHOOK_URL, json=payload) as response:
+            data = await response.json()
+            if response.status == 200 and data.get("ok"):
+                log_info(f"✅ Webhook set to {url}")
+                return True
+            log_error(f"❌ setWebhook failed: {response.status} - {data}")
+            return False
+
+    async def delete_webhook(self) -> bool:
+        """Remove any webhook so getUpdates polling works again."""
+        async with self.session.post(DELETE_WEBHOOK_URL, json={}) as response:
+            data = await response.json()
+            if response.status == 200 and data.get("ok"):
+                return True
+            log_error(f"❌ deleteWebhook failed: {response.status} - {data}")
+            return False
+
+    async def _post(self, url: str, payload: dict):
+        """
+        POST to the Bot API behind the Telegram circuit, with its adaptive timeout.
+
+        Returns:
+            tuple: (HTTP status, response body).
+        Raises:
+            CircuitOpenError: at once while Telegram is failing.
+        """
+        async with telegram_api.guard():
+            started = time.monotonic()
+            async with asyncio.timeout(telegram_api.timeout("post")):
+                async with self.session.post(url, json=payload) as response:
+                    body = await response.text()
+                    _raise_for_outage(response, body)
+            telegram_api.record_latency(time.monotonic() - started, "post")
+            return response.status, body
+
     async def send_message(self, chat_id: int, text: str, max_retries: int = 3) -> bool:
         """Send a message to Telegram."""
         if not chat_id or not text:
@@ -96,12 +173,15 @@ class TelegramClient:
                     "chat_id": chat_id,
                     "text": message,
                 }
-                async with self.session.post(SEND_MESSAGE_URL, json=payload) as response:
-                    if response.status == 200:
-                        log_info(f"✅ Message sent to {chat_id}")
-                        return True
-                    else:
-                        log_error(f"❌ Failed: {response.status} - {await response.text()}")
+                status, body = await self._post(SEND_MESSAGE_URL, payload)
+                if status == 200:
+                    log_info(f"✅ Message sent to {chat_id}")
+                    return True
+                else:
+                    log_error(f"❌ Failed: {status} - {body}")
+            except CircuitOpenError as e:
+                log_warning(f"🔌 {e}; message not sent")
+                return False
             except asyncio.CancelledError:
                 log_warning("⚠️ Send cancelled")
                 raise
@@ -112,6 +192,95 @@ class TelegramClient:
 
         return False
 
+    async def send_message_for_edit(self, chat_id: int, text: str) -> Optional[int]:
+        """Send a message and return its message_id so it can be edited later."""
+        if not chat_id or not text:
+            log_warning("⚠️ Missing chat_id or text")
+            return None
+
+        payload = {"chat_id": chat_id, "text": str(text)[:MAX_MESSAGE_LENGTH]}
+        try:
+            status, body = await self._post(SEND_MESSAGE_URL, payload)
+            if status == 200:
+                return json.loads(body).get("result", {}).get("message_id")
+            log_error(f"❌ Failed: {status} - {body}")
+        except CircuitOpenError as e:
+            log_warning(f"🔌 {e}; message not sent")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            log_error(f"❌ Error: {str(e)}")
+        return None
+
+    async def edit_message_text(self, chat_id: int, message_id: int, text: str) -> bool:
+        """Replace the text of a message previously sent by the bot."""
+        payload = {"chat_id": chat_id, "message_id": message_id, "text": str(text)[:MAX_MESSAGE_LENGTH]}
+        try:
+            status, body = await self._post(EDIT_MESSAGE_URL, payload)
+            if status == 200 or "message is not modified" in body:
+                return True
+            log_error(f"❌ Edit failed: {status} - {body}")
+        except CircuitOpenError as e:
+            log_warning(f"🔌 {e}; edit skipped")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            log_error(f"❌ Edit error: {str(e)}")
+        return False
+
+    async def stream_message(self, chat_id: int, snapshots: AsyncIterator[str],
+                             min_edit_interval: float = STREAM_EDIT_INTERVAL,
+                             message_ids: Optional[list] = None) -> str:
+        """
+        Show a growing response as one message that is edited in place.
+
+        Args:
+            chat_id (int): Chat to reply to.
+            snapshots: Async iterator yielding the full visible text so far.
+            min_edit_interval (float): Minimum seconds between two edits.
+            message_ids (list, optional): Messages already sent for this reply
+                (e.g. by an attempt that failed midway). They are edited
+                instead of sending new ones, and messages sent now are appended.
+
+        The first non-empty snapshot is sent immediately. Later snapshots are
+        coalesced into at most one editMessageText call per interval, and the
+        final text is always flushed. Text beyond Telegram's limit continues
+        in a new message.
+
+        Returns:
+            str: The final text.
+        """
+        message_ids = [] if message_ids is None else message_ids
+        shown = [None] * len(message_ids)
+        text = ""
+        last_edit = 0.0
+
+        async def flush(current: str):
+            pages = [current[i:i + MAX_MESSAGE_LENGTH] for i in range(0, len(current), MAX_MESSAGE_LENGTH)]
+            for index, page in enumerate(pages):
+                if index < len(message_ids):
+                    if shown[index] != page:
+                        await self.edit_message_text(chat_id, message_ids[index], page)
+                        shown[index] = page
+                else:
+                    message_id = await self.send_message_for_edit(chat_id, page)
+                    if message_id is None:
+                        return
+                    message_ids.append(message_id)
+                    shown.append(page)
+
+        async for text in snapshots:
+            if not text.strip():
+                continue
+            now = time.monotonic()
+            if not message_ids or now - last_edit >= min_edit_interval:
+                await flush(text)
+                last_edit = now
+
+        if text.strip():
+            await flush(text)
+        return text
+
     async def handle_update(self, update: Dict[str, Any]) -> None:
 
         from core.command_handler import process_user_input
@@ -156,13 +325,13 @@ async def main():
     offset = None
     try:
         while True:
+            # Long poll: returns as soon as updates arrive, no sleep needed
             updates = await telegram_client.get_updates(offset)
             for update in updates:
                 await telegram_client.handle_update(update)
                 update_id = update.get("update_id")
                 if update_id is not None:
                     offset = update_id + 1
-            await asyncio.sleep(1)
     except KeyboardInterrupt:
         log_info("Shutting down...")
     finally:
@@ -0,0 +1,139 @@
+import asyncio
+import hmac
+import json
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import aiohttp
+from aiohttp import web
+
+from config.telegram_settings import (
+    WEBHOOK_LISTEN_HOST,
+    WEBHOOK_LISTEN_PORT,
+    WEBHOOK_PATH,
+    WEBHOOK_SECRET,
+    WEBHOOK_QUEUE_SIZE,
+)
+from utils.logger import log_error, log_info, log_warning
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+class TelegramWebhookServer:
+    """
+    Receive Telegram updates pushed to a local aiohttp endpoint.
+
+    POSTed updates are checked against the secret token, queued, and handed
+    one by one to `handler` (normally TelegramClient.handle_update) by a
+    consumer task. A full queue answers 503 so Telegram retries later.
+    """
+
+    def __init__(self, handler: Callable[[Dict[str, Any]], Awaitable[None]],
+                 host: str = WEBHOOK_LISTEN_HOST, port: int = WEBHOOK_LISTEN_PORT,
+                 path: str = WEBHOOK_PATH, secret_token: Optional[str] = WEBHOOK_SECRET,
+                 queue_size: int = WEBHOOK_QUEUE_SIZE):
+        self.handler = handler
+        self.host = host
+        self.port = port
+        self.path = path
+        self.secret_token = secret_token
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.last_update_id: Optional[int] = None
+        self.runner: Optional[web.AppRunner] = None
+        self.consumer: Optional[asyncio.Task] = None
+
+    def make_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post(self.path, self.handle_post)
+        return app
+
+    async def start(self):
+        """Start the HTTP listener and the queue consumer."""
+        self.runner = web.AppRunner(self.make_app())
+        await self.runner.setup()
+        await web.TCPSite(self.runner, self.host, self.port).start()
+        self.consumer = asyncio.create_task(self.consume())
+        log_info(f"✅ Webhook server listening on {self.host}:{self.port}{self.path}")
+
+    async def stop(self):
+        """Stop accepting updates, then stop the consumer."""
+        if self.runner:
+            await self.runner.cleanup()
+            self.runner = None
+        if self.consumer:
+            self.consumer.cancel()
+            try:
+                await self.consumer
+            except asyncio.CancelledError:
+                pass
+            self.consumer = None
+        log_info("✅ Webhook server stopped")
+
+    async def handle_post(self, request: web.Request) -> web.Response:
+        """Validate one pushed update and queue it."""
+        if self.secret_token:
+            received = request.headers.get(SECRET_HEADER, "")
+            if not hmac.compare_digest(received, self.secret_token):
+                log_warning("⚠️ Webhook request with invalid secret token rejected")
+                return web.Response(status=401)
+
+        try:
+            update = await request.json()
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            return web.Response(status=400, text="invalid JSON")
+        if not isinstance(update, dict):
+            return web.Response(status=400, text="update must be an object")
+
+        # Telegram re-delivers updates it did not get a 200 for; drop repeats
+        update_id = update.get("update_id")
+        if update_id is not None and self.last_update_id is not None and update_id <= self.last_update_id:
+            return web.Response(status=200)
+
+        try:
+            self.queue.put_nowait(update)
+        except asyncio.QueueFull:
+            log_warning("⚠️ Webhook queue full, asking Telegram to retry")
+            return web.Response(status=503)
+
+        if update_id is not None:
+            self.last_update_id = update_id
+        return web.Response(status=200)
+
+    async def consume(self):
+        """Hand queued updates to the handler."""
+        while True:
+            update = await self.queue.get()
+            try:
+                await self.handler(update)
+            except Exception as e:
+                log_error(f"❌ Webhook update handler error: {e}")
+            finally:
+                self.queue.task_done()
+
+
+def load_recorded_updates(path: str) -> List[Dict[str, Any]]:
+    """Read recorded update JSON; the file may hold one update object or a list of them."""
+    with open(path, "r") as f:
+        recorded = json.load(f)
+    return recorded if isinstance(recorded, list) else [recorded]
+
+
+async def replay_recorded_updates(updates: List[Dict[str, Any]], url: Optional[str] = None,
+                                  secret_token: Optional[str] = WEBHOOK_SECRET) -> List[int]:
+    """
+    POST recorded updates to a webhook endpoint one by one, as Telegram would.
+
+    Used to test the webhook locally without Telegram, e.g. against the
+    running bot's endpoint (the default url) with load_recorded_updates().
+
+    Returns:
+        list: The HTTP status of each update.
+    """
+    url = url or f"http://127.0.0.1:{WEBHOOK_LISTEN_PORT}{WEBHOOK_PATH}"
+    headers = {SECRET_HEADER: secret_token} if secret_token else {}
+    statuses = []
+    async with aiohttp.ClientSession() as session:
+        for update in updates:
+            async with session.post(url, json=update, headers=headers) as response:
+                statuses.append(response.status)
+            log_info(f"🔁 Replayed update {update.get('update_id')} -> HTTP {statuses[-1]}")
+    return statuses
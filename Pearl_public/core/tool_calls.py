@@ -0,0 +1,290 @@
+import ast
+import json
+import logging
+import re
+
+from config.router_settings import PLAN_MAX_STEPS
+
+# Filled in by the dispatch binder from the message context, never asked from the model
+CONTEXT_PARAMETERS = {"self", "telegram_client", "chat_id", "user_input"}
+
+JSON_TYPES = {
+    "int": "integer",
+    "float": "number",
+    "bool": "boolean",
+    "str": "string",
+    "list": "array",
+    "dict": "object",
+}
+
+REPLY_START = re.compile(r'^\s*\{\s*"reply"\s*:\s*"')
+CALL_START = re.compile(r'^\s*\{\s*"(function|plan)"')
+
+
+class ToolCallError(ValueError):
+    """The model's structured output is not a valid reply or function call."""
+
+
+class PlanStep:
+    """One function call of a plan; it starts once the steps listed in `after` have finished."""
+
+    def __init__(self, step_id, function, arguments, after=()):
+        self.id = step_id
+        self.function = function
+        self.arguments = arguments
+        self.after = list(after)
+
+    def __repr__(self):
+        return f"PlanStep({self.id}: {self.function}, {self.arguments}, after={self.after})"
+
+
+class ToolCall:
+    """A validated router decision: a text reply, a function with typed arguments, or a plan of calls."""
+
+    def __init__(self, function=None, arguments=None, reply=None, plan=None):
+        self.function = function
+        self.arguments = arguments or {}
+        self.reply = reply
+        self.plan = plan or []
+
+    @property
+    def is_call(self) -> bool:
+        return self.function is not None or bool(self.plan)
+
+    @property
+    def is_plan(self) -> bool:
+        return bool(self.plan)
+
+    def __repr__(self):
+        if self.is_plan:
+            return f"ToolCall(plan={self.plan})"
+        return f"ToolCall({self.function}, {self.arguments})" if self.is_call else f"ToolCall(reply={self.reply!r})"
+
+
+def argument_schema(spec) -> dict:
+    """JSON schema of the arguments the model has to supply for a function (from its signature)."""
+    node = ast.parse(f"def _{spec.signature}:\n    pass").body[0]
+    args = node.args
+    positional = args.posonlyargs + args.args
+    defaults = [None] * (len(positional) - len(args.defaults)) + list(args.defaults)
+    parameters = list(zip(positional, defaults)) + list(zip(args.kwonlyargs, args.kw_defaults))
+
+    properties, required = {}, []
+    for arg, default in parameters:
+        if arg.arg in CONTEXT_PARAMETERS:
+            continue
+        annotation = ast.unparse(arg.annotation) if arg.annotation is not None else "str"
+        properties[arg.arg] = {"type": JSON_TYPES.get(annotation.split("[")[0].lower(), "string")}
+        if default is None:
+            required.append(arg.arg)
+    return {"type": "object", "properties": properties, "required": required}
+
+
+def tool_call_schema(specs: dict) -> dict:
+    """
+    Ollama `format` schema for one router decision.
+
+    Args:
+        specs (dict): {"module.function": FunctionSpec} of the functions on offer.
+    Returns:
+        dict: Either {"reply": text}, {"function": one of specs, "arguments": {...}},
+        or {"plan": [{"id", "function", "arguments", "after": [ids]}, ...]} for
+        requests that need several calls.
+    """
+    calls, steps = [], []
+    for key, spec in specs.items():
+        properties = {"function": {"const": key}, "arguments": argument_schema(spec)}
+        calls.append({"type": "object", "properties": properties, "required": ["function", "arguments"]})
+        steps.append({
+            "type": "object",
+            "properties": {
+                "id": {"type": "string"},
+                **properties,
+                "after": {"type": "array", "items": {"type": "string"}},
+            },
+            "required": ["id", "function", "arguments"],
+        })
+    reply = {"type": "object", "properties": {"reply": {"type": "string"}}, "required": ["reply"]}
+    plan = {
+        "type": "object",
+        "properties": {"plan": {"type": "array", "items": {"anyOf": steps}, "minItems": 1, "maxItems": PLAN_MAX_STEPS}},
+        "required": ["plan"],
+    }
+    return {"anyOf": [reply, *calls, plan]}
+
+
+def _coerce(value, json_type):
+    """Return value as the JSON schema type, converting numeric strings; raise ToolCallError otherwise."""
+    if json_type == "integer":
+        if isinstance(value, bool):
+            raise ToolCallError(f"expected integer, got {value!r}")
+        if isinstance(value, int):
+            return value
+        if isinstance(value, float) and value.is_integer():
+            return int(value)
+        if isinstance(value, str) and re.fullmatch(r"-?\d+", value.strip()):
+            return int(value)
+    elif json_type == "number":
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return value
+        if isinstance(value, str):
+            try:
+                return float(value)
+            except ValueError:
+                pass
+    elif json_type == "boolean":
+        if isinstance(value, bool):
+            return value
+        if isinstance(value, str) and value.lower() in ("true", "false"):
+            return value.lower() == "true"
+    elif json_type == "array":
+        if isinstance(value, list):
+            return value
+    elif json_type == "object":
+        if isinstance(value, dict):
+            return value
+    else:
+        return json.dumps(value) if isinstance(value, (list, dict)) else str(value)
+    raise ToolCallError(f"expected {json_type}, got {value!r}")
+
+
+def _typed_call(data: dict, specs: dict):
+    """Validate {"function", "arguments"} and return (key, typed arguments)."""
+    key = data.get("function")
+    if key not in specs:
+        raise ToolCallError(f"unknown function {key!r}")
+    arguments = data.get("arguments") or {}
+    if not isinstance(arguments, dict):
+        raise ToolCallError("arguments must be an object")
+
+    properties = argument_schema(specs[key])["properties"]
+    typed = {}
+    for name, value in arguments.items():
+        if name not in properties:
+            logging.debug(f"Dropping unknown argument {name!r} for {key}")
+            continue
+        try:
+            typed[name] = _coerce(value, properties[name]["type"])
+        except ToolCallError as e:
+            raise ToolCallError(f"{key} argument {name!r}: {e}") from e
+    return key, typed
+
+
+def typed_arguments(key: str, arguments: dict, spec) -> dict:
+    """
+    Arguments for one function converted to its parameter types (e.g. "40" -> 40 for an int).
+
+    Raises:
+        ToolCallError: if a value cannot be converted.
+    """
+    return _typed_call({"function": key, "arguments": arguments}, {key: spec})[1]
+
+
+def _parse_plan(items, specs: dict) -> list:
+    """Validate plan steps: known functions, unique ids, and dependencies that exist and form no cycle."""
+    if not isinstance(items, list) or not items:
+        raise ToolCallError("plan must be a non-empty list")
+    if len(items) > PLAN_MAX_STEPS:
+        raise ToolCallError(f"plan has {len(items)} steps, at most {PLAN_MAX_STEPS} are allowed")
+
+    steps = {}
+    for number, item in enumerate(items, 1):
+        if not isinstance(item, dict):
+            raise ToolCallError("plan steps must be objects")
+        step_id = str(item.get("id") or number)
+        if step_id in steps:
+            raise ToolCallError(f"duplicate plan step id {step_id!r}")
+        after = item.get("after") or []
+        if not isinstance(after, list):
+            raise ToolCallError(f"step {step_id!r}: after must be a list of step ids")
+        key, arguments = _typed_call(item, specs)
+        steps[step_id] = PlanStep(step_id, key, arguments, [str(dep) for dep in after])
+
+    for step in steps.values():
+        unknown = [dep for dep in step.after if dep not in steps]
+        if unknown:
+            raise ToolCallError(f"step {step.id!r} depends on unknown steps {unknown}")
+
+    # Depth-first search for cycles, which would leave their steps waiting forever
+    state = {}
+
+    def visit(step_id, path):
+        if state.get(step_id) == "done":
+            return
+        if state.get(step_id) == "visiting":
+            raise ToolCallError(f"plan has a dependency cycle: {' -> '.join(path + [step_id])}")
+        state[step_id] = "visiting"
+        for dep in steps[step_id].after:
+            visit(dep, path + [step_id])
+        state[step_id] = "done"
+
+    for step_id in steps:
+        visit(step_id, [])
+    return list(steps.values())
+
+
+def parse_tool_call(raw: str, specs: dict) -> ToolCall:
+    """
+    Parse and validate the model's JSON decision.
+
+    Arguments are checked against the function's schema and converted to
+    their declared types. Unknown arguments are dropped; missing required
+    ones are left to the dispatch binder, which fills them by name from the
+    message context (user_input, chat_id). A plan with a single step is returned as a plain call.
+
+    Raises:
+        ToolCallError: if the output is not valid JSON, names an unknown
+        function, or is a plan with unknown or cyclic dependencies.
+    """
+    try:
+        data = json.loads(raw)
+    except json.JSONDecodeError as e:
+        raise ToolCallError(f"invalid JSON: {e}") from e
+    if not isinstance(data, dict):
+        raise ToolCallError("decision must be a JSON object")
+
+    if "plan" in data:
+        plan = _parse_plan(data["plan"], specs)
+        if len(plan) == 1:
+            return ToolCall(function=plan[0].function, arguments=plan[0].arguments)
+        return ToolCall(plan=plan)
+
+    if "function" not in data:
+        reply = data.get("reply")
+        if not isinstance(reply, str):
+            raise ToolCallError("object has neither a function nor a text reply")
+        return ToolCall(reply=reply)
+
+    key, arguments = _typed_call(data, specs)
+    return ToolCall(function=key, arguments=arguments)
+
+
+def output_kind(raw: str):
+    """"reply" or "call" once the start of a streamed decision shows which it is, else None."""
+    if REPLY_START.match(raw):
+        return "reply"
+    if CALL_START.match(raw):
+        return "call"
+    return None
+
+
+def partial_reply(raw: str) -> str:
+    """Decoded text of a (possibly unfinished) streamed {"reply": "..."} so far."""
+    match = REPLY_START.match(raw)
+    if not match:
+        return ""
+    body = raw[match.end():]
+    # Keep everything up to the closing quote, or up to an escape that is not complete yet
+    i = complete = 0
+    while i < len(body) and body[i] != '"':
+        if body[i] == "\\":
+            i += 6 if body[i + 1:i + 2] == "u" else 2
+            if i > len(body):
+                break
+        else:
+            i += 1
+        complete = i
+    try:
+        return json.loads(f'"{body[:complete]}"')
+    except json.JSONDecodeError:
+        return ""
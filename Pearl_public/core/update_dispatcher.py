@@ -0,0 +1,119 @@
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from config.telegram_settings import UPDATE_CONCURRENCY, UPDATE_HIGH_WATER
+
+
+def update_chat_id(update: Dict[str, Any]) -> Optional[int]:
+    """Return the chat an update belongs to (None for updates without a chat)."""
+    for key in ("message", "edited_message", "channel_post", "edited_channel_post"):
+        message = update.get(key)
+        if message:
+            return message.get("chat", {}).get("id")
+    callback = update.get("callback_query")
+    if callback and callback.get("message"):
+        return callback["message"].get("chat", {}).get("id")
+    return None
+
+
+class UpdateDispatcher:
+    """
+    Process Telegram updates concurrently across chats, in order within a chat.
+
+    Every chat gets its own FIFO and at most one worker task, so a slow
+    command in one chat never delays another chat, while messages of the same
+    chat are still handled one after the other. A global semaphore caps how
+    many handlers run at once, and submit() blocks once `high_water` updates
+    are pending, pushing back on the receive loop instead of buffering
+    without bound.
+
+    Queueing an update is not handling it: every submitted update stays in
+    `unhandled` until its handler has finished, so the receive loop can
+    persist those updates (checkpoint()) and submit them again after a
+    restart. `on_idle` is called whenever the last unhandled update is done.
+    """
+
+    def __init__(self, handler: Callable[[Dict[str, Any]], Awaitable[None]],
+                 max_concurrency: int = UPDATE_CONCURRENCY, high_water: int = UPDATE_HIGH_WATER,
+                 on_idle: Optional[Callable[[], None]] = None):
+        self.handler = handler
+        self.high_water = high_water
+        self.on_idle = on_idle
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.queues: Dict[Optional[int], deque] = {}
+        self.workers: Dict[Optional[int], asyncio.Task] = {}
+        self.pending = 0
+        self.unhandled: Dict[int, Dict[str, Any]] = {}  # By update_id, in submission order
+        self.next_offset: Optional[int] = None          # getUpdates offset after the last submitted update
+        self._space = asyncio.Condition()
+
+    def checkpoint(self) -> Tuple[Optional[int], List[Dict[str, Any]]]:
+        """The next getUpdates offset and the submitted updates whose handler has not finished."""
+        return self.next_offset, list(self.unhandled.values())
+
+    async def restore(self, offset: Optional[int], unhandled: List[Dict[str, Any]]) -> None:
+        """Continue from a saved checkpoint: its offset, then its unhandled updates submitted again."""
+        self.next_offset = offset
+        for update in unhandled:
+            await self.submit(update)
+
+    async def submit(self, update: Dict[str, Any]) -> None:
+        """Queue an update for its chat, waiting while the dispatcher is above the high-water mark."""
+        if self.pending >= self.high_water:
+            logging.warning(f"⚠️ {self.pending} updates pending, applying backpressure")
+            async with self._space:
+                await self._space.wait_for(lambda: self.pending < self.high_water)
+
+        chat_id = update_chat_id(update)
+        self.queues.setdefault(chat_id, deque()).append(update)
+        self.pending += 1
+        update_id = update.get("update_id")
+        if update_id is not None:
+            self.unhandled[update_id] = update
+            if self.next_offset is None or update_id >= self.next_offset:
+                self.next_offset = update_id + 1
+        if chat_id not in self.workers:
+            self.workers[chat_id] = asyncio.create_task(self._run_chat(chat_id))
+
+    async def _run_chat(self, chat_id: Optional[int]) -> None:
+        """Drain one chat's queue in order, then exit."""
+        queue = self.queues[chat_id]
+        try:
+            while queue:
+                update = queue.popleft()
+                try:
+                    async with self.semaphore:
+                        await self.handler(update)
+                except Exception as e:
+                    logging.error(f"❌ Error handling update {update.get('update_id')} for chat {chat_id}: {e}")
+                finally:
+                    self.pending -= 1
+                    async with self._space:
+                        self._space.notify_all()
+                # Not reached when cancelled: the update stays unhandled
+                self._handled(update)
+        finally:
+            # No await between the empty check above and here, so no update can be stranded
+            self.workers.pop(chat_id, None)
+            if not queue:
+                self.queues.pop(chat_id, None)
+
+    def _handled(self, update: Dict[str, Any]) -> None:
+        if self.unhandled.pop(update.get("update_id"), None) is not None and not self.unhandled and self.on_idle:
+            self.on_idle()
+
+    async def join(self) -> None:
+        """Wait until every queued update has been handled."""
+        while self.workers:
+            await asyncio.gather(*list(self.workers.values()), return_exceptions=True)
+
+    async def stop(self) -> None:
+        """Cancel all chat workers and drop queued updates (they stay in `unhandled`)."""
+        for task in list(self.workers.values()):
+            task.cancel()
+        await asyncio.gather(*list(self.workers.values()), return_exceptions=True)
+        self.workers.clear()
+        self.queues.clear()
+        self.pending = 0
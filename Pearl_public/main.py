@@ -2,20 +2,34 @@
 import asyncio
 import json
 import logging
+import os
+import tempfile
 import importlib
 from datetime import datetime
-from typing import Any
+from typing import Any, Optional, Tuple
 
 # Third-party imports
 import schedule
 import httpx
 
 # Local imports
-from config.telegram_settings import BOT_TOKEN, CHAT_ID
-from core.modules_loader import available_functions
+from config.telegram_settings import BOT_TOKEN, CHAT_ID, RECEIVE_MODE, WEBHOOK_URL, WEBHOOK_SECRET
+from core.modules_loader import available_functions, get_registry
+from core.dispatch_table import get_dispatch_table, MissingArgumentsError, FunctionNotFoundError
+from core.function_index import get_function_index
 from core.telegram_receiver import TelegramClient
+from core.telegram_webhook import TelegramWebhookServer
+from core.update_dispatcher import UpdateDispatcher
 from core.ollama_integration import ask_ollama
+from core import ollama_client
+from core.llm_scheduler import llm_scheduler, LLM_REMINDER
+from core.early_stop import early_stops
+from core.generation_profiles import profile_stats, num_ctx_conflicts
+from core.model_residency import model_residency
+from core import resilience
 from core.package_installer import install_package
+from core.function_executor import executor, background_executor, PRIORITY_NORMAL
+from core.offload import shutdown_pools
 
 # Configure logging
 logging.basicConfig(
@@ -28,8 +42,6 @@ logging.basicConfig(
 )
 
 OFFSET_FILE = "offset.json"
-# Global command queue
-command_queue = asyncio.Queue()
 
 
 async def run_schedule():
@@ -88,19 +100,54 @@ async def ensure_package_installed(package_name: str, chat_id: int, telegram_cli
         return False
 
 
-def load_offset() -> Any:
-    """Load the offset from a file."""
+def load_offset() -> Tuple[Optional[int], list]:
+    """Load the offset, and the updates that were not handled yet, from a file."""
     try:
         with open(OFFSET_FILE, "r") as f:
-            return json.load(f).get("offset", None)
+            saved = json.load(f)
+        return saved.get("offset", None), saved.get("unhandled", [])
     except (FileNotFoundError, json.JSONDecodeError):
-        return None
+        return None, []
+
+
+def save_offset(offset: int, unhandled: list = ()) -> None:
+    """Save the offset and the unhandled updates to a file atomically (temp file + rename)."""
+    directory = os.path.dirname(os.path.abspath(OFFSET_FILE))
+    fd, tmp_path = tempfile.mkstemp(prefix=".offset-", suffix=".json", dir=directory)
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump({"offset": offset, "unhandled": list(unhandled)}, f)
+        os.replace(tmp_path, OFFSET_FILE)
+    except Exception:
+        os.unlink(tmp_path)
+        raise
+
+
+async def save_offset_async(offset: int, unhandled: list = ()) -> None:
+    """Save the offset from a worker thread so file I/O never blocks the event loop."""
+    try:
+        await asyncio.to_thread(save_offset, offset, unhandled)
+    except Exception as e:
+        logging.error(f"❌ Failed to save offset {offset}: {e}")
+
+
+_offset_lock = asyncio.Lock()
+# Saves started when the dispatcher runs empty; referenced here so they are not garbage collected mid-save
+_idle_saves = set()
 
 
-def save_offset(offset: int) -> None:
-    """Save the offset to a file."""
-    with open(OFFSET_FILE, "w") as f:
-        json.dump({"offset": offset}, f)
+async def save_checkpoint(dispatcher: UpdateDispatcher) -> None:
+    """Save the dispatcher's offset and unhandled updates; one save at a time, each with the latest state."""
+    async with _offset_lock:
+        await save_offset_async(*dispatcher.checkpoint())
+
+
+def schedule_checkpoint(dispatcher: UpdateDispatcher) -> asyncio.Task:
+    """Start save_checkpoint in the background (for the dispatcher's on_idle) and keep track of it."""
+    task = asyncio.create_task(save_checkpoint(dispatcher))
+    _idle_saves.add(task)
+    task.add_done_callback(_idle_saves.discard)
+    return task
 
 
 import asyncio
@@ -108,42 +155,58 @@ import importlib
 import logging
 from typing import Any
 
-async def execute_function(module_name: str, function_name: str, *args: Any, telegram_client: "TelegramClient" = None, chat_id: int = None, **kwargs: Any) -> Any:
+async def call_function(module_name: str, function_name: str, *args: Any, telegram_client: "TelegramClient" = None, chat_id: int = None, user_input: str = None, **kwargs: Any) -> Any:
+    """
+    Call a function from the dynamically updated list of available functions.
+
+    Functions are resolved through the shared dispatch table, so a call is a dict
+    lookup plus the call itself. Required parameters that were not passed are
+    filled by name from user_input, chat_id and telegram_client (see
+    DispatchEntry.bind).
+
+    Raises:
+        FunctionNotFoundError: if module.function is not exposed.
+        MissingArgumentsError: if required parameters are still without a value.
+        Exception: whatever loading or running the function raised.
+    """
+    entry = get_dispatch_table().lookup(module_name, function_name)
+    if entry is None:
+        raise FunctionNotFoundError(module_name, function_name, available_functions().get(module_name, []))
+
+    context = {"user_input": user_input, "chat_id": chat_id, "telegram_client": telegram_client}
+    call_args, call_kwargs = entry.bind(args, kwargs, context)
+    logging.info(f"⚡ Executing: {entry.key}(*{call_args}, **{call_kwargs})")
+
+    result = await entry.call(call_args, call_kwargs)
+
+    logging.info(f"✅ Success: {entry.key} → {result}")
+    return result
+
+
+async def execute_function(module_name: str, function_name: str, *args: Any, telegram_client: "TelegramClient" = None, chat_id: int = None, user_input: str = None, **kwargs: Any) -> Any:
     """
     Executes a function from the dynamically updated list of available functions.
-    If the function is not found, logs an error and notifies via telegram if telegram_client and chat_id are provided.
+
+    Like call_function, but errors are logged and, when telegram_client and
+    chat_id are provided, sent to the chat; None is returned instead.
     """
-    # Ensure functions update dynamically
-    functions = available_functions()
-    
-    if module_name not in functions or function_name not in functions[module_name]:
-        available_funcs = ", ".join(functions.get(module_name, []))
-        error_msg = f"❌ Error: Function `{function_name}` not found in `{module_name}`. Try one of: {available_funcs}"
+    try:
+        return await call_function(module_name, function_name, *args, telegram_client=telegram_client,
+                                   chat_id=chat_id, user_input=user_input, **kwargs)
+
+    except FunctionNotFoundError as e:
+        error_msg = f"❌ Error: {e}"
         logging.error(error_msg)
         if telegram_client is not None and chat_id is not None:
             await telegram_client.send_message(chat_id, text=error_msg)
         return None  # Ensure a return value
 
-    try:
-        logging.info(f"🔍 Attempting to import module: modules.{module_name}")
-        module = importlib.import_module(f"modules.{module_name}")
-        
-        logging.info(f"✅ Successfully imported: {module_name}")
-
-        function = getattr(module, function_name, None)
-        if not function:
-            raise AttributeError(f"Could not load function `{function_name}` from module `{module_name}`")
-
-        logging.info(f"⚡ Executing: {module_name}.{function_name}(*{args}, **{kwargs})")
-
-        # Check if function is async or sync
-        if asyncio.iscoroutinefunction(function):
-            result = await function(*args, **kwargs)
-        else:
-            result = function(*args, **kwargs)
-
-        logging.info(f"✅ Success: {module_name}.{function_name} → {result}")
-        return result  # Ensure result is always returned
+    except MissingArgumentsError as e:
+        error_msg = f"❌ Cannot run {e}."
+        logging.error(error_msg)
+        if telegram_client and chat_id:
+            await telegram_client.send_message(chat_id, text=error_msg)
+        return None
 
     except ModuleNotFoundError:
         error_msg = f"❌ Module `{module_name}` not found. Ensure it is correctly installed and accessible."
@@ -168,8 +231,28 @@ async def execute_function(module_name: str, function_name: str, *args: Any, tel
 
 
 
+async def execute_command(command: str, *args, call_kwargs: dict = None, priority: int = PRIORITY_NORMAL,
+                          timeout: float = None) -> Any:
+    """
+    Submit a command to the shared job executor and await its result.
+
+    The executor bounds concurrency, applies per-function timeouts and
+    retries, and records per-job latency. Keyword arguments for the function
+    (and call_function's telegram_client, chat_id, user_input) go in
+    call_kwargs, apart from the job's priority and timeout.
+
+    Expected command format:
+        "execute:module_name.function_name"
+
+    Raises:
+        Exception: the function's error once its retries ran out (see run_job);
+            the caller reports it to the chat.
+    """
+    return await executor.run(command, *args, call_kwargs=call_kwargs, priority=priority, timeout=timeout)
+
+
 # A helper function to parse a command string and execute the corresponding function:
-async def execute_command(command: str, *args, **kwargs) -> Any:
+async def run_command(command: str, *args, **kwargs) -> Any:
     """
     Parse a command string and execute the corresponding function.
     
@@ -204,6 +287,33 @@ async def execute_command(command: str, *args, **kwargs) -> Any:
         return f"Error parsing command: {e}"
 
 
+def parse_command(command: str) -> Tuple[str, str]:
+    """
+    Split "execute:module_name.function_name" into its module and function names.
+
+    Raises:
+        ValueError: if the command does not have that format.
+    """
+    if not command.startswith("execute:"):
+        raise ValueError(f"Invalid command: missing 'execute:' prefix: {command}")
+    parts = command[len("execute:"):].strip().split(".")
+    if len(parts) != 2:
+        raise ValueError(f"Invalid function call format: {command}")
+    return parts[0], parts[1]
+
+
+async def run_job(command: str, *args, **kwargs) -> Any:
+    """
+    Executor runner: parse the command and call its function.
+
+    Errors are raised, not reported, so the executor sees failed jobs and
+    retries them (FUNCTION_RETRIES); whoever submitted the job reports the
+    final error.
+    """
+    module_name, function_name = parse_command(command)
+    return await call_function(module_name, function_name, *args, **kwargs)
+
+
 async def process_ai_response(telegram_client: TelegramClient, chat_id: int, response: str) -> None:
     """Process AI response and execute function if applicable."""
     try:
@@ -242,7 +352,7 @@ async def send_startup_greeting(telegram_client: TelegramClient, chat_id: int) -
         "Generate a unique and friendly startup greeting message for the bot. "
         "Tell the user about the bot's capabilities and how it can help them."
     )
-    message = await ask_ollama(prompt)
+    message = await ask_ollama(prompt, cache_site="startup_greeting", priority=LLM_REMINDER, profile="greeting")
     logging.info(f"Sending startup greeting to {chat_id}: {message}")
     await telegram_client.send_message(chat_id, message)
 
@@ -253,7 +363,7 @@ async def send_daily_greeting(telegram_client: TelegramClient, chat_id: int) ->
         "You are PEARL - Personalized Efficient Assistant for Routine and Learning. "
         "Generate a unique and cheerful morning greeting message for the user."
     )
-    message = await ask_ollama(prompt)
+    message = await ask_ollama(prompt, cache_site="daily_greeting", priority=LLM_REMINDER, profile="greeting")
     logging.info(f"Sending daily greeting to {chat_id}: {message}")
     await telegram_client.send_message(chat_id, message)
 
@@ -279,34 +389,6 @@ async def check_required_packages(telegram_client: TelegramClient) -> None:
         await ensure_package_installed(package, CHAT_ID, telegram_client)
 
 
-async def function_executor():
-    """
-    Continuously checks the command queue and executes commands.
-    """
-    logging.info("Function Executor started.")
-    while True:
-        # Wait for a command to be available in the queue
-        if not command_queue.empty():
-            command = await command_queue.get()
-            result = await execute_command(command)
-            await command_queue.put(command)
-            logging.info(f"🔧 Re-queued command: {command}")
-
-        logging.info(f"Function Executor: Received command: {command}")
-        logging.info("✅ Function Executor is running...")
-        logging.info(f"📌 Commands in queue: {command_queue.qsize()}")
-
-        try:
-            result = await execute_command(command)
-            await command_queue.put(command)
-            logging.info(f"Function Executor: Command '{command}' executed with result: {result}")
-            # Optionally, you might want to notify the user about the result using your telegram_client.
-        except Exception as e:
-            logging.error(f"Function Executor: Error executing command '{command}': {e}")
-        finally:
-            command_queue.task_done()
-        await asyncio.sleep(1)  # Add a small delay to prevent tight loop
-
 async def command_execute(command: str, *args, **kwargs) -> Any:
     """
     Immediately execute a command string.
@@ -348,27 +430,93 @@ async def execute_command_immediately(command: str) -> Any:
     logging.info(f"Immediate Execution: Received command: {command}")
     try:
         # Execute the command directly without queueing
-        result = await execute_command(command)
+        result = await run_command(command)
         logging.info(f"Immediate Execution: Command '{command}' executed with result: {result}")
         return result
     except Exception as e:
         logging.error(f"Immediate Execution: Error executing command '{command}': {e}")
         return f"Error executing command: {e}"
 
+# Jobs submitted to the shared executor are parsed and run by run_job
+executor.runner = run_job
+
 from core.learning import init_learning_db
+from core.llm_cache import response_cache
+from core.single_flight import single_flight
+from core.chat_session import sessions
+from core.conversation_memory import conversation_memory
+from core.intent_router import intent_router
+
+async def poll_updates(telegram_client: TelegramClient, dispatcher: UpdateDispatcher) -> None:
+    """
+    Receive updates with getUpdates long polling.
+
+    Telegram forgets every update below the offset of the next getUpdates
+    call, even one whose handler is still running. So the offset is saved
+    together with the updates not handled yet: once per batch, again when
+    the dispatcher runs empty, and on the way out. After a restart those
+    updates are submitted again before polling resumes.
+    """
+    offset, unhandled = load_offset()
+    if unhandled:
+        logging.info(f"🔁 Submitting {len(unhandled)} updates left unhandled before the restart")
+    await dispatcher.restore(offset, unhandled)
+    dispatcher.on_idle = lambda: schedule_checkpoint(dispatcher)
+    try:
+        # Long polling: get_updates waits server-side for new updates
+        while True:
+            updates = await telegram_client.get_updates(dispatcher.next_offset)
+            for update in updates:
+                # Handled concurrently per chat; only waits here when the dispatcher is saturated
+                await dispatcher.submit(update)
+            # Persist once per batch instead of once per update, before the next
+            # getUpdates call lets Telegram drop this batch
+            if updates:
+                await save_checkpoint(dispatcher)
+    finally:
+        dispatcher.on_idle = None
+        await asyncio.gather(*_idle_saves, return_exceptions=True)
+        await save_checkpoint(dispatcher)
+
+
+async def serve_webhook(telegram_client: TelegramClient, dispatcher: UpdateDispatcher) -> None:
+    """Receive updates pushed by Telegram to the local webhook server."""
+    server = TelegramWebhookServer(dispatcher.submit)
+    await server.start()
+    try:
+        if not await telegram_client.set_webhook(WEBHOOK_URL, WEBHOOK_SECRET):
+            raise RuntimeError("Could not register the webhook with Telegram")
+        await asyncio.Event().wait()  # Serve until cancelled
+    finally:
+        await server.stop()
+
 
 async def main():
     telegram_client = None
+    dispatcher = None
     try:
 
         await init_learning_db()
+        await response_cache.init_db()
+        for model, sizes in num_ctx_conflicts().items():
+            logging.warning(f"⚠️ Generation profiles use num_ctx {sorted(sizes)} for {model}; it reloads on every switch")
+        # Train the fast-path intent model from earlier routing decisions, off the startup path
+        background_executor.submit_call("train_intent_model", intent_router.train)
+
+        # Health-check the Ollama backend pool (when several nodes are configured)
+        ollama_client.backend_pool.start()
+        # Load the router model in the background and keep pinned models loaded
+        model_residency.start()
+
+        # Build the function registry once; later queries only re-check changed files
+        get_registry().scan()
+        # Embed every function once so the first message is routed without waiting
+        await get_function_index().refresh()
 
         # Initialize Telegram client and start it
         telegram_client = TelegramClient(BOT_TOKEN)
         await telegram_client.start()
         
-        offset = load_offset()
-        
         # Run scheduled tasks concurrently
         asyncio.create_task(run_schedule())
         
@@ -386,25 +534,42 @@ async def main():
         await send_startup_greeting(telegram_client, chat_id)
         schedule_daily_greeting(telegram_client, chat_id)
         
-        # Load offset for update polling
-        offset = load_offset()
-        
         # Main update loop
-        while True:
-            updates = await telegram_client.get_updates(offset)
-            for update in updates:
-                await telegram_client.handle_update(update)
-                update_id = update.get("update_id")
-                if update_id is not None:
-                    offset = update_id + 1
-                    save_offset(offset)
-            await asyncio.sleep(1)
+        dispatcher = UpdateDispatcher(telegram_client.handle_update)
+        if RECEIVE_MODE == "webhook":
+            await serve_webhook(telegram_client, dispatcher)
+        else:
+            # A webhook left over from webhook mode would make getUpdates fail
+            await telegram_client.delete_webhook()
+            await poll_updates(telegram_client, dispatcher)
             
     except Exception as e:
         logging.error(f"❌ Fatal error: {e}")
     finally:
+        if dispatcher:
+            await dispatcher.stop()
+        await executor.stop()
+        await background_executor.stop()
+        # Routing decisions still queued when the lane stopped
+        await intent_router.flush(retrain=False)
         if telegram_client:
             await telegram_client.stop()
+        await ollama_client.backend_pool.stop()
+        await model_residency.stop()
+        await ollama_client.close_clients()
+        shutdown_pools()
+        logging.info(f"📊 LLM cache: {response_cache.stats()}")
+        logging.info(f"📊 Single-flight: {single_flight.stats()}")
+        logging.info(f"📊 Chat sessions: {sessions.report()}")
+        logging.info(f"📊 Conversation memory: {conversation_memory.stats()}")
+        logging.info(f"📊 Intent router: {intent_router.report()}")
+        logging.info(f"📊 LLM scheduler: {llm_scheduler.report()}")
+        logging.info(f"📊 Generations stopped early: {early_stops}")
+        logging.info(f"📊 Generation profiles: {profile_stats.report()}")
+        logging.info(f"📊 Model loads: {model_residency.report()}")
+        logging.info(f"📊 Dependencies: {resilience.report()}")
+        if ollama_client.backend_pool.enabled:
+            logging.info(f"📊 Ollama backends: {ollama_client.backend_pool.report()}")
         logging.info("✅ Shutdown complete")
 
 if __name__ == "__main__":
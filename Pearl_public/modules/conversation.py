@@ -44,13 +44,8 @@ async def handle_conversation(user_input: str = "", chat_id: int = 0) -> None:
             module_name, function_name = response.replace("execute:", "").strip().split(".")
             logging.info(f"📌 AI Command Received: {module_name}.{function_name}")
             
-            # Execute function
-            if module_name == "internet_search" and function_name == "search_news":
-                result = await execute_function(module_name, function_name, query=user_input)
-            elif module_name == "research" and function_name == "conduct_research":
-                result = await execute_function(module_name, function_name, topic=user_input)
-            else:
-                result = await execute_function(module_name, function_name)
+            # Execute function; required arguments are bound from user_input
+            result = await execute_function(module_name, function_name, user_input=user_input)
 
             logging.info(f"✅ AI Execution Result: {result}")
 
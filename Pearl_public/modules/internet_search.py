@@ -1,10 +1,25 @@
 import asyncio
 import aiohttp
+import httpx
 import logging
 import pandas as pd
 from bs4 import BeautifulSoup
 from duckduckgo_search import DDGS
+from duckduckgo_search.exceptions import DuckDuckGoSearchException, RatelimitException, TimeoutException
 from core.ollama_integration import ask_ollama  # Assumed to be asynchronous
+from core.offload import run_io, run_cpu
+from config.executor_settings import PARSE_IN_PROCESS_MIN_CHARS
+from core.llm_scheduler import LLM_SUMMARY
+from core.llm_cache import normalize_prompt
+from core.single_flight import single_flight
+from core.resilience import dependency, crawl_host, CircuitOpenError
+
+# Rate limits, network errors and timeouts count against DuckDuckGo (DDGS wraps its
+# HTTP client's errors in DuckDuckGoSearchException); bugs and bad queries do not
+DUCKDUCKGO_FAILURES = (RatelimitException, TimeoutException, DuckDuckGoSearchException, httpx.HTTPError,
+                       asyncio.TimeoutError)
+duckduckgo_api = dependency("duckduckgo", DUCKDUCKGO_FAILURES)
+CRAWL_FAILURES = (aiohttp.ClientError, asyncio.TimeoutError)
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -29,47 +44,86 @@ class DuckDuckGoSearchCrawler:
         return results
 
     async def fetch_page_content(self, session, url):
-        """Fetch webpage content asynchronously."""
+        """
+        Fetch webpage content asynchronously.
+
+        Hosts that keep failing are skipped at once (one circuit per host), and
+        the timeout follows the latency observed on the pages crawled so far.
+        """
         import random
         import time
+        host = crawl_host(url, CRAWL_FAILURES)
+        if host.retry_after:
+            logging.warning(f"Skipping {url} (host failing, retried in {host.retry_after:.0f}s)")
+            return None
         await asyncio.sleep(random.uniform(1,3))
         try:
-            async with session.get(url, headers=self.headers, timeout=9) as response:
-                if response.status != 200:
-                    logging.warning(f"Skipping {url} (HTTP {response.status})")
-                    return None
-                return await response.text()
+            return await host.call(self._get_page, session, url)
+        except CircuitOpenError as e:
+            logging.warning(f"Skipping {url} ({e})")
         except asyncio.TimeoutError:
             logging.warning(f"Timeout fetching {url}")
         except Exception as e:
             logging.warning(f"Failed to fetch {url}: {e}")
         return None
 
+    async def _get_page(self, session, url):
+        async with session.get(url, headers=self.headers) as response:
+            if response.status != 200:
+                logging.warning(f"Skipping {url} (HTTP {response.status})")
+                return None
+            return await response.text()
+
     async def extract_text_from_urls(self, urls):
         """Extract readable text content from a list of URLs."""
         async with aiohttp.ClientSession() as session:
             tasks = [self.fetch_page_content(session, url) for url in urls]
             responses = await asyncio.gather(*tasks)
 
+        texts = await asyncio.gather(*(self.parse_page(html) for html in responses))
+
         extracted_data = []
-        for url, html in zip(urls, responses):
-            if html:
-                soup = BeautifulSoup(html, "html.parser")
-                text = self.extract_visible_text(soup)
-                extracted_data.append({"url": url, "content": text})
-            else:
-                extracted_data.append({"url": url, "content": None})
+        for url, text in zip(urls, texts):
+            extracted_data.append({"url": url, "content": text})
         return extracted_data
 
-    def extract_visible_text(self, soup):
+    async def parse_page(self, html):
+        """
+        Return the visible text of a page (None if it was not fetched).
+
+        Pages from PARSE_IN_PROCESS_MIN_CHARS up are parsed in the process
+        pool, smaller ones in the thread pool.
+        """
+        if not html:
+            return None
+        if len(html) < PARSE_IN_PROCESS_MIN_CHARS:
+            return await run_io(_html_to_text, html)
+        return await run_cpu(_html_to_text, html)
+
+    @staticmethod
+    def extract_visible_text(soup):
         """Extract and clean text from a BeautifulSoup object."""
         for script in soup(["script", "style", "meta", "noscript"]):
             script.extract()
         return soup.get_text(separator="\n", strip=True)
 
     async def search_and_crawl(self, query):
-        """Perform DuckDuckGo search and extract relevant content."""
-        search_results = self.duckduckgo_search(query)
+        """
+        Perform DuckDuckGo search and extract relevant content.
+
+        Concurrent calls for the same query share one search and crawl, so the
+        returned dict may be shared between callers and must not be modified.
+        """
+        key = ("search", self.num_results, normalize_prompt(query))
+        return await single_flight.do(key, self._search_and_crawl, query)
+
+    async def _search_and_crawl(self, query):
+        # DDGS is synchronous; keep it off the event loop
+        try:
+            search_results = await duckduckgo_api.call(run_io, self.duckduckgo_search, query)
+        except CircuitOpenError as e:
+            logging.warning(f"🔌 {e}; returning no search results")
+            return {"search_results": [], "crawled_content": []}
         urls = [result["url"] for result in search_results if result.get("url")]
         if not urls:
             logging.info("No URLs found in search. Skipping crawl.")
@@ -82,6 +136,11 @@ class DuckDuckGoSearchCrawler:
             "crawled_content": crawled_content
         }
 
+def _html_to_text(html):
+    """Parse a page and return its visible text (runs in a worker thread or process)."""
+    soup = BeautifulSoup(html, "html.parser")
+    return DuckDuckGoSearchCrawler.extract_visible_text(soup)
+
 async def summarize_page_content(content):
     """
     Generate a summary for the provided page content using ask_ollama.
@@ -91,7 +150,7 @@ async def summarize_page_content(content):
         return "No content to summarize."
     prompt = f"Summarize the following text in a concise and relevant manner:\n\n{content}"
     try:
-        summary = await ask_ollama(prompt)
+        summary = await ask_ollama(prompt, cache_site="summarize_page", priority=LLM_SUMMARY, profile="summarize_page")
     except Exception as e:
         logging.warning(f"Error summarizing content: {e}")
         summary = "Summary could not be generated."
@@ -20,6 +20,7 @@ from tensorflow.keras.layers import Dense
 
 # Import your internet search crawler
 from modules.internet_search import DuckDuckGoSearchCrawler
+from core.offload import run_io, run_cpu, cpu_bound
 
 logging.basicConfig(level=logging.INFO)
 
@@ -64,7 +65,7 @@ async def build_model_from_internet_search(user_request: str) -> str:
             return "❌ Could not automatically locate or download a CSV dataset from the search results."
 
         # Step 4: Load CSV with pandas
-        df = pd.read_csv(csv_path)
+        df = await run_io(pd.read_csv, csv_path)
         logging.info(f"✅ Loaded dataset from {csv_path} with shape {df.shape}")
 
         # Step 5: Train a basic model
@@ -189,6 +190,16 @@ def _extract_csv_from_text(page_text: str) -> str:
 # Helper: Train an example model with the CSV (placeholder approach)
 # -------------------------------------------------------------------------
 async def _train_example_model(df: pd.DataFrame) -> str:
+    """
+    Train the example model in the process pool so model.fit never blocks the event loop.
+
+    Returns:
+        str: A summary of model performance or an error message.
+    """
+    return await run_cpu(_fit_example_model, df)
+
+@cpu_bound
+def _fit_example_model(df: pd.DataFrame) -> str:
     """
     For demonstration, we'll:
       - Attempt a classification or regression depending on the shape of df.
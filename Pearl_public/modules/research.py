@@ -3,6 +3,7 @@ import logging
 import requests
 from modules.internet_search import  DuckDuckGoSearchCrawler
 from core.ollama_integration import ask_ollama
+from core.llm_scheduler import LLM_SUMMARY
 from modules.internet_search import DuckDuckGoSearchCrawler, search_news
 
 logging.basicConfig(level=logging.INFO)
@@ -41,7 +42,9 @@ async def conduct_research(topic, chat_id=None):
         f"Ensure the analysis is at most 150 words."
     )
     
-    detailed_analysis = await ask_ollama(prompt, chat_id=chat_id)
+    # Cached per topic and chat history: the crawled sources differ between runs, the question does not
+    detailed_analysis = await ask_ollama(prompt, chat_id=chat_id, cache_site="research_analysis", cache_text=topic,
+                                   priority=LLM_SUMMARY, profile="research_analysis")
     
     # Final Report
     research_report = f"*In-Depth Analysis:**\n{detailed_analysis}"
@@ -1,3 +1,4 @@
+import logging
 import os
 import re
 import ast
@@ -5,7 +6,6 @@ import asyncio
 import subprocess
 import shutil
 from pathlib import Path
-import ollama
 import aiofiles
 import importlib.util
 import inspect
@@ -62,11 +62,16 @@ sys.path.append(str(Path(__file__).resolve().parent.parent))
 
 # Import the install_package function from core.package_installer
 from core.package_installer import install_package
+from core.modules_loader import get_registry
+from core import ollama_client
+from core.llm_scheduler import LLM_CODEGEN
+from core.early_stop import generate_until, FunctionBlockParser
+from core.generation_profiles import profile_model
 
 class PearlSelfEditor:
     def __init__(self, repo_path: str):
         self.repo_path = Path(repo_path).resolve()
-        self.llm = ollama
+        self.llm = ollama_client
         self.backup_path = self.repo_path / "backup"
         self.modules_path = self.repo_path / "modules"
         self.core_path = self.repo_path / "core"
@@ -94,6 +99,20 @@ class PearlSelfEditor:
         async with aiofiles.open(abs_path, "r", encoding="utf-8") as f:
             return await f.read()
 
+    async def generate_function_code(self, prompt: str, label: str) -> str:
+        """
+        Ask the codegen model for one async function and return just that function.
+
+        The answer is streamed into a FunctionBlockParser and the generation
+        is stopped as soon as the function block is closed, instead of waiting
+        for the explanation or example usage the model tends to add after it.
+        """
+        code, raw_code = await generate_until(
+            profile_model("codegen"), prompt, FunctionBlockParser(), priority=LLM_CODEGEN, profile="codegen"
+        )
+        logging.debug(f"LLM output ({label}): {raw_code}")
+        return code if code is not None else extract_async_function(raw_code)
+
     def strip_triple_backticks(self, text: str) -> str:
         text = re.sub(r"```+(\w+)?", "", text)
         text = re.sub(r"```", "", text)
@@ -123,11 +142,7 @@ class PearlSelfEditor:
             "Please fix this and return only the valid function code.\n"
             "You may import any packages you deem necessary."
         )
-        client = self.llm.Client()
-        response = client.generate(model="codellama:13b", prompt=fix_prompt)
-        new_code = response.get("response", "")
-        print("DEBUG: LLM output (re_prompt_for_syntax_errors):", new_code)
-        new_code = extract_async_function(new_code)
+        new_code = await self.generate_function_code(fix_prompt, "re_prompt_for_syntax_errors")
         return self.strip_triple_backticks(new_code)
 
     async def test_function(self, file_path: str, function_name: str = "function_to_test") -> bool:
@@ -247,6 +262,13 @@ class PearlSelfEditor:
             if dest.exists():
                 os.remove(dest)
             print(f"No backup found for {file_path}, file removed.")
+        self.refresh_registry(file_path)
+
+    def refresh_registry(self, file_path: str):
+        """Tell the shared function registry that a module file changed."""
+        abs_path = self.repo_path / file_path
+        if abs_path.parent == self.modules_path:
+            get_registry(str(self.modules_path)).refresh_file(str(abs_path))
 
     async def locate_file_for_function(self, python_files, function_name: str) -> str:
         found_in = []
@@ -270,6 +292,7 @@ class PearlSelfEditor:
         abs_path = self.repo_path / file_path
         async with aiofiles.open(abs_path, "w", encoding="utf-8") as f:
             await f.write(new_code)
+        self.refresh_registry(file_path)
 
     async def ask_llm_for_code_when_no_function_name(self, modification_request: str) -> str:
         """
@@ -286,12 +309,7 @@ class PearlSelfEditor:
             f"Modification Request:\n{modification_request}\n\n"
             "Return only the function code with no extra text."
         )
-        client = self.llm.Client()
-        response = client.generate(model="codellama:13b", prompt=prompt)
-        raw_code = response.get("response", "")
-        print("DEBUG: LLM output (ask_llm_for_code_when_no_function_name):", raw_code)
-
-        extracted = extract_async_function(raw_code)
+        extracted = await self.generate_function_code(prompt, "ask_llm_for_code_when_no_function_name")
         extracted = self.strip_triple_backticks(extracted)
         if extracted.startswith("def "):
             print("Detected non-async function, converting to async...")
@@ -315,11 +333,7 @@ class PearlSelfEditor:
             "You may import any packages you deem necessary.\n"
             "Nothing else is allowed."
         )
-        client = self.llm.Client()
-        response = client.generate(model="codellama:13b", prompt=alt_prompt)
-        new_code = response.get("response", "")
-        print("DEBUG: LLM output (alternative approach):", new_code)
-        new_code = extract_async_function(new_code)
+        new_code = await self.generate_function_code(alt_prompt, "alternative approach")
         new_code = self.strip_triple_backticks(new_code)
         syntax_err = self.validate_syntax_or_none(new_code)
         if syntax_err is None:
@@ -356,12 +370,7 @@ class PearlSelfEditor:
                 "Return only the corrected function code, from 'async def' to the last line."
             )
 
-        client = self.llm.Client()
-        response = client.generate(model="codellama:13b", prompt=prompt)
-        raw_code = response.get("response", "")
-        print("DEBUG: LLM output (modify_single_file):", raw_code)
-
-        extracted = extract_async_function(raw_code)
+        extracted = await self.generate_function_code(prompt, "modify_single_file")
         extracted = self.strip_triple_backticks(extracted)
         if extracted.startswith("def "):
             print("Detected non-async function, converting to async...")
@@ -4,6 +4,7 @@ from datetime import datetime, timedelta
 from textblob import TextBlob
 from modules.internet_search import DuckDuckGoSearchCrawler
 from core.ollama_integration import ask_ollama
+from core.llm_scheduler import LLM_SUMMARY
 
 logging.basicConfig(level=logging.INFO)
 
@@ -50,7 +51,8 @@ class SentimentAnalysis:
             f"The overall sentiment polarity is {sentiment_scores['polarity']:.2f}, and subjectivity is {sentiment_scores['subjectivity']:.2f}.\n"
             f"Provide a concise summary of the general opinion and trends from the articles."
         )
-        summary = await ask_ollama(summary_prompt)
+        summary = await ask_ollama(summary_prompt, cache_site="sentiment_summary", priority=LLM_SUMMARY,
+                                   profile="summarize_page")
 
         return {
             "summary": summary,
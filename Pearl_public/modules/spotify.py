@@ -3,6 +3,7 @@ import logging
 import asyncio
 from spotipy.oauth2 import SpotifyOAuth
 from spotipy.exceptions import SpotifyException
+from core.offload import run_io
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -74,16 +75,17 @@ class SpotifyController:
         logging.info(f"📱 Using fallback device: {devices[0]['name']}")
         return True
 
-    async def execute_with_device_check(self, action, *args):
+    async def execute_with_device_check(self, action, *args, **kwargs):
         """Ensures a device is available before executing an action"""
-        if not self.device_id and not self.refresh_device():
+        # spotipy is synchronous, so its HTTP calls run in the I/O thread pool
+        if not self.device_id and not await run_io(self.refresh_device):
             return "❌ No active Spotify device found. Open Spotify and start playing."
 
         try:
             if asyncio.iscoroutinefunction(action):
-                return await action(*args)
+                return await action(*args, **kwargs)
             else:
-                return action(*args)
+                return await run_io(action, *args, **kwargs)
         except SpotifyException as e:
             logging.error(f"❌ Spotify API Error: {e}")
             return f"Error: {str(e)}"
@@ -94,12 +96,26 @@ class SpotifyController:
     # Exposed functions for Pearl
     async def play_pause(self):
         """Toggle play/pause"""
-        current_playback = self.sp.current_playback()
+        current_playback = await run_io(self.sp.current_playback)
         if current_playback and current_playback['is_playing']:
             return await self.execute_with_device_check(self.sp.pause_playback, self.device_id)
         else:
             return await self.execute_with_device_check(self.sp.start_playback, self.device_id)
 
+    async def pause(self):
+        """Pause playback (nothing happens when already paused)"""
+        current_playback = await run_io(self.sp.current_playback)
+        if not current_playback or not current_playback['is_playing']:
+            return "⏸️ Already paused"
+        return await self.execute_with_device_check(self.sp.pause_playback, self.device_id)
+
+    async def resume(self):
+        """Resume playback (nothing happens when already playing)"""
+        current_playback = await run_io(self.sp.current_playback)
+        if current_playback and current_playback['is_playing']:
+            return "▶️ Already playing"
+        return await self.execute_with_device_check(self.sp.start_playback, self.device_id)
+
     async def skip_track(self):
         """Skip to the next track"""
         return await self.execute_with_device_check(self.sp.next_track, self.device_id)
@@ -116,7 +132,7 @@ class SpotifyController:
 
     async def play_song(self, query: str):
         """Search for a song and play it"""
-        results = self.sp.search(q=query, limit=1, type='track')
+        results = await run_io(self.sp.search, q=query, limit=1, type='track')
         if not results['tracks']['items']:
             return "❌ Song not found"
 
@@ -135,37 +151,50 @@ class SpotifyController:
 
     async def get_current_track(self):
         """Get currently playing track details"""
-        current_playback = self.sp.current_playback()
+        current_playback = await run_io(self.sp.current_playback)
         if not current_playback or not current_playback['is_playing']:
             return "❌ No track currently playing"
 
         track = current_playback['item']
         return f"🎶 Now playing: {track['name']} by {', '.join([artist['name'] for artist in track['artists']])}"
 
-# Create an instance of the controller
-controller = SpotifyController()
+# The controller is created on first use: authenticating talks to Spotify,
+# which must not happen at import time or on the event loop
+controller = None
+
+async def _get_controller():
+    global controller
+    if controller is None:
+        controller = await run_io(SpotifyController)
+    return controller
 
 # Expose functions so Pearl recognizes them
 async def play_pause(): #toggle play/pause state
-    return await controller.play_pause()
+    return await (await _get_controller()).play_pause()
+
+async def pause():
+    return await (await _get_controller()).pause()
+
+async def resume():
+    return await (await _get_controller()).resume()
 
 async def skip_track():
-    return await controller.skip_track()
+    return await (await _get_controller()).skip_track()
 
 async def previous_track():
-    return await controller.previous_track()
+    return await (await _get_controller()).previous_track()
 
 async def set_volume(volume: int):
-    return await controller.set_volume(volume)
+    return await (await _get_controller()).set_volume(volume)
 
 async def play_song(query: str):
-    return await controller.play_song(query)
+    return await (await _get_controller()).play_song(query)
 
 async def shuffle(enable: bool = True):
-    return await controller.shuffle(enable)
+    return await (await _get_controller()).shuffle(enable)
 
 async def repeat_mode(mode: str):
-    return await controller.repeat_mode(mode)
+    return await (await _get_controller()).repeat_mode(mode)
 
 async def get_current_track():
-    return await controller.get_current_track()
+    return await (await _get_controller()).get_current_track()
@@ -30,8 +30,9 @@ async def function_executor():
         logging.info(f"🔧 Executing command: {command}")
         try:
             result = await execute_command(command)
-            high_level_response = await ask_ollama(f"Confirm execution and summarize results: {result}")
-            logging.info(f"✅ Execution result: {high_level_response}")
+            # The result goes to the chat as is; a second LLM call to summarise it only adds latency
+            high_level_response = f"✅ {command} executed: {result}"
+            logging.info(f"✅ Execution result: {result}")
         except Exception as e:
             logging.error(f"❌ Error executing command '{command}': {e}")
             high_level_response = f"Error: {e}"
@@ -0,0 +1,31 @@
+import importlib.util
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Tests import the application packages (core, config, modules) from the project root
+sys.path.insert(0, ROOT)
+
+
+def _load_telegram_settings():
+    """
+    config/telegram_settings.py ships with placeholders (CHAT_ID = int("<your-chat-id>")
+    fails); load it with a test chat id so the Telegram modules can be imported.
+    """
+    try:
+        import config.telegram_settings  # noqa: F401
+        return
+    except ValueError:
+        pass
+    path = os.path.join(ROOT, "config", "telegram_settings.py")
+    with open(path, encoding="utf-8") as f:
+        source = f.read().replace('int("<your-chat-id>")', "1")
+    spec = importlib.util.spec_from_loader("config.telegram_settings", loader=None, origin=path)
+    module = importlib.util.module_from_spec(spec)
+    module.__file__ = path
+    exec(compile(source, path, "exec"), module.__dict__)
+    sys.modules["config.telegram_settings"] = module
+
+
+_load_telegram_settings()
@@ -0,0 +1,141 @@
+import asyncio
+
+import pytest
+
+from core import chat_session, ollama_client
+from core.chat_session import ChatSession, SessionManager
+
+
+class FakeOllama:
+    """Records the requests and answers with a growing context."""
+
+    def __init__(self):
+        self.requests = []
+
+    def response(self, prompt, kwargs):
+        self.requests.append({"prompt": prompt, **kwargs})
+        context = list(kwargs.get("context") or []) + [len(self.requests)] * 10
+        return {"response": f"answer {len(self.requests)}", "context": context, "prompt_eval_count": 5,
+                "eval_count": 3, "done": True}
+
+    async def generate(self, model, prompt, **kwargs):
+        return self.response(prompt, kwargs)
+
+    async def stream_generate(self, model, prompt, **kwargs):
+        yield {"response": "partial", "done": False}
+        yield {**self.response(prompt, kwargs), "response": ""}
+
+
+@pytest.fixture
+def fake(monkeypatch):
+    fake = FakeOllama()
+    monkeypatch.setattr(ollama_client, "generate", fake.generate)
+    monkeypatch.setattr(ollama_client, "stream_generate", fake.stream_generate)
+    return fake
+
+
+def test_system_prompt_on_first_turn_then_context(fake):
+    session = ChatSession(1, "router", "llama3.2", system="You are PEARL.")
+
+    async def turns():
+        await session.generate("hi")
+        await session.generate("again")
+
+    asyncio.run(turns())
+    first, second = fake.requests
+    assert first["system"] == "You are PEARL." and "context" not in first
+    assert "system" not in second and second["context"] == [1] * 10
+    assert session.turns == 2
+
+
+def test_streamed_turn_keeps_context(fake):
+    session = ChatSession(1, "chat", "llama3.2")
+
+    async def stream():
+        return [part async for part in session.stream_generate("hi")]
+
+    parts = asyncio.run(stream())
+    assert len(parts) == 2
+    assert session.context == [1] * 10
+
+
+def test_stream_closed_early_keeps_previous_context(fake):
+    session = ChatSession(1, "chat", "llama3.2")
+    session.context = [7]
+
+    async def first_part_only():
+        async for part in session.stream_generate("hi"):
+            return part
+
+    asyncio.run(first_part_only())
+    assert session.context == [7] and session.turns == 0
+
+
+def test_context_past_limit_starts_over(fake, monkeypatch):
+    monkeypatch.setattr(chat_session, "SESSION_MAX_CONTEXT_TOKENS", 15)
+    session = ChatSession(1, "chat", "llama3.2", system="sys")
+
+    async def turns():
+        await session.generate("one")   # 10 tokens
+        await session.generate("two")   # 20 tokens: over the limit
+        await session.generate("three")
+
+    asyncio.run(turns())
+    assert session.context == [3] * 10
+    assert fake.requests[2]["system"] == "sys"
+
+
+def test_profile_replaces_default_keep_alive(fake):
+    asyncio.run(ChatSession(1, "router", "llama3.2", profile="router").generate("hi"))
+    asyncio.run(ChatSession(1, "chat", "llama3.2").generate("hi"))
+    assert fake.requests[0]["profile"] == "router" and "keep_alive" not in fake.requests[0]
+    assert "profile" not in fake.requests[1] and "keep_alive" in fake.requests[1]
+
+
+def test_turns_of_one_session_do_not_interleave(fake):
+    session = ChatSession(1, "chat", "llama3.2")
+
+    async def both():
+        await asyncio.gather(session.generate("a"), session.generate("b"))
+
+    asyncio.run(both())
+    # The second turn continued from the first one's context
+    assert fake.requests[1]["context"] == [1] * 10
+
+
+def test_manager_reuses_sessions_and_restarts_on_new_system_prompt():
+    manager = SessionManager(max_sessions=2)
+    session = manager.get(1, "router", "m", "rules")
+    assert manager.get(1, "router", "m", "rules") is session
+    assert manager.get(1, "router", "m", "new rules") is not session
+
+
+def test_manager_evicts_least_recently_used():
+    manager = SessionManager(max_sessions=2)
+    first = manager.get(1, "chat", "m")
+    manager.get(2, "chat", "m")
+    manager.get(1, "chat", "m")
+    manager.get(3, "chat", "m")
+    assert [key[0] for key in manager.sessions] == [1, 3]
+    assert manager.get(1, "chat", "m") is first
+    manager.drop(1)
+    assert [key[0] for key in manager.sessions] == [3]
+
+
+def test_context_reuse_benchmark_compares_prompt_evaluation(monkeypatch):
+    from benchmarks import chat_session as benchmark
+
+    async def generate(model, prompt, **kwargs):
+        # Ollama evaluates what it did not get as context: the system prompt and the prompt
+        evaluated = len((kwargs.get("system", "") + " " + prompt).split())
+        return {"response": "ok", "context": [1, 2, 3], "prompt_eval_count": evaluated, "done": True}
+
+    monkeypatch.setattr(ollama_client, "generate", generate)
+    results = asyncio.run(benchmark.measure("llama3.2"))
+
+    resend = [turn["prompt_tokens"] for turn in results["resend"]]
+    session = [turn["prompt_tokens"] for turn in results["session"]]
+    assert len(resend) == len(session) == len(benchmark.TURNS)
+    assert resend == sorted(resend)  # The whole history again on every turn
+    assert session[0] > max(session[1:])  # Only the first turn carries the system prompt
+    assert max(session[1:]) < min(resend)
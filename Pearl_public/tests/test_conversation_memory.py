@@ -0,0 +1,56 @@
+import asyncio
+
+from core import conversation_memory as memory_module
+from core import ollama_client
+from core.conversation_memory import ConversationMemory, estimate_tokens
+from core.function_executor import FunctionExecutor
+
+
+def test_turns_beyond_the_budget_are_evicted():
+    memory = ConversationMemory(token_budget=estimate_tokens("x" * 40) * 2)
+    memory.chats[1] = memory._chat(1)
+    chat = memory.chats[1]
+    for n in range(4):
+        chat.add("User", f"{n}" * 40, memory.token_budget)
+    assert [text[0] for _, text, _ in chat.turns] == ["2", "3"]
+    assert [text[0] for _, text, _ in chat.evicted] == ["0", "1"]
+
+
+def test_least_recently_active_chats_are_forgotten():
+    memory = ConversationMemory(max_chats=2)
+    for chat_id in (1, 2, 1, 3):
+        memory._chat(chat_id)
+    assert list(memory.chats) == [1, 3]
+
+
+def test_compaction_runs_on_the_background_lane_while_command_workers_are_busy(monkeypatch):
+    prompts = []
+
+    async def generate(model, prompt, **kwargs):
+        prompts.append(prompt)
+        return {"response": "The user likes jazz."}
+
+    monkeypatch.setattr(ollama_client, "generate", generate)
+
+    async def main():
+        commands = FunctionExecutor(workers=1)
+        lane = FunctionExecutor(workers=1)
+        monkeypatch.setattr(memory_module, "background_executor", lane)
+        blocker = asyncio.Event()
+        commands.submit_call("busy", blocker.wait)
+
+        memory = ConversationMemory(token_budget=estimate_tokens("x" * 40))
+        memory.add(1, "User", "I like jazz " + "x" * 30)
+        memory.add(1, "Assistant", "Noted " + "y" * 40)
+        for _ in range(50):
+            if not memory.chats[1].compacting:
+                break
+            await asyncio.sleep(0.01)
+        blocker.set()
+        await commands.stop()
+        await lane.stop()
+        return memory
+
+    memory = asyncio.run(main())
+    assert "I like jazz" in prompts[0]
+    assert memory.render(1).startswith("Summary of earlier conversation: The user likes jazz.\nAssistant: Noted")
@@ -0,0 +1,70 @@
+import pytest
+
+from core import dispatch_table
+from core.dispatch_table import DispatchEntry, DispatchTable, MissingArgumentsError
+from core.modules_loader import FunctionRegistry
+
+
+async def search_news(query: str, limit: int = 5):
+    return query, limit
+
+
+async def handle_user_request(user_input, chat_id):
+    return user_input, chat_id
+
+
+async def set_volume(volume: int):
+    return volume
+
+
+def entry(function, module="test"):
+    return DispatchEntry(module, function.__name__, function, digest="0")
+
+
+def test_user_input_fills_a_parameter_named_user_input():
+    args, kwargs = entry(handle_user_request).bind(context={"user_input": "remind me", "chat_id": 7})
+    assert (args, kwargs) == (("remind me", 7), {})
+
+
+def test_user_input_fills_the_configured_parameter(monkeypatch):
+    monkeypatch.setattr(dispatch_table, "USER_INPUT_PARAMETERS", {"internet_search.search_news": "query"})
+    bound = entry(search_news, "internet_search").bind(context={"user_input": "latest AI news"})
+    assert bound == (("latest AI news",), {})
+
+
+def test_explicit_arguments_win_over_the_context(monkeypatch):
+    monkeypatch.setattr(dispatch_table, "USER_INPUT_PARAMETERS", {"internet_search.search_news": "query"})
+    bound = entry(search_news, "internet_search").bind(kwargs={"query": "rust"}, context={"user_input": "ignored"})
+    assert bound == (("rust",), {})
+
+
+def test_user_input_is_not_guessed_into_other_parameters(monkeypatch):
+    monkeypatch.setattr(dispatch_table, "USER_INPUT_PARAMETERS", {})
+    with pytest.raises(MissingArgumentsError) as error:
+        entry(search_news, "internet_search").bind(context={"user_input": "latest AI news"})
+    assert error.value.missing == ["query"]
+    assert "`query`" in str(error.value)
+
+
+def test_numbers_are_not_scraped_from_the_user_input():
+    with pytest.raises(MissingArgumentsError) as error:
+        entry(set_volume, "spotify").bind(context={"user_input": "set the volume to 40"})
+    assert error.value.key == "spotify.set_volume"
+    assert error.value.missing == ["volume"]
+
+
+def test_unknown_keyword_is_a_type_error():
+    with pytest.raises(TypeError):
+        entry(set_volume).bind(kwargs={"level": 3})
+
+
+def test_lookup_resolves_and_caches_entries(tmp_path):
+    directory = tmp_path / "dispatch_plugins"
+    directory.mkdir()
+    (directory / "music.py").write_text("async def set_volume(volume: int):\n    return volume\n")
+    table = DispatchTable(FunctionRegistry(str(directory)))
+
+    found = table.lookup("music", "set_volume")
+    assert found is table.lookup("music", "set_volume")
+    assert found.bind(kwargs={"volume": 3}) == ((3,), {})
+    assert table.lookup("music", "missing") is None
@@ -0,0 +1,103 @@
+import asyncio
+
+import pytest
+
+from core import early_stop, ollama_client
+from core.early_stop import CommandLineParser, FunctionBlockParser, JsonObjectParser, generate_until
+
+CODE_REPLY = (
+    "Here is the function:\n"
+    "```python\n"
+    "async def fetch_weather(\n"
+    "    city: str,\n"
+    ") -> str:\n"
+    "    import aiohttp\n"
+    "    async with aiohttp.ClientSession() as session:\n"
+    "        async with session.get(f'https://wttr.in/{city}?format=3') as response:\n"
+    "            return await response.text()\n"
+    "```\n"
+    "This function fetches the weather for a city. You can call it like this:\n"
+    "asyncio.run(fetch_weather('Paris'))\n"
+)
+
+
+def feed(parser, text, step=3):
+    """Feed growing prefixes of text; returns (result, characters fed) once the parser completes."""
+    for end in range(1, len(text) + 1, step):
+        result = parser.update(text[:end])
+        if result is not None:
+            return result, end
+    return None, len(text)
+
+
+def test_function_block_completes_at_the_closing_fence():
+    result, end = feed(FunctionBlockParser(), CODE_REPLY)
+    assert result.startswith("async def fetch_weather(\n    city: str,\n) -> str:")
+    assert result.endswith("return await response.text()")
+    assert end <= CODE_REPLY.index("This function")
+
+
+def test_multiline_signature_is_not_taken_for_the_end_of_the_block():
+    parser = FunctionBlockParser()
+    assert parser.update("async def f(\n    a,\n") is None
+    assert parser.update("async def f(\n    a,\n):\n    return a\n") is None
+    assert parser.update("async def f(\n    a,\n):\n    return a\nprint(1)\n") == "async def f(\n    a,\n):\n    return a"
+
+
+def test_function_block_never_completes_without_a_function():
+    assert feed(FunctionBlockParser(), "I cannot write that function.\nSorry.\n")[0] is None
+
+
+def test_command_line_completes_with_its_first_line():
+    reply = "execute:spotify.play_pause\nI have started the music for you."
+    assert feed(CommandLineParser(), reply, step=1) == ("execute:spotify.play_pause", len("execute:spotify.play_pause\n"))
+    assert feed(CommandLineParser(), "Sure, here is a joke.\nWhy...")[0] is None
+
+
+def test_json_object_completes_when_closed():
+    reply = '{"function": "spotify.set_volume", "arguments": {"volume": 40}}\n\n\n   \n'
+    result, end = feed(JsonObjectParser(), reply, step=1)
+    assert result == reply.strip()
+    assert end == reply.index("}}") + 2
+
+
+def test_json_braces_inside_strings_are_ignored():
+    parser = JsonObjectParser()
+    assert parser.update('{"reply": "a } and a \\" quote"') is None
+    assert parser.update('{"reply": "a } and a \\" quote"}') == '{"reply": "a } and a \\" quote"}'
+
+
+@pytest.fixture
+def canned_stream(monkeypatch):
+    closed = []
+
+    def stream_generate(model, prompt, **kwargs):
+        async def parts():
+            try:
+                for char in kwargs.pop("reply"):
+                    yield {"response": char, "done": False}
+                yield {"response": "", "done": True}
+            finally:
+                closed.append(True)
+
+        return parts()
+
+    monkeypatch.setattr(ollama_client, "stream_generate", stream_generate)
+    monkeypatch.setattr(early_stop, "early_stops", {})
+    return closed
+
+
+def test_generate_until_stops_the_stream_once_complete(canned_stream):
+    result, text = asyncio.run(generate_until("codellama", "write it", FunctionBlockParser(), reply=CODE_REPLY))
+    assert result.startswith("async def fetch_weather(")
+    assert text == CODE_REPLY[:len(text)]
+    assert len(text) < len(CODE_REPLY)
+    assert canned_stream == [True]
+    assert early_stop.early_stops == {"FunctionBlockParser": 1}
+
+
+def test_generate_until_returns_none_when_the_stream_ends_first(canned_stream):
+    result, text = asyncio.run(generate_until("llama3.2", "hi", CommandLineParser(), reply="Hello there!"))
+    assert result is None
+    assert text == "Hello there!"
+    assert early_stop.early_stops == {}
@@ -0,0 +1,100 @@
+import asyncio
+
+import pytest
+
+from core.function_executor import PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE, FunctionExecutor
+
+
+def run_with(runner, coro_factory, workers=1):
+    async def main():
+        executor = FunctionExecutor(runner, workers=workers)
+        try:
+            return await coro_factory(executor)
+        finally:
+            await executor.stop()
+
+    return asyncio.run(main())
+
+
+def test_function_arguments_named_like_job_controls_reach_the_function():
+    async def runner(command, *args, **kwargs):
+        return command, args, kwargs
+
+    result = run_with(runner, lambda executor: executor.run(
+        "execute:tasks.add_task", "buy milk",
+        call_kwargs={"priority": "high", "timeout": 30, "retries": 2},
+        priority=PRIORITY_INTERACTIVE, timeout=5,
+    ))
+    assert result == ("execute:tasks.add_task", ("buy milk",), {"priority": "high", "timeout": 30, "retries": 2})
+
+
+def test_unknown_job_control_is_rejected():
+    async def runner(command, *args, **kwargs):
+        return kwargs
+
+    with pytest.raises(TypeError):
+        run_with(runner, lambda executor: executor.run("execute:tasks.add_task", volume=3))
+
+
+def test_jobs_run_in_priority_order():
+    order = []
+
+    async def runner(command, *args, **kwargs):
+        order.append(command)
+        await asyncio.sleep(0.01)
+
+    async def main(executor):
+        jobs = [
+            executor.submit("execute:m.background", priority=PRIORITY_BACKGROUND),
+            executor.submit("execute:m.interactive", priority=PRIORITY_INTERACTIVE),
+        ]
+        await asyncio.gather(*(job.future for job in jobs))
+
+    run_with(runner, main)
+    assert order == ["execute:m.interactive", "execute:m.background"]
+
+
+def test_timeout_cancels_the_job():
+    async def runner(command, *args, **kwargs):
+        await asyncio.sleep(10)
+
+    with pytest.raises(asyncio.TimeoutError):
+        run_with(runner, lambda executor: executor.run("execute:m.slow", timeout=0.02))
+
+
+def test_failed_job_is_retried(monkeypatch):
+    monkeypatch.setattr("core.function_executor.RETRY_BACKOFF", 0.01)
+    attempts = []
+
+    async def runner(command, *args, **kwargs):
+        attempts.append(command)
+        if len(attempts) == 1:
+            raise ConnectionError("device busy")
+        return "ok"
+
+    assert run_with(runner, lambda executor: executor.run("execute:spotify.play_pause", retries=1)) == "ok"
+    assert len(attempts) == 2
+
+
+def test_submit_call_passes_call_kwargs():
+    async def upkeep(name, priority):
+        return name, priority
+
+    async def main(executor):
+        return await executor.submit_call("upkeep", upkeep, "memory", call_kwargs={"priority": 3}).future
+
+    assert run_with(None, main) == ("memory", 3)
+
+
+def test_stop_while_a_job_is_finishing_does_not_hang():
+    async def main():
+        executor = FunctionExecutor(workers=1)
+        finish = asyncio.Event()
+        job = executor.submit_call("finishing", finish.wait)
+        await asyncio.sleep(0.01)
+        finish.set()
+        await asyncio.wait_for(executor.stop(), 1)
+        return job
+
+    job = asyncio.run(main())
+    assert job.future.done()
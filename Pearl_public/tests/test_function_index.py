@@ -0,0 +1,104 @@
+import asyncio
+import os
+
+import pytest
+
+from benchmarks import function_index as benchmark
+from benchmarks.function_index import write_modules
+from core.function_index import FunctionIndex, HashingEmbedder, describe_function
+from core.modules_loader import FunctionRegistry
+
+
+class CountingEmbedder(HashingEmbedder):
+    def __init__(self):
+        super().__init__()
+        self.embedded = []
+
+    async def embed(self, texts):
+        self.embedded.extend(texts)
+        return await super().embed(texts)
+
+
+class FailingEmbedder:
+    name = "failing"
+
+    async def embed(self, texts):
+        raise ConnectionError("no embedding model")
+
+
+@pytest.fixture
+def modules_dir(tmp_path):
+    directory = tmp_path / "index_plugins"
+    directory.mkdir()
+    (directory / "spotify.py").write_text(
+        'async def play_song(name: str):\n    """Play a song on Spotify."""\n\n'
+        'async def set_volume(volume: int):\n    """Change the music volume."""\n'
+    )
+    (directory / "weather.py").write_text('async def forecast(city: str):\n    """Weather forecast for a city."""\n')
+    (directory / "reminders.py").write_text('async def add_reminder(text: str):\n    """Remind the user later."""\n')
+    return directory
+
+
+def test_search_ranks_the_matching_function_first(modules_dir):
+    index = FunctionIndex(FunctionRegistry(str(modules_dir)), HashingEmbedder())
+    results = asyncio.run(index.search("what is the weather forecast in Paris", k=2))
+    assert results[0][0] == "weather.forecast"
+    assert len(results) == 2
+
+
+def test_relevant_adds_pinned_functions(modules_dir):
+    index = FunctionIndex(FunctionRegistry(str(modules_dir)), HashingEmbedder())
+    specs = asyncio.run(index.relevant("play a song", k=1, pinned=["reminders.add_reminder", "missing.function"]))
+    assert list(specs) == ["spotify.play_song", "reminders.add_reminder"]
+
+
+def test_only_changed_functions_are_embedded_again(modules_dir):
+    embedder = CountingEmbedder()
+    registry = FunctionRegistry(str(modules_dir), scan_interval=0)
+    index = FunctionIndex(registry, embedder)
+    asyncio.run(index.refresh())
+    assert len(embedder.embedded) == 4
+
+    asyncio.run(index.refresh())
+    assert len(embedder.embedded) == 4
+
+    path = modules_dir / "weather.py"
+    path.write_text('async def forecast(city: str, days: int = 3):\n    """Weather forecast for a city."""\n')
+    os.utime(path, ns=(path.stat().st_atime_ns, path.stat().st_mtime_ns + 1_000_000))
+    asyncio.run(index.refresh())
+    assert len(embedder.embedded) == 5
+    assert "weather.forecast(city: str, days: int=3)" in embedder.embedded[-1]
+
+
+def test_failing_embedder_falls_back_to_hashing(modules_dir):
+    index = FunctionIndex(FunctionRegistry(str(modules_dir)), FailingEmbedder())
+    results = asyncio.run(index.search("weather forecast", k=1))
+    assert isinstance(index.embedder, HashingEmbedder)
+    assert results[0][0] == "weather.forecast"
+
+
+@pytest.mark.parametrize("count", [10, 200])
+def test_prompt_section_size_does_not_grow_with_the_catalog(tmp_path, count):
+    directory = tmp_path / f"many_{count}"
+    directory.mkdir()
+    write_modules(str(directory), count)
+    index = FunctionIndex(FunctionRegistry(str(directory)), HashingEmbedder())
+    section = asyncio.run(index.relevant_functions("please play that song again", k=5, pinned=[]))
+    lines = section.splitlines()
+    assert len(lines) == 5
+    assert lines[0].startswith("- generated_0.play_song_0(query: str)")
+
+
+def test_prompt_section_stays_bounded_at_1000_modules():
+    small = asyncio.run(benchmark.measure(10))
+    large = asyncio.run(benchmark.measure(1000))
+    # The full catalog grows with the modules, the top-k section does not
+    assert large["full_chars"] > 50 * small["full_chars"]
+    assert large["top_k_chars"] <= small["top_k_chars"] * 1.1
+    assert large["best"].startswith("- generated_0.play_song_0(query: str)")
+
+
+def test_describe_function_uses_first_docstring_line(modules_dir):
+    registry = FunctionRegistry(str(modules_dir))
+    spec = registry.specs()["spotify"]["play_song"]
+    assert describe_function("spotify.play_song", spec) == "- spotify.play_song(name: str): Play a song on Spotify."
@@ -0,0 +1,89 @@
+import pytest
+
+from core import generation_profiles
+from core.generation_profiles import (
+    ProfileStats,
+    apply_profile,
+    num_ctx_conflicts,
+    profile_model,
+    profile_options,
+)
+
+PROFILES = {
+    "chat": {"model": "llama3.2", "keep_alive": "30m", "temperature": 0.7, "num_ctx": 4096, "num_predict": 512},
+    "router": {"model": "llama3.2", "temperature": 0.0, "num_ctx": 2048, "num_predict": 64},
+    "codegen": {"model": "qwen2.5-coder:7b", "temperature": 0.2},
+}
+
+
+@pytest.fixture(autouse=True)
+def profiles(monkeypatch):
+    monkeypatch.setattr(generation_profiles, "GENERATION_PROFILES", PROFILES)
+
+
+def test_profile_fills_in_keep_alive_and_options():
+    request = apply_profile("chat", {"system": "Be brief."})
+    assert request == {
+        "system": "Be brief.",
+        "keep_alive": "30m",
+        "options": {"temperature": 0.7, "num_ctx": 4096, "num_predict": 512},
+    }
+
+
+def test_explicit_arguments_win_over_the_profile():
+    request = apply_profile("chat", {"keep_alive": 0, "options": {"temperature": 1.2}})
+    assert request["keep_alive"] == 0
+    assert request["options"] == {"temperature": 1.2, "num_ctx": 4096, "num_predict": 512}
+
+
+def test_apply_profile_does_not_modify_the_arguments():
+    kwargs = {"options": {"temperature": 1.2}}
+    apply_profile("chat", kwargs)
+    assert kwargs == {"options": {"temperature": 1.2}}
+
+
+def test_model_and_keep_alive_are_not_ollama_options():
+    assert profile_options("chat") == {"temperature": 0.7, "num_ctx": 4096, "num_predict": 512}
+    assert "keep_alive" not in apply_profile("router", {})
+    assert profile_model("codegen") == "qwen2.5-coder:7b"
+
+
+def test_unknown_profile_falls_back_to_defaults():
+    assert apply_profile("missing", {"options": {"seed": 1}}) == {"options": {"seed": 1}}
+    assert profile_model("missing") == "llama3.2"
+
+
+def test_num_ctx_conflicts_lists_models_with_several_context_sizes():
+    assert num_ctx_conflicts() == {"llama3.2": {4096, 2048}}
+
+
+def test_profile_stats_uses_ollama_counters():
+    stats = ProfileStats()
+    stats.record("chat", {"eval_count": 100, "eval_duration": 2e9, "prompt_eval_count": 40}, latency=2.5)
+    stats.record("chat", {"eval_count": 50, "eval_duration": 0.5e9, "prompt_eval_count": 20}, latency=1.5)
+    report = stats.report()["chat"]
+    assert report["calls"] == 2
+    assert report["latency_mean"] == pytest.approx(2.0)
+    assert report["latency_p95"] == 2.5
+    assert report["output_tokens_mean"] == 75
+    assert report["tokens_per_second"] == pytest.approx(75.0)
+    assert report["prompt_tokens_mean"] == 30
+
+
+def test_profile_stats_counts_parts_of_a_stopped_stream():
+    stats = ProfileStats()
+    stats.record_partial("chat", parts=30, latency=3.0, streaming_seconds=2.0)
+    report = stats.report()["chat"]
+    assert report["output_tokens_mean"] == 30
+    assert report["tokens_per_second"] == 15
+    assert report["prompt_tokens_mean"] is None
+
+
+def test_profile_stats_keeps_only_recent_samples():
+    stats = ProfileStats(samples=3)
+    for latency in (10.0, 1.0, 1.0, 1.0):
+        stats.record("router", {}, latency)
+    report = stats.report()["router"]
+    assert report["calls"] == 3
+    assert report["latency_mean"] == 1.0
+    assert report["tokens_per_second"] is None
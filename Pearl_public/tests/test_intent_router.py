@@ -0,0 +1,123 @@
+import asyncio
+import os
+
+import pytest
+
+from core import intent_router as router_module
+from core.function_executor import FunctionExecutor
+from core.intent_router import IntentRouter
+from core.modules_loader import FunctionRegistry
+
+MODULES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "modules")
+
+
+@pytest.fixture
+def exposed(monkeypatch):
+    functions = {"spotify": ["pause", "resume", "play_pause", "skip_track"]}
+    monkeypatch.setattr(router_module, "available_functions", lambda: functions)
+
+
+@pytest.mark.parametrize("message, route", [
+    ("Pause the music please", "spotify.pause"),
+    ("stop", "spotify.pause"),
+    ("hey pearl, resume", "spotify.resume"),
+    ("play music", "spotify.resume"),
+    ("next song", "spotify.skip_track"),
+])
+def test_rules_map_to_explicit_actions(exposed, message, route):
+    assert IntentRouter().route(message) == (route, "rule", 1.0, {})
+
+
+@pytest.fixture
+def spotify(monkeypatch):
+    registry = FunctionRegistry(MODULES)
+    monkeypatch.setattr(router_module, "get_registry", lambda: registry)
+    monkeypatch.setattr(router_module, "available_functions", registry.functions)
+
+
+@pytest.mark.parametrize("message", ["set the volume to 40", "Volume 40%", "volume to 40 please"])
+def test_volume_rule_passes_the_captured_volume_as_an_int(spotify, message):
+    assert IntentRouter().route(message) == ("spotify.set_volume", "rule", 1.0, {"volume": 40})
+
+
+def test_no_rule_routes_to_the_play_pause_toggle(exposed):
+    router = IntentRouter()
+    for message in ("play", "pause", "resume", "stop", "pause spotify"):
+        assert router.route(message)[0] != "spotify.play_pause"
+
+
+def test_routing_decisions_are_stored_in_batches_on_the_background_lane(monkeypatch):
+    writes = []
+    trained = []
+
+    async def store_routed_inputs(rows):
+        writes.append(list(rows))
+
+    async def train():
+        trained.append(True)
+
+    monkeypatch.setattr(router_module, "store_routed_inputs", store_routed_inputs)
+    monkeypatch.setattr(router_module, "INTENT_RETRAIN_EVERY", 3)
+
+    async def main():
+        lane = FunctionExecutor(workers=1)
+        monkeypatch.setattr(router_module, "background_executor", lane)
+        router = IntentRouter()
+        monkeypatch.setattr(router, "train", train)
+        for n in range(3):
+            router.record_llm(1, f"message {n}", "chat", 0.5)
+        # Nothing was written while the handler was running
+        assert writes == []
+        for _ in range(50):
+            if trained:
+                break
+            await asyncio.sleep(0.01)
+        await lane.stop()
+        return router
+
+    router = asyncio.run(main())
+    assert writes == [[(1, "message 0", "chat"), (1, "message 1", "chat"), (1, "message 2", "chat")]]
+    assert trained == [True]
+    assert router.pending == [] and router.new_routes == 0
+
+
+def test_flush_keeps_rows_queued_when_cancelled(monkeypatch):
+    async def store_routed_inputs(rows):
+        await asyncio.sleep(10)
+
+    monkeypatch.setattr(router_module, "store_routed_inputs", store_routed_inputs)
+
+    async def main():
+        router = IntentRouter()
+        router.pending.append((1, "hello", "chat"))
+        task = asyncio.create_task(router.flush())
+        await asyncio.sleep(0.01)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        return router
+
+    router = asyncio.run(main())
+    assert router.pending == [(1, "hello", "chat")]
+    assert router.storing is False
+
+
+def test_fast_path_volume_command_reaches_the_function_with_its_argument(spotify, monkeypatch):
+    import core.ollama_integration  # noqa: F401  (main and command_handler import each other)
+    from core import command_handler
+
+    calls, sent = [], []
+
+    async def execute_command(command, call_kwargs=None, **controls):
+        calls.append((command, call_kwargs["volume"]))
+        return "volume set"
+
+    class Telegram:
+        async def send_message(self, chat_id, text):
+            sent.append(text)
+
+    monkeypatch.setattr(command_handler, "execute_command", execute_command)
+    monkeypatch.setattr(command_handler, "intent_router", IntentRouter())
+    asyncio.run(command_handler.process_user_input(1, "set the volume to 40", Telegram()))
+
+    assert calls == [("execute:spotify.set_volume", 40)]
+    assert sent == [" set_volume executed successfully: volume set"]
@@ -0,0 +1,119 @@
+import asyncio
+
+import pytest
+
+from core import llm_cache
+from core.llm_cache import ResponseCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(llm_cache, "time", clock)
+    return clock
+
+
+def new_cache(tmp_path, memory_entries=8):
+    cache = ResponseCache(str(tmp_path / "llm_cache.db"), memory_entries, ttls={"summary": 60})
+    asyncio.run(cache.init_db())
+    return cache
+
+
+def test_entries_expire_after_the_ttl_of_their_site(tmp_path, clock):
+    cache = new_cache(tmp_path)
+    asyncio.run(cache.put("k", "summary", "model", "answer", 2.0))
+    clock.now += 59
+    assert asyncio.run(cache.get("k")) == "answer"
+    clock.now += 2
+    assert asyncio.run(cache.get("k")) is None
+    # Gone from memory, and the disk row is not returned either
+    assert "k" not in cache.memory
+    assert cache.stats()["misses"] == 1
+
+
+def test_expired_entries_are_still_served_as_stale_reads(tmp_path, clock):
+    cache = new_cache(tmp_path)
+    asyncio.run(cache.put("k", "summary", "model", "answer", 2.0))
+    clock.now += 3600
+    assert asyncio.run(cache.get("k")) is None
+    # The memory entry was dropped by the normal read; the stale read comes from SQLite
+    assert asyncio.run(cache.get("k", allow_expired=True)) == "answer"
+    assert cache.stats()["stale_hits"] == 1
+
+
+def test_least_recently_used_entries_leave_memory_but_stay_on_disk(tmp_path, clock):
+    cache = new_cache(tmp_path, memory_entries=2)
+    for key in ("a", "b"):
+        asyncio.run(cache.put(key, "summary", "model", f"answer {key}"))
+    assert asyncio.run(cache.get("a")) == "answer a"
+    asyncio.run(cache.put("c", "summary", "model", "answer c"))
+
+    assert list(cache.memory) == ["a", "c"]
+    assert asyncio.run(cache.get("b")) == "answer b"
+    assert (cache.counters["memory_hits"], cache.counters["disk_hits"]) == (1, 1)
+    assert list(cache.memory) == ["c", "b"]
+
+
+def test_entries_persist_across_instances(tmp_path, clock):
+    asyncio.run(new_cache(tmp_path).put("k", "summary", "model", "answer", 3.5))
+
+    restarted = new_cache(tmp_path)
+    assert asyncio.run(restarted.get("k")) == "answer"
+    assert restarted.stats()["disk_hits"] == 1
+    assert restarted.stats()["gpu_seconds_saved"] == 3.5
+
+
+def test_restart_drops_expired_rows(tmp_path, clock):
+    asyncio.run(new_cache(tmp_path).put("k", "summary", "model", "answer"))
+    clock.now += 61
+
+    restarted = new_cache(tmp_path)
+    assert asyncio.run(restarted.get("k", allow_expired=True)) is None
+
+
+def test_sites_without_a_ttl_and_time_dependent_prompts_are_not_cached(tmp_path):
+    cache = ResponseCache(str(tmp_path / "llm_cache.db"), ttls={"summary": 60})
+    assert cache.cacheable("summary", "Summarize this page")
+    assert not cache.cacheable("chat", "Summarize this page")
+    assert not cache.cacheable("summary", "What happened today?")
+    assert cache.counters["bypassed"] == 1
+
+
+def test_cache_text_key_keeps_the_chat_history(tmp_path, monkeypatch):
+    from core import ollama_integration
+
+    histories = {1: "User: I use Rust at work", 2: "User: I am learning Go"}
+    generated = []
+
+    class Memory:
+        def render(self, chat_id):
+            return histories[chat_id]
+
+    async def generate(model, prompt, **kwargs):
+        generated.append(prompt)
+        return {"response": f"analysis {len(generated)}"}
+
+    cache = ResponseCache(str(tmp_path / "llm_cache.db"), ttls={"research_analysis": 60})
+    monkeypatch.setattr(ollama_integration, "response_cache", cache)
+    monkeypatch.setattr(ollama_integration, "conversation_memory", Memory())
+    monkeypatch.setattr(ollama_integration.ollama_client, "generate", generate)
+
+    async def research(chat_id, sources):
+        return await ollama_integration.ask_ollama(f"Analyse compilers using {sources}", chat_id=chat_id,
+                                                   cache_site="research_analysis", cache_text="compilers")
+
+    async def main():
+        await cache.init_db()
+        return [await research(1, "source A"), await research(2, "source A"), await research(1, "source B")]
+
+    # Same topic in another conversation is generated again; new sources in the same one are not
+    assert asyncio.run(main()) == ["analysis 1", "analysis 2", "analysis 1"]
+    assert len(generated) == 2
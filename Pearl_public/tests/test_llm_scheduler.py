@@ -0,0 +1,97 @@
+import asyncio
+
+from core.llm_scheduler import LLM_CODEGEN, LLM_INTERACTIVE, LLM_SUMMARY, LLMScheduler
+
+
+async def generation(scheduler, model, priority, seconds, label, finished):
+    async with scheduler.slot(model, priority):
+        await asyncio.sleep(seconds)
+    finished.append(label)
+
+
+def test_interactive_request_uses_the_reserved_slot():
+    scheduler = LLMScheduler(max_generations=2, reserved=1, model_limits={"codellama:13b": 1})
+    finished = []
+
+    async def main():
+        tasks = [
+            asyncio.create_task(generation(scheduler, "codellama:13b", LLM_CODEGEN, 0.4, "codegen", finished)),
+            asyncio.create_task(generation(scheduler, "llama3.2", LLM_SUMMARY, 0.1, "summary 1", finished)),
+            asyncio.create_task(generation(scheduler, "llama3.2", LLM_SUMMARY, 0.1, "summary 2", finished)),
+        ]
+        await asyncio.sleep(0.02)
+        assert scheduler.running == {"codellama:13b": 1}
+        tasks.append(asyncio.create_task(
+            generation(scheduler, "llama3.2", LLM_INTERACTIVE, 0.05, "interactive", finished)))
+        await asyncio.gather(*tasks)
+
+    asyncio.run(main())
+    # The reply does not wait for the code generation; the summaries do
+    assert finished == ["interactive", "codegen", "summary 1", "summary 2"]
+
+
+def test_waiting_requests_are_admitted_by_priority_then_fifo():
+    scheduler = LLMScheduler(max_generations=1, reserved=0, model_limits={})
+    finished = []
+
+    async def main():
+        first = asyncio.create_task(generation(scheduler, "llama3.2", LLM_CODEGEN, 0.05, "running", finished))
+        await asyncio.sleep(0)
+        tasks = [
+            asyncio.create_task(generation(scheduler, "llama3.2", priority, 0.01, label, finished))
+            for priority, label in [(LLM_CODEGEN, "codegen"), (LLM_SUMMARY, "summary 1"),
+                                    (LLM_INTERACTIVE, "interactive"), (LLM_SUMMARY, "summary 2")]
+        ]
+        await asyncio.gather(first, *tasks)
+
+    asyncio.run(main())
+    assert finished == ["running", "interactive", "summary 1", "summary 2", "codegen"]
+
+
+def test_a_full_model_does_not_hold_up_other_models():
+    scheduler = LLMScheduler(max_generations=4, reserved=0, model_limits={"codellama:13b": 1})
+    finished = []
+
+    async def main():
+        tasks = [
+            asyncio.create_task(generation(scheduler, "codellama:13b", LLM_CODEGEN, 0.2, "codegen 1", finished)),
+            asyncio.create_task(generation(scheduler, "codellama:13b", LLM_INTERACTIVE, 0.01, "codegen 2", finished)),
+            asyncio.create_task(generation(scheduler, "llama3.2", LLM_SUMMARY, 0.01, "summary", finished)),
+        ]
+        await asyncio.gather(*tasks)
+
+    asyncio.run(main())
+    assert finished == ["summary", "codegen 1", "codegen 2"]
+
+
+def test_cancelled_waiter_gives_up_its_place():
+    scheduler = LLMScheduler(max_generations=1, reserved=0, model_limits={})
+    finished = []
+
+    async def main():
+        running = asyncio.create_task(generation(scheduler, "llama3.2", LLM_SUMMARY, 0.05, "running", finished))
+        await asyncio.sleep(0)
+        waiting = asyncio.create_task(generation(scheduler, "llama3.2", LLM_INTERACTIVE, 0.01, "cancelled", finished))
+        await asyncio.sleep(0.01)
+        waiting.cancel()
+        await asyncio.gather(running, waiting, return_exceptions=True)
+        await generation(scheduler, "llama3.2", LLM_SUMMARY, 0.01, "after", finished)
+
+    asyncio.run(main())
+    assert finished == ["running", "after"]
+    assert scheduler.total == 0
+    assert scheduler.running == {}
+    assert scheduler.report()["queued"] == 0
+
+
+def test_report_records_waits_per_priority_class():
+    scheduler = LLMScheduler(max_generations=1, reserved=0, model_limits={})
+
+    async def main():
+        await asyncio.gather(*(generation(scheduler, "llama3.2", LLM_SUMMARY, 0.02, "s", []) for _ in range(3)))
+
+    asyncio.run(main())
+    report = scheduler.report()
+    assert report["summary"]["requests"] == 3
+    assert report["summary"]["wait_max"] >= 0.03
+    assert report["running"] == {}
@@ -0,0 +1,139 @@
+import asyncio
+
+import pytest
+
+import core.ollama_integration  # noqa: F401  (main and command_handler import each other)
+import main
+from core.dispatch_table import DispatchEntry, FunctionNotFoundError, MissingArgumentsError
+from core.function_executor import FunctionExecutor
+
+
+class FakeTable:
+    def __init__(self, *functions, module="spotify"):
+        self.entries = {f.__name__: DispatchEntry(module, f.__name__, f, digest="0") for f in functions}
+
+    def lookup(self, module_name, function_name):
+        return self.entries.get(function_name)
+
+
+class Telegram:
+    def __init__(self):
+        self.sent = []
+
+    async def send_message(self, chat_id, text):
+        self.sent.append(text)
+
+
+def run_job(monkeypatch, table, command, retries, **call_kwargs):
+    monkeypatch.setattr(main, "get_dispatch_table", lambda: table)
+    monkeypatch.setattr(main, "available_functions", lambda: {"spotify": list(table.entries)})
+
+    async def run():
+        executor = FunctionExecutor(main.run_job, workers=1)
+        monkeypatch.setattr("core.function_executor.RETRY_BACKOFF", 0.01)
+        try:
+            return await executor.run(command, call_kwargs=call_kwargs, retries=retries)
+        finally:
+            await executor.stop()
+
+    return asyncio.run(run())
+
+
+def test_failing_function_is_retried_through_the_production_runner(monkeypatch):
+    attempts = []
+
+    async def resume():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise ConnectionError("Spotify unreachable")
+        return "playing"
+
+    assert run_job(monkeypatch, FakeTable(resume), "execute:spotify.resume", retries=1) == "playing"
+    assert len(attempts) == 2
+
+
+def test_final_failure_reaches_the_submitter(monkeypatch):
+    async def resume():
+        raise ConnectionError("Spotify unreachable")
+
+    with pytest.raises(ConnectionError):
+        run_job(monkeypatch, FakeTable(resume), "execute:spotify.resume", retries=1)
+
+
+def test_missing_arguments_are_raised_without_retrying(monkeypatch):
+    attempts = []
+
+    async def set_volume(volume: int):
+        attempts.append(volume)
+
+    with pytest.raises(MissingArgumentsError):
+        run_job(monkeypatch, FakeTable(set_volume), "execute:spotify.set_volume", retries=3,
+                user_input="set the volume to 40")
+    assert attempts == []
+
+
+def test_unknown_function_is_raised(monkeypatch):
+    async def resume():
+        return "playing"
+
+    with pytest.raises(FunctionNotFoundError, match="Try one of: resume"):
+        run_job(monkeypatch, FakeTable(resume), "execute:spotify.rewind", retries=1)
+
+
+def test_execute_function_still_reports_errors_to_the_chat(monkeypatch):
+    async def set_volume(volume: int):
+        return volume
+
+    monkeypatch.setattr(main, "get_dispatch_table", lambda: FakeTable(set_volume))
+    telegram = Telegram()
+    result = asyncio.run(main.execute_function("spotify", "set_volume", telegram_client=telegram, chat_id=1))
+    assert result is None
+    assert telegram.sent == ["❌ Cannot run spotify.set_volume needs a value for `volume`."]
+
+
+@pytest.fixture
+def offset_file(tmp_path, monkeypatch):
+    path = tmp_path / "offset.json"
+    monkeypatch.setattr(main, "OFFSET_FILE", str(path))
+    return path
+
+
+def test_offset_round_trip(offset_file):
+    main.save_offset(42, [{"update_id": 41}])
+    assert main.load_offset() == (42, [{"update_id": 41}])
+    main.save_offset(43)
+    assert main.load_offset() == (43, [])
+    assert [path.name for path in offset_file.parent.iterdir()] == ["offset.json"]
+
+
+def test_missing_offset_file_starts_from_scratch(offset_file):
+    assert main.load_offset() == (None, [])
+
+
+def test_corrupt_offset_file_starts_from_scratch(offset_file):
+    # e.g. a file truncated by a crash before saves were atomic
+    offset_file.write_text('{"offset": 4')
+    assert main.load_offset() == (None, [])
+
+
+def test_failed_save_keeps_the_previous_offset_and_no_temp_file(offset_file):
+    main.save_offset(42, [{"update_id": 41}])
+    with pytest.raises(TypeError):
+        main.save_offset(43, [object()])  # Not JSON serializable, fails half way through the dump
+    assert main.load_offset() == (42, [{"update_id": 41}])
+    assert [path.name for path in offset_file.parent.iterdir()] == ["offset.json"]
+
+
+def test_idle_saves_are_kept_until_done(offset_file):
+    class Dispatcher:
+        def checkpoint(self):
+            return 7, []
+
+    async def run():
+        task = main.schedule_checkpoint(Dispatcher())
+        assert task in main._idle_saves
+        await task
+        return set(main._idle_saves)
+
+    assert asyncio.run(run()) == set()
+    assert main.load_offset() == (7, [])
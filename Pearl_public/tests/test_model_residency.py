@@ -0,0 +1,83 @@
+import asyncio
+
+from core import model_residency as residency_module
+from core import ollama_client
+from core.llm_scheduler import LLMScheduler, LLM_INTERACTIVE
+from core.model_residency import ModelResidency
+from core.ollama_pool import BackendPool
+
+
+class FakeClient:
+    """Records keep_alive requests like ollama.AsyncClient.generate with an empty prompt."""
+
+    def __init__(self, host, calls, load_seconds=0.0, down=False):
+        self.host = host
+        self.calls = calls
+        self.load_seconds = load_seconds
+        self.down = down
+
+    async def generate(self, model, prompt, **kwargs):
+        if self.down:
+            raise ConnectionError(f"{self.host} is down")
+        self.calls.append((self.host, model, kwargs["keep_alive"]))
+        return {"load_duration": int(self.load_seconds * 1e9)}
+
+
+def test_profile_keep_alive_is_kept_without_an_explicit_pin(monkeypatch):
+    monkeypatch.setattr(residency_module, "PINNED_MODELS", ["deepseek-r1"])
+    monkeypatch.setattr(residency_module, "PIN_KEEP_ALIVE", None)
+    kwargs = {"keep_alive": "10m", "options": {}}
+    assert ModelResidency().request_kwargs("deepseek-r1", kwargs) == kwargs
+
+
+def test_explicit_pin_overrides_keep_alive_of_pinned_models_only(monkeypatch):
+    monkeypatch.setattr(residency_module, "PINNED_MODELS", ["llama3.2"])
+    monkeypatch.setattr(residency_module, "PIN_KEEP_ALIVE", -1)
+    residency = ModelResidency()
+    assert residency.request_kwargs("llama3.2:latest", {"keep_alive": "30m"})["keep_alive"] == -1
+    assert residency.request_kwargs("deepseek-r1", {"keep_alive": "10m"})["keep_alive"] == "10m"
+
+
+def test_preload_uses_the_profile_keep_alive_and_a_scheduler_slot(monkeypatch):
+    calls = []
+    scheduler = LLMScheduler(max_generations=1, reserved=0)
+    monkeypatch.setattr(residency_module, "llm_scheduler", scheduler)
+    monkeypatch.setattr(residency_module, "PIN_KEEP_ALIVE", None)
+    monkeypatch.setattr(ollama_client, "backend_pool", BackendPool([], None))
+    monkeypatch.setattr(ollama_client, "get_client", lambda host=None: FakeClient("local", calls, 2.0))
+
+    async def main():
+        residency = ModelResidency()
+        # The only slot is taken: the load waits for it
+        async with scheduler.slot("llama3.2", LLM_INTERACTIVE):
+            preload = asyncio.create_task(residency.preload("codegen"))
+            await asyncio.sleep(0.01)
+            assert calls == []
+        return await preload, residency
+
+    seconds, residency = asyncio.run(main())
+    assert seconds == 2.0
+    assert calls == [("local", "codellama:13b", "10m")]
+    assert residency.report()["codellama:13b"]["loads"] == 1
+
+
+def test_unload_reaches_every_node_serving_the_model(monkeypatch):
+    calls = []
+    hosts = {"a": FakeClient("a", calls), "b": FakeClient("b", calls), "c": FakeClient("c", calls)}
+    pool = BackendPool([{"host": "a"}, {"host": "b"}, {"host": "c", "models": ["codellama:13b"]}], hosts.get)
+    monkeypatch.setattr(residency_module, "llm_scheduler", LLMScheduler())
+    monkeypatch.setattr(ollama_client, "backend_pool", pool)
+
+    asyncio.run(ModelResidency()._set_keep_alive("llama3.2", 0))
+    assert sorted(calls) == [("a", "llama3.2", 0), ("b", "llama3.2", 0)]
+
+
+def test_one_unreachable_node_does_not_fail_the_load(monkeypatch):
+    calls = []
+    hosts = {"a": FakeClient("a", calls, 1.5), "b": FakeClient("b", calls, down=True)}
+    monkeypatch.setattr(residency_module, "llm_scheduler", LLMScheduler())
+    monkeypatch.setattr(ollama_client, "backend_pool", BackendPool([{"host": "a"}, {"host": "b"}], hosts.get))
+
+    seconds = asyncio.run(ModelResidency()._set_keep_alive("llama3.2", "30m"))
+    assert seconds == 1.5
+    assert calls == [("a", "llama3.2", "30m")]
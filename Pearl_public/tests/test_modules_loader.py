@@ -0,0 +1,109 @@
+import os
+import sys
+
+import pytest
+
+from core.modules_loader import FunctionRegistry, parse_module_functions
+
+PLUGIN = '''
+import builtins
+builtins.PLUGIN_IMPORTS = getattr(builtins, "PLUGIN_IMPORTS", 0) + 1
+
+async def play(query: str, volume: int = 50) -> str:
+    """Play a song."""
+    return query
+
+def stop():
+    return "stopped"
+
+def _helper():
+    pass
+'''
+
+
+@pytest.fixture
+def modules_dir(tmp_path):
+    directory = tmp_path / "test_plugins"
+    directory.mkdir()
+    (directory / "music.py").write_text(PLUGIN)
+    (directory / "__init__.py").write_text("")
+    yield directory
+    for name in [n for n in sys.modules if n.startswith("test_plugins.")]:
+        del sys.modules[name]
+    import builtins
+    if hasattr(builtins, "PLUGIN_IMPORTS"):
+        del builtins.PLUGIN_IMPORTS
+
+
+def imports():
+    import builtins
+    return getattr(builtins, "PLUGIN_IMPORTS", 0)
+
+
+def test_parse_lists_public_top_level_functions():
+    specs = parse_module_functions("music", PLUGIN)
+    assert list(specs) == ["play", "stop"]
+    play = specs["play"]
+    assert play.is_async and not specs["stop"].is_async
+    assert play.signature == "(query: str, volume: int=50) -> str"
+    assert play.doc == "Play a song."
+
+
+def test_static_discovery_does_not_import(modules_dir):
+    registry = FunctionRegistry(str(modules_dir))
+    assert registry.functions() == {"music": ["play", "stop"]}
+    assert imports() == 0
+
+
+def test_static_and_import_discovery_agree(modules_dir):
+    static = FunctionRegistry(str(modules_dir)).functions()
+    imported = FunctionRegistry(str(modules_dir), static=False).functions()
+    assert static == imported
+    assert imports() == 1
+
+
+def test_load_imports_once_and_reloads_after_change(modules_dir):
+    registry = FunctionRegistry(str(modules_dir), scan_interval=0)
+    module = registry.load("music")
+    assert registry.load("music") is module
+    assert imports() == 1
+
+    path = modules_dir / "music.py"
+    path.write_text(PLUGIN + "\ndef louder():\n    pass\n")
+    os.utime(path, ns=(path.stat().st_atime_ns, path.stat().st_mtime_ns + 1_000_000))
+    assert registry.functions()["music"] == ["louder", "play", "stop"]
+    assert imports() == 1  # Listing the new function did not run the module
+    assert hasattr(registry.load("music"), "louder")
+    assert imports() == 2
+
+
+def test_touched_but_unchanged_file_is_not_reparsed(modules_dir):
+    registry = FunctionRegistry(str(modules_dir), scan_interval=0)
+    registry.functions()
+    entry = registry.entries["music"]
+    path = modules_dir / "music.py"
+    os.utime(path, ns=(path.stat().st_atime_ns, path.stat().st_mtime_ns + 1_000_000))
+    registry.functions()
+    assert registry.entries["music"] is entry
+
+
+def test_removed_module_disappears(modules_dir):
+    registry = FunctionRegistry(str(modules_dir), scan_interval=0)
+    registry.functions()
+    (modules_dir / "music.py").unlink()
+    assert registry.functions() == {}
+    with pytest.raises(ModuleNotFoundError):
+        registry.load("music")
+
+
+def test_syntax_error_lists_no_functions(modules_dir):
+    (modules_dir / "broken.py").write_text("def broken(:\n")
+    assert FunctionRegistry(str(modules_dir)).functions() == {"music": ["play", "stop"]}
+
+
+def test_discovery_benchmark_runs():
+    from benchmarks.discovery import measure
+
+    row = measure(3)
+    assert row["modules"] == 3
+    assert row["import"] > 0 and row["static"] > 0
@@ -0,0 +1,149 @@
+import asyncio
+
+import pytest
+
+from core import ollama_pool
+from core.ollama_pool import BackendPool, normalize_model
+
+
+class FakeClient:
+    """Answers generate/list like ollama.AsyncClient; `state` controls delay and failures."""
+
+    def __init__(self, host: str, state: dict):
+        self.host = host
+        self.state = state
+
+    async def generate(self, model, prompt, stream=False, **kwargs):
+        if self.state.get("down"):
+            raise ConnectionError(f"{self.host} is down")
+        if stream:
+            return self._stream()
+        await asyncio.sleep(self.state.get("delay", 0.01))
+        self.state["served"] = self.state.get("served", 0) + 1
+        return {"model": model, "response": f"answer from {self.host}", "done": True}
+
+    async def _stream(self):
+        for word in ("answer", "from", self.host):
+            yield {"response": word, "done": False}
+        yield {"response": "", "done": True}
+
+    async def list(self):
+        if self.state.get("down"):
+            raise ConnectionError(f"{self.host} is down")
+        return {"models": [{"model": m} for m in self.state.get("models", ["llama3.2"])]}
+
+
+def make_pool(states: dict, **kwargs) -> BackendPool:
+    backends = [{"host": host, **states[host].pop("backend", {})} for host in states]
+    return BackendPool(backends, lambda host: FakeClient(host, states[host]), **kwargs)
+
+
+def test_concurrent_requests_go_to_the_least_loaded_node():
+    states = {"a": {}, "b": {}}
+    pool = make_pool(states, hedge=False)
+
+    async def main():
+        await asyncio.gather(*(pool.generate("llama3.2", "hi") for _ in range(10)))
+
+    asyncio.run(main())
+    assert states["a"]["served"] == states["b"]["served"] == 5
+
+
+def test_weight_sends_more_requests_to_the_bigger_node():
+    states = {"big": {"backend": {"weight": 3}}, "small": {}}
+    pool = make_pool(states, hedge=False)
+
+    async def main():
+        await asyncio.gather(*(pool.generate("llama3.2", "hi") for _ in range(8)))
+
+    asyncio.run(main())
+    assert states["big"]["served"] == 6
+    assert states["small"]["served"] == 2
+
+
+def test_requests_only_go_to_nodes_serving_the_model():
+    states = {"a": {"backend": {"models": ["llama3.2"]}}, "b": {"backend": {"models": ["qwen2.5:7b"]}}}
+    pool = make_pool(states, hedge=False)
+
+    response = asyncio.run(pool.generate("qwen2.5:7b", "hi"))
+    assert response["response"] == "answer from b"
+    with pytest.raises(LookupError):
+        asyncio.run(pool.generate("mistral", "hi"))
+
+
+def test_unreachable_node_fails_over_and_is_taken_out(monkeypatch):
+    monkeypatch.setattr(ollama_pool, "UNHEALTHY_AFTER", 2)
+    states = {"a": {"down": True}, "b": {}}
+    pool = make_pool(states, hedge=False)
+
+    async def main():
+        return [await pool.generate("llama3.2", "hi") for _ in range(3)]
+
+    responses = asyncio.run(main())
+    assert {r["response"] for r in responses} == {"answer from b"}
+    a = pool.backends[0]
+    assert not a.healthy
+    # Once taken out, the node is no longer tried
+    assert a.requests == 2
+    assert pool.report()["a"]["errors"] == 2
+
+
+def test_every_node_failing_raises_the_connection_error():
+    pool = make_pool({"a": {"down": True}, "b": {"down": True}}, hedge=False)
+    with pytest.raises(ConnectionError):
+        asyncio.run(pool.generate("llama3.2", "hi"))
+
+
+def test_probe_takes_a_node_out_and_brings_it_back():
+    states = {"a": {"models": ["llama3.2", "qwen2.5:7b"]}}
+    pool = make_pool(states)
+    backend = pool.backends[0]
+
+    states["a"]["down"] = True
+    assert asyncio.run(pool.probe(backend)) is False
+    assert not backend.healthy
+
+    states["a"]["down"] = False
+    assert asyncio.run(pool.probe(backend)) is True
+    assert backend.healthy
+    assert backend.available == {"llama3.2:latest", "qwen2.5:7b"}
+    assert not backend.serves("mistral")
+
+
+def test_slow_interactive_request_is_hedged_to_a_second_node(monkeypatch):
+    monkeypatch.setattr(ollama_pool, "HEDGE_MIN_DELAY", 0.01)
+    states = {"a": {"delay": 1.0}, "b": {"delay": 0.01}}
+    pool = make_pool(states, hedge=True)
+    pool.latencies[normalize_model("llama3.2")] = [0.02] * ollama_pool.HEDGE_MIN_SAMPLES
+
+    async def main():
+        started = asyncio.get_running_loop().time()
+        response = await pool.generate("llama3.2", "hi", hedge=True)
+        return response, asyncio.get_running_loop().time() - started
+
+    response, elapsed = asyncio.run(main())
+    assert response["response"] == "answer from b"
+    assert elapsed < 0.5
+    assert pool.hedges == 1
+    assert pool.hedge_wins == 1
+    # The losing request was cancelled and released its slot
+    assert pool.backends[0].outstanding == 0
+
+
+def test_no_hedging_without_enough_latency_samples():
+    pool = make_pool({"a": {}, "b": {}}, hedge=True)
+    assert pool.hedge_deadline("llama3.2") is None
+    asyncio.run(pool.generate("llama3.2", "hi", hedge=True))
+    assert pool.hedges == 0
+
+
+def test_stream_fails_over_before_the_first_part():
+    states = {"a": {"down": True}, "b": {}}
+    pool = make_pool(states, hedge=False)
+
+    async def main():
+        return [part["response"] async for part in pool.stream_generate("llama3.2", "hi")]
+
+    assert asyncio.run(main()) == ["answer", "from", "b", ""]
+    assert pool.backends[0].errors == 1
+    assert pool.backends[1].outstanding == 0
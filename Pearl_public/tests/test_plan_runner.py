@@ -0,0 +1,156 @@
+import asyncio
+import time
+
+from core.plan_runner import StepSkipped, run_plan, summarize_results
+from core.tool_calls import PlanStep
+
+
+async def fake_step(step):
+    await asyncio.sleep(step.arguments["seconds"])
+    if step.arguments.get("fail"):
+        raise RuntimeError("device unavailable")
+    return f"{step.function} finished"
+
+
+def test_independent_steps_run_concurrently():
+    plan = [
+        PlanStep("1", "spotify.play_pause", {"seconds": 0.1}),
+        PlanStep("2", "notification.handle_user_request", {"seconds": 0.1}),
+        PlanStep("3", "internet_search.search_news", {"seconds": 0.2}),
+        PlanStep("4", "research.conduct_research", {"seconds": 0.1}, after=["3"]),
+    ]
+    started = time.monotonic()
+    results = asyncio.run(run_plan(plan, fake_step))
+    elapsed = time.monotonic() - started
+
+    assert [r.step.id for r in results] == ["1", "2", "3", "4"]
+    assert all(r.ok for r in results)
+    # The news -> research chain, not the sum of every step
+    assert 0.3 <= elapsed < 0.45
+
+
+def test_dependent_step_starts_after_its_dependency():
+    order = []
+
+    async def step(step):
+        order.append(("start", step.id))
+        await asyncio.sleep(step.arguments["seconds"])
+        order.append(("end", step.id))
+
+    plan = [
+        PlanStep("b", "m.second", {"seconds": 0.01}, after=["a"]),
+        PlanStep("a", "m.first", {"seconds": 0.05}),
+    ]
+    asyncio.run(run_plan(plan, step))
+    assert order.index(("end", "a")) < order.index(("start", "b"))
+
+
+def test_failed_step_skips_only_its_dependents():
+    plan = [
+        PlanStep("1", "spotify.set_volume", {"seconds": 0.01, "fail": True}),
+        PlanStep("2", "spotify.skip_track", {"seconds": 0.01}, after=["1"]),
+        PlanStep("3", "spotify.play_pause", {"seconds": 0.01}),
+    ]
+    results = asyncio.run(run_plan(plan, fake_step))
+
+    assert isinstance(results[0].error, RuntimeError)
+    assert isinstance(results[1].error, StepSkipped)
+    assert results[2].ok
+    assert summarize_results(results).splitlines() == [
+        "❌ set_volume failed: device unavailable",
+        "⏭️ skip_track skipped (step 1 failed)",
+        "✅ play_pause: spotify.play_pause finished",
+    ]
+
+
+def test_cancelling_the_plan_cancels_running_steps():
+    cancelled = []
+
+    async def step(step):
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(step.id)
+            raise
+
+    async def main():
+        plan = [PlanStep("1", "m.a", {}), PlanStep("2", "m.b", {})]
+        task = asyncio.create_task(run_plan(plan, step))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(main())
+    assert sorted(cancelled) == ["1", "2"]
+
+
+def test_plan_steps_get_the_same_context_as_single_calls(monkeypatch):
+    import core.ollama_integration  # noqa: F401  (main and command_handler import each other)
+    from core import command_handler
+
+    calls = []
+
+    async def execute_command(command, call_kwargs=None, **controls):
+        calls.append((command, call_kwargs))
+        return "ok"
+
+    class Telegram:
+        async def send_message(self, chat_id, text):
+            pass
+
+    monkeypatch.setattr(command_handler, "execute_command", execute_command)
+    telegram = Telegram()
+    plan = [PlanStep("1", "notification.handle_user_request", {"time": "7am"})]
+    asyncio.run(command_handler.run_plan_steps(42, plan, "wake me at 7", telegram))
+    asyncio.run(command_handler.run_function(42, "notification", "handle_user_request", "wake me at 7",
+                                             telegram, {"time": "7am"}))
+
+    assert calls[0] == calls[1]
+    assert calls[0][1] == {"time": "7am", "telegram_client": telegram, "chat_id": 42, "user_input": "wake me at 7"}
+
+
+def test_failed_step_through_the_executor_skips_its_dependants(monkeypatch):
+    import core.ollama_integration  # noqa: F401  (main and command_handler import each other)
+    import main
+    from core import command_handler
+    from core.dispatch_table import DispatchEntry
+
+    async def set_volume(volume: int):
+        raise ConnectionError("device unavailable")
+
+    async def skip_track():
+        return "skipped"
+
+    async def get_current_track():
+        return "Blue in Green"
+
+    entries = {f.__name__: DispatchEntry("spotify", f.__name__, f, digest="0")
+               for f in (set_volume, skip_track, get_current_track)}
+
+    class Table:
+        def lookup(self, module_name, function_name):
+            return entries.get(function_name)
+
+    sent = []
+
+    class Telegram:
+        async def send_message(self, chat_id, text):
+            sent.append(text)
+
+    monkeypatch.setattr(main, "get_dispatch_table", lambda: Table())
+    plan = [
+        PlanStep("1", "spotify.set_volume", {"volume": 40}),
+        PlanStep("2", "spotify.skip_track", {}, after=["1"]),
+        PlanStep("3", "spotify.get_current_track", {}),
+    ]
+
+    async def run():
+        try:
+            await command_handler.run_plan_steps(1, plan, "volume 40, then next song, and what's playing", Telegram())
+        finally:
+            await main.executor.stop()
+
+    asyncio.run(run())
+    assert sent == ["❌ set_volume failed: device unavailable\n"
+                    "⏭️ skip_track skipped (step 1 failed)\n"
+                    "✅ get_current_track: Blue in Green"]
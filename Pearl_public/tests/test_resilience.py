@@ -0,0 +1,176 @@
+import asyncio
+
+import pytest
+
+from config.ollama_settings import GENERATION_PROFILES, MIN_TOKENS_PER_SECOND
+from core import ollama_client, resilience
+from core.generation_profiles import profile_min_timeout
+from core.llm_scheduler import LLMScheduler
+from core.resilience import CircuitOpenError, Dependency
+
+SETTINGS = {"failures": 2, "reset": 0.05, "timeout": 1.0, "min_timeout": 0.05, "max_timeout": 1.0,
+            "multiplier": 3.0}
+
+
+async def healthy():
+    await asyncio.sleep(0.01)
+    return "ok"
+
+
+async def hanging():
+    await asyncio.sleep(10)
+
+
+def test_timeout_adapts_to_observed_latencies():
+    service = Dependency("demo", SETTINGS)
+
+    async def main():
+        assert service.timeout() == 1.0
+        for _ in range(resilience.TIMEOUT_MIN_SAMPLES):
+            await service.call(healthy)
+
+    asyncio.run(main())
+    assert 0.05 <= service.timeout() < 0.2
+    assert service.timeout(floor=0.5) == 0.5
+
+
+def test_circuit_opens_fails_fast_and_closes_after_a_trial_call():
+    service = Dependency("demo", {**SETTINGS, "timeout": 0.02})
+
+    async def main():
+        for _ in range(2):
+            with pytest.raises(asyncio.TimeoutError):
+                await service.call(hanging)
+        assert service.state == "open"
+        with pytest.raises(CircuitOpenError):
+            await service.call(healthy)
+        await asyncio.sleep(0.06)
+        return await service.call(healthy)
+
+    assert asyncio.run(main()) == "ok"
+    report = service.report()
+    assert report["state"] == "closed"
+    assert report["timeouts"] == 2
+    assert report["rejected"] == 1
+
+
+def test_only_failure_types_count_against_the_dependency():
+    service = Dependency("demo", SETTINGS, failure_types=(ConnectionError,))
+
+    async def bad_request():
+        raise ValueError("bad arguments")
+
+    async def main():
+        for _ in range(3):
+            with pytest.raises(ValueError):
+                await service.call(bad_request)
+
+    asyncio.run(main())
+    assert service.state == "closed"
+    assert service.counters["failures"] == 0
+
+
+def test_caller_cancellation_is_not_a_failure_and_frees_the_trial_call():
+    service = Dependency("demo", SETTINGS)
+
+    async def main():
+        service.failed(ConnectionError("down"))
+        service.failed(ConnectionError("down"))
+        await asyncio.sleep(0.06)
+        # The caller's own deadline is shorter than the trial call
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(service.call(hanging), 0.01)
+        assert service.state == "half_open"
+        return await service.call(healthy)
+
+    assert asyncio.run(main()) == "ok"
+    assert service.counters["failures"] == 2
+    assert service.state == "closed"
+
+
+class SlowOllama:
+    def __init__(self, seconds):
+        self.seconds = seconds
+
+    async def generate(self, model, prompt, **kwargs):
+        await asyncio.sleep(self.seconds)
+        return {"response": "hi", "done": True}
+
+    async def embed(self, model, input, **kwargs):
+        return {"embeddings": [[0.0] for _ in input]}
+
+
+@pytest.fixture
+def ollama_api(monkeypatch):
+    api = Dependency("ollama", {**SETTINGS, "timeout": 0.01, "min_timeout": 0.01, "max_timeout": 0.01},
+                     ollama_client.ollama_api.failure_types)
+    monkeypatch.setattr(ollama_client, "ollama_api", api)
+    return api
+
+
+def test_profile_timeout_never_drops_below_its_num_predict(monkeypatch, ollama_api):
+    monkeypatch.setattr(ollama_client, "get_client", lambda host=None: SlowOllama(0.05))
+    monkeypatch.setattr(ollama_client, "profile_min_timeout", lambda profile: 0.2)
+
+    response = asyncio.run(ollama_client.generate("llama3.2", "hi", profile="chat"))
+    assert response["response"] == "hi"
+    assert ollama_api.counters["timeouts"] == 0
+
+
+def test_generation_cancelled_by_the_caller_is_not_counted(monkeypatch, ollama_api):
+    monkeypatch.setattr(ollama_client, "get_client", lambda host=None: SlowOllama(10))
+    monkeypatch.setattr(ollama_client, "profile_min_timeout", lambda profile: 5.0)
+
+    async def main():
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(ollama_client.generate("llama3.2", "hi", profile="chat"), 0.02)
+
+    asyncio.run(main())
+    assert ollama_api.counters["failures"] == 0
+    assert ollama_api.state == "closed"
+
+
+def open_circuit(api, reset):
+    api.reset = reset
+    for _ in range(api.threshold):
+        api.failed(ConnectionError("down"))
+    assert api.state == "open"
+
+
+def test_open_circuit_refuses_before_queueing_for_a_slot(monkeypatch, ollama_api):
+    scheduler = LLMScheduler(max_generations=1, reserved=0)
+    monkeypatch.setattr(ollama_client, "llm_scheduler", scheduler)
+    monkeypatch.setattr(ollama_client, "get_client", lambda host=None: SlowOllama(0.01))
+    open_circuit(ollama_api, reset=60)
+
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(ollama_client.generate("llama3.2", "hi"))
+    assert scheduler.waiting == [] and scheduler.total == 0
+
+
+def test_trial_call_waiting_for_a_slot_does_not_hold_the_circuit(monkeypatch, ollama_api):
+    scheduler = LLMScheduler(max_generations=1, reserved=0)
+    monkeypatch.setattr(ollama_client, "llm_scheduler", scheduler)
+    monkeypatch.setattr(ollama_client, "get_client", lambda host=None: SlowOllama(0.01))
+    monkeypatch.setattr(ollama_client, "profile_min_timeout", lambda profile: 1.0)
+    open_circuit(ollama_api, reset=0.01)
+
+    async def main():
+        await asyncio.sleep(0.02)  # Reset period over: the next call is the trial
+        async with scheduler.slot("llama3.2"):
+            queued = asyncio.create_task(ollama_client.generate("llama3.2", "hi", profile="chat"))
+            await asyncio.sleep(0.01)
+            # The queued generation has not taken the trial, so this call can
+            vectors = await ollama_client.embed("nomic-embed-text", ["hello"])
+        return vectors, await queued
+
+    vectors, response = asyncio.run(main())
+    assert vectors == [[0.0]]
+    assert response["response"] == "hi"
+    assert ollama_api.state == "closed"
+    assert ollama_api.counters["rejected"] == 0
+
+
+def test_min_timeout_follows_num_predict():
+    assert profile_min_timeout("chat") == GENERATION_PROFILES["chat"]["num_predict"] / MIN_TOKENS_PER_SECOND
+    assert profile_min_timeout("missing-profile") == 0.0
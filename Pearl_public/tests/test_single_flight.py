@@ -0,0 +1,107 @@
+import asyncio
+
+from core.single_flight import SingleFlight
+
+
+class Work:
+    """Counts calls and finishes only once released."""
+
+    def __init__(self, error=None):
+        self.calls = 0
+        self.cancelled = False
+        self.release = None
+        self.error = error
+
+    async def __call__(self, value):
+        self.calls += 1
+        try:
+            await self.release.wait()
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        if self.error:
+            raise self.error
+        return {"value": value}
+
+
+async def start(flights, work, key, count):
+    work.release = asyncio.Event()
+    callers = [asyncio.create_task(flights.do(key, work, count)) for _ in range(count)]
+    await asyncio.sleep(0)
+    return callers
+
+
+def test_concurrent_identical_calls_share_one_execution():
+    flights, work = SingleFlight(), Work()
+
+    async def main():
+        callers = await start(flights, work, "k", 3)
+        other = asyncio.create_task(flights.do("other", work, 0))
+        await asyncio.sleep(0)
+        assert flights.stats() == {"executed": 2, "joined": 2, "in_flight": 2}
+        work.release.set()
+        return await asyncio.gather(*callers), await other
+
+    results, other = asyncio.run(main())
+    assert work.calls == 2
+    assert results == [{"value": 3}] * 3 and results[0] is results[1]
+    assert other == {"value": 0}
+    assert flights.stats()["in_flight"] == 0
+
+
+def test_an_exception_reaches_every_waiter():
+    flights, work = SingleFlight(), Work(error=ConnectionError("ollama down"))
+
+    async def main():
+        callers = await start(flights, work, "k", 3)
+        work.release.set()
+        return await asyncio.gather(*callers, return_exceptions=True)
+
+    errors = asyncio.run(main())
+    assert work.calls == 1
+    assert all(isinstance(error, ConnectionError) for error in errors)
+    assert errors[0] is errors[1] is errors[2]
+    assert flights.stats()["in_flight"] == 0
+
+
+def test_cancelling_one_waiter_leaves_the_shared_call_running():
+    flights, work = SingleFlight(), Work()
+
+    async def main():
+        first, second = await start(flights, work, "k", 2)
+        first.cancel()
+        await asyncio.sleep(0)
+        assert first.cancelled() and not work.cancelled
+        work.release.set()
+        return await second
+
+    assert asyncio.run(main()) == {"value": 2}
+    assert (work.calls, work.cancelled) == (1, False)
+
+
+def test_the_call_is_cancelled_once_every_waiter_is():
+    flights, work = SingleFlight(), Work()
+
+    async def main():
+        callers = await start(flights, work, "k", 2)
+        for caller in callers:
+            caller.cancel()
+        await asyncio.gather(*callers, return_exceptions=True)
+        await asyncio.sleep(0)
+        return flights.stats()["in_flight"]
+
+    assert asyncio.run(main()) == 0
+    assert work.cancelled
+
+
+def test_a_new_call_after_completion_runs_again():
+    flights, work = SingleFlight(), Work()
+
+    async def main():
+        for _ in range(2):
+            callers = await start(flights, work, "k", 1)
+            work.release.set()
+            await asyncio.gather(*callers)
+
+    asyncio.run(main())
+    assert work.calls == 2
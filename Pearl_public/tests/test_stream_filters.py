@@ -0,0 +1,83 @@
+import pytest
+
+from core.stream_filters import ThinkFilter, StreamCleaner, clean_response
+
+ANSWER = "<think>\nThe user greets me. I should greet back.\n</think>\n\nHello! How can I help?"
+
+
+def run(chunks, think_budget=None):
+    f = ThinkFilter(think_budget)
+    return "".join(f.feed(chunk) for chunk in chunks) + f.flush()
+
+
+@pytest.mark.parametrize("cut", range(len(ANSWER) + 1))
+def test_every_two_chunk_split(cut):
+    assert run([ANSWER[:cut], ANSWER[cut:]]) == "Hello! How can I help?"
+
+
+def test_one_character_at_a_time():
+    assert run(list(ANSWER)) == "Hello! How can I help?"
+
+
+def test_tags_split_across_chunks():
+    assert run(["<th", "ink>reasoning</thi", "nk>", "answer"]) == "answer"
+    assert run(["before <", "think>x<", "/think", "> after"]) == "before  after"
+
+
+def test_visible_text_is_forwarded_immediately():
+    f = ThinkFilter()
+    assert f.feed("Sure, 3 < 4 and <") == "Sure, 3 < 4 and "
+    assert f.feed("b>bold</b>") == "<b>bold</b>"
+
+
+def test_partial_tag_at_end_of_stream_is_text():
+    f = ThinkFilter()
+    assert f.feed("a <th") == "a "
+    assert f.flush() == "<th"
+
+
+def test_unclosed_think_is_dropped():
+    assert run(["Answer first. <think>never", " closed"]) == "Answer first. "
+    assert run(["<think>only reasoning"]) == ""
+
+
+def test_repeated_blocks():
+    assert run(["A<think>x</think>B<think>y</", "think> C<think>z</think>"]) == "AB C"
+
+
+def test_nested_blocks():
+    assert run(["<think>outer <think>inner</think> still outer</think>done"]) == "done"
+    assert run(["<think>a<thi", "nk>b</think>c</thi", "nk>d"]) == "d"
+
+
+def test_think_budget_counts_chunks_inside_blocks():
+    f = ThinkFilter(think_budget=3)
+    for token in ["<think>", "one", " two", " three"]:
+        f.feed(token)
+    assert not f.over_budget
+    f.feed(" four")
+    assert f.over_budget
+
+
+def test_no_budget_never_over():
+    f = ThinkFilter()
+    for _ in range(10000):
+        f.feed("<think>x" if not f.in_think else "x")
+    assert not f.over_budget
+
+
+def test_stream_cleaner_matches_clean_response():
+    text = ANSWER + "\nNext Steps: ignore"
+    cleaner = StreamCleaner()
+    for char in text:
+        cleaner.feed(char)
+        assert "<" not in cleaner.visible()
+    assert cleaner.visible(final=True) == clean_response("Hello! How can I help?\nNext Steps: ignore")
+
+
+def test_stream_cleaner_holds_back_log_marker_prefix():
+    cleaner = StreamCleaner()
+    cleaner.feed("Done.\nProcess User")
+    assert cleaner.visible() == "Done."
+    cleaner.feed(" Input: debug")
+    assert cleaner.visible(final=True) == "Done."
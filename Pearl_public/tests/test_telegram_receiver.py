@@ -0,0 +1,125 @@
+import asyncio
+import json
+
+import pytest
+
+from core import telegram_receiver
+from core.resilience import Dependency
+from core.telegram_receiver import EDIT_MESSAGE_URL, SEND_MESSAGE_URL, TelegramClient
+
+
+class RecordingClient(TelegramClient):
+    """TelegramClient whose Bot API calls are recorded instead of sent."""
+
+    def __init__(self):
+        super().__init__("token")
+        self.calls = []
+
+    async def _post(self, url, payload):
+        self.calls.append((url, payload))
+        if url == SEND_MESSAGE_URL:
+            return 200, json.dumps({"ok": True, "result": {"message_id": 100 + len(self.calls)}})
+        return 200, json.dumps({"ok": True})
+
+
+async def snapshots(*texts):
+    for text in texts:
+        yield text
+
+
+def test_stream_message_sends_once_then_edits():
+    client = RecordingClient()
+    text = asyncio.run(client.stream_message(1, snapshots("Hel", "Hello", "Hello world"), min_edit_interval=60))
+    assert text == "Hello world"
+    assert [url for url, _ in client.calls] == [SEND_MESSAGE_URL, EDIT_MESSAGE_URL]
+    assert client.calls[-1][1] == {"chat_id": 1, "message_id": 101, "text": "Hello world"}
+
+
+def test_stream_message_edits_the_messages_of_an_earlier_attempt():
+    client = RecordingClient()
+    message_ids = []
+
+    async def interrupted():
+        yield "Partial ans"
+        raise ConnectionError("stream dropped")
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(client.stream_message(1, interrupted(), message_ids=message_ids))
+    assert message_ids == [101]
+
+    asyncio.run(client.stream_message(1, snapshots("Full", "Full answer"), min_edit_interval=60,
+                                      message_ids=message_ids))
+    # The retry never sends a second message
+    assert [url for url, _ in client.calls] == [SEND_MESSAGE_URL, EDIT_MESSAGE_URL, EDIT_MESSAGE_URL]
+    assert client.calls[-1][1]["text"] == "Full answer"
+    assert message_ids == [101]
+
+
+def test_stream_message_continues_long_text_in_a_new_message(monkeypatch):
+    monkeypatch.setattr(telegram_receiver, "MAX_MESSAGE_LENGTH", 5)
+    client = RecordingClient()
+    asyncio.run(client.stream_message(1, snapshots("abc", "abcdefgh"), min_edit_interval=0))
+    assert [payload["text"] for _, payload in client.calls] == ["abc", "abcde", "fgh"]
+
+
+class HangingPoll:
+    """session.get() for getUpdates that holds the request open until released."""
+
+    def __init__(self):
+        self.release = asyncio.Event()
+        self.started = asyncio.Event()
+        self.status = 200
+
+    def get(self, url, params=None, timeout=None):
+        return self
+
+    async def __aenter__(self):
+        self.started.set()
+        await self.release.wait()
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def json(self):
+        return {"ok": True, "result": [{"update_id": 1}]}
+
+
+@pytest.fixture
+def breakers(monkeypatch):
+    settings = {"failures": 1, "reset": 0, "timeout": 5, "min_timeout": 1, "max_timeout": 5, "multiplier": 2.0}
+    failure_types = (ConnectionError, asyncio.TimeoutError)
+    api = Dependency("telegram", settings, failure_types)
+    poll = Dependency("telegram_poll", settings, failure_types)
+    monkeypatch.setattr(telegram_receiver, "telegram_api", api)
+    monkeypatch.setattr(telegram_receiver, "telegram_poll", poll)
+    return api, poll
+
+
+class GuardedClient(RecordingClient):
+    """Records sends behind the Telegram circuit, like the real _post."""
+
+    async def _post(self, url, payload):
+        async with telegram_receiver.telegram_api.guard():
+            return await super()._post(url, payload)
+
+
+def test_long_poll_does_not_hold_the_send_circuit(breakers):
+    api, poll = breakers
+    client = GuardedClient()
+    client.session = HangingPoll()
+
+    async def main():
+        # Both circuits failed once and are due for a trial request
+        api.failed(ConnectionError("down"))
+        poll.failed(ConnectionError("down"))
+        polling = asyncio.create_task(client.get_updates(timeout=50))
+        await client.session.started.wait()
+        sent = await client.send_message(1, "reply while polling")
+        client.session.release.set()
+        return sent, await polling
+
+    sent, updates = asyncio.run(main())
+    assert sent is True
+    assert updates == [{"update_id": 1}]
+    assert api.state == poll.state == "closed"
@@ -0,0 +1,146 @@
+import json
+
+import pytest
+
+from core.modules_loader import FunctionSpec
+from core.tool_calls import (
+    ToolCallError,
+    argument_schema,
+    output_kind,
+    parse_tool_call,
+    partial_reply,
+    tool_call_schema,
+)
+
+
+def spec(name, signature, module="spotify"):
+    return FunctionSpec(module, name, signature, doc="", is_async=True)
+
+
+SPECS = {
+    "spotify.set_volume": spec("set_volume", "(volume: int)"),
+    "spotify.shuffle": spec("shuffle", "(enable: bool = True)"),
+    "spotify.play_song": spec("play_song", "(query: str)"),
+    "notification.handle_user_request": spec("handle_user_request", "(user_input, chat_id)", "notification"),
+    "internet_search.search_news": spec("search_news", "(query: str, limit: int = 5, ratio: float = 0.5)",
+                                        "internet_search"),
+}
+
+
+def test_argument_schema_types_required_and_context_parameters():
+    assert argument_schema(SPECS["internet_search.search_news"]) == {
+        "type": "object",
+        "properties": {"query": {"type": "string"}, "limit": {"type": "integer"}, "ratio": {"type": "number"}},
+        "required": ["query"],
+    }
+    # Filled by the binder from the message, never asked from the model
+    assert argument_schema(SPECS["notification.handle_user_request"])["properties"] == {}
+
+
+def test_tool_call_schema_offers_reply_each_function_and_a_plan():
+    options = tool_call_schema(SPECS)["anyOf"]
+    assert options[0]["required"] == ["reply"]
+    functions = [option["properties"]["function"]["const"] for option in options[1:-1]]
+    assert functions == list(SPECS)
+    assert options[-1]["required"] == ["plan"]
+
+
+def test_valid_call():
+    call = parse_tool_call('{"function": "spotify.set_volume", "arguments": {"volume": 40}}', SPECS)
+    assert (call.function, call.arguments, call.is_call, call.is_plan) == ("spotify.set_volume", {"volume": 40},
+                                                                           True, False)
+
+
+@pytest.mark.parametrize("key, arguments, expected", [
+    ("spotify.set_volume", {"volume": "40"}, {"volume": 40}),
+    ("spotify.set_volume", {"volume": 40.0}, {"volume": 40}),
+    ("spotify.shuffle", {"enable": "false"}, {"enable": False}),
+    ("internet_search.search_news", {"query": 42, "ratio": "0.25"}, {"query": "42", "ratio": 0.25}),
+    ("spotify.play_song", {"query": "So What", "volume": 3}, {"query": "So What"}),  # Unknown argument dropped
+])
+def test_coercible_arguments_are_converted(key, arguments, expected):
+    call = parse_tool_call(json.dumps({"function": key, "arguments": arguments}), SPECS)
+    assert call.arguments == expected
+
+
+@pytest.mark.parametrize("arguments", [{"volume": "loud"}, {"volume": True}, {"volume": 4.5}])
+def test_invalid_arguments_are_rejected(arguments):
+    with pytest.raises(ToolCallError, match="spotify.set_volume argument 'volume'"):
+        parse_tool_call(json.dumps({"function": "spotify.set_volume", "arguments": arguments}), SPECS)
+
+
+@pytest.mark.parametrize("raw, message", [
+    ('{"function": "spotify.rewind", "arguments": {}}', "unknown function 'spotify.rewind'"),
+    ('{"function": "spotify.set_volume", "arguments": [40]}', "arguments must be an object"),
+    ('{"function": "spotify.set_volume", "argu', "invalid JSON"),
+    ('["spotify.set_volume"]', "must be a JSON object"),
+    ('{"mood": "happy"}', "neither a function nor a text reply"),
+])
+def test_malformed_decisions_are_rejected(raw, message):
+    with pytest.raises(ToolCallError, match=message):
+        parse_tool_call(raw, SPECS)
+
+
+def test_text_reply():
+    call = parse_tool_call('{"reply": "Hello!"}', SPECS)
+    assert (call.reply, call.is_call) == ("Hello!", False)
+
+
+def plan(*steps):
+    return json.dumps({"plan": list(steps)})
+
+
+def step(step_id, function="spotify.play_song", after=(), **arguments):
+    return {"id": step_id, "function": function, "arguments": arguments or {"query": "x"}, "after": list(after)}
+
+
+def test_valid_plan_keeps_its_dependencies():
+    call = parse_tool_call(plan(step("a"), step("b", "spotify.set_volume", after=["a"], volume="30")), SPECS)
+    assert call.is_plan
+    assert [(s.id, s.function, s.arguments, s.after) for s in call.plan] == [
+        ("a", "spotify.play_song", {"query": "x"}, []),
+        ("b", "spotify.set_volume", {"volume": 30}, ["a"]),
+    ]
+
+
+def test_single_step_plan_is_a_plain_call():
+    call = parse_tool_call(plan(step("a")), SPECS)
+    assert (call.is_plan, call.function) == (False, "spotify.play_song")
+
+
+def test_plan_with_a_cycle_is_rejected():
+    with pytest.raises(ToolCallError, match="dependency cycle: a -> c -> b -> a"):
+        parse_tool_call(plan(step("a", after=["c"]), step("b", after=["a"]), step("c", after=["b"])), SPECS)
+
+
+def test_plan_with_a_missing_dependency_is_rejected():
+    with pytest.raises(ToolCallError, match=r"step 'b' depends on unknown steps \['z'\]"):
+        parse_tool_call(plan(step("a"), step("b", after=["z"])), SPECS)
+
+
+def test_plan_with_duplicate_ids_or_unknown_functions_is_rejected():
+    with pytest.raises(ToolCallError, match="duplicate plan step id 'a'"):
+        parse_tool_call(plan(step("a"), step("a")), SPECS)
+    with pytest.raises(ToolCallError, match="unknown function"):
+        parse_tool_call(plan(step("a"), step("b", "spotify.rewind")), SPECS)
+
+
+def test_output_kind_from_the_start_of_a_stream():
+    assert output_kind('{"reply": "Hel') == "reply"
+    assert output_kind(' { "function"') == "call"
+    assert output_kind('{"plan": [') == "call"
+    assert output_kind('{"') is None
+
+
+@pytest.mark.parametrize("raw, expected", [
+    ('{"reply": "Hello, wor', "Hello, wor"),
+    ('{"reply": "Line one\\nLine', "Line one\nLine"),
+    ('{"reply": "Say \\"hi', 'Say "hi'),
+    ('{"reply": "Caf\\u00e9 and t', "Café and t"),
+    ('{"reply": "Caf\\u00', "Caf"),   # Unicode escape cut in the middle
+    ('{"reply": "Tab\\', "Tab"),       # Backslash cut before its escape character
+    ('{"reply": "Done."}', "Done."),
+    ('{"function": "spotify.set_volume"', ""),
+])
+def test_partial_reply_on_truncated_json(raw, expected):
+    assert partial_reply(raw) == expected
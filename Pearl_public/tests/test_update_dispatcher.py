@@ -0,0 +1,119 @@
+import asyncio
+
+from core.update_dispatcher import UpdateDispatcher, update_chat_id
+
+
+def message(update_id, chat_id, text="hi"):
+    return {"update_id": update_id, "message": {"chat": {"id": chat_id}, "text": text}}
+
+
+def test_update_chat_id():
+    assert update_chat_id(message(1, 42)) == 42
+    assert update_chat_id({"update_id": 2, "callback_query": {"message": {"chat": {"id": 7}}}}) == 7
+    assert update_chat_id({"update_id": 3}) is None
+
+
+def test_chats_run_concurrently_and_in_order_within_a_chat():
+    handled = []
+
+    async def handler(update):
+        await asyncio.sleep(0.05 if update["message"]["text"] == "slow" else 0.01)
+        handled.append(update["update_id"])
+
+    async def main():
+        dispatcher = UpdateDispatcher(handler, max_concurrency=4, high_water=10)
+        for update in (message(1, 1, "slow"), message(2, 1), message(3, 2)):
+            await dispatcher.submit(update)
+        await dispatcher.join()
+
+    asyncio.run(main())
+    assert handled == [3, 1, 2]
+
+
+def test_updates_stay_unhandled_until_their_handler_finished():
+    idle_calls = []
+
+    async def main():
+        gate = asyncio.Event()
+
+        async def handler(update):
+            if update["update_id"] == 1:
+                await gate.wait()
+
+        dispatcher = UpdateDispatcher(handler, on_idle=lambda: idle_calls.append(dispatcher.checkpoint()))
+        await dispatcher.submit(message(1, 1))
+        await dispatcher.submit(message(2, 2))
+        await asyncio.sleep(0.01)
+        # Update 2 is done, update 1 still running: only 1 must survive a restart
+        during = dispatcher.checkpoint()
+        gate.set()
+        await dispatcher.join()
+        return during, dispatcher.checkpoint()
+
+    during, after = asyncio.run(main())
+    assert during == (3, [message(1, 1)])
+    assert after == (3, [])
+    assert idle_calls == [(3, [])]
+
+
+def test_failed_handler_counts_as_handled():
+    async def handler(update):
+        raise RuntimeError("boom")
+
+    async def main():
+        dispatcher = UpdateDispatcher(handler)
+        await dispatcher.submit(message(5, 1))
+        await dispatcher.join()
+        return dispatcher.checkpoint()
+
+    assert asyncio.run(main()) == (6, [])
+
+
+def test_stopped_updates_remain_unhandled_and_can_be_restored():
+    handled = []
+
+    async def slow(update):
+        await asyncio.sleep(10)
+
+    async def fast(update):
+        handled.append(update["update_id"])
+
+    async def main():
+        dispatcher = UpdateDispatcher(slow)
+        await dispatcher.submit(message(7, 1))
+        await dispatcher.submit(message(8, 1))
+        await asyncio.sleep(0.01)
+        await dispatcher.stop()
+        offset, unhandled = dispatcher.checkpoint()
+
+        restarted = UpdateDispatcher(fast)
+        await restarted.restore(offset, unhandled)
+        await restarted.join()
+        return offset, unhandled, restarted.checkpoint()
+
+    offset, unhandled, after = asyncio.run(main())
+    assert offset == 9
+    assert [u["update_id"] for u in unhandled] == [7, 8]
+    assert handled == [7, 8]
+    assert after == (9, [])
+
+
+def test_submit_waits_above_the_high_water_mark():
+    async def main():
+        gate = asyncio.Event()
+
+        async def handler(update):
+            await gate.wait()
+
+        dispatcher = UpdateDispatcher(handler, high_water=2)
+        await dispatcher.submit(message(1, 1))
+        await dispatcher.submit(message(2, 2))
+        blocked = asyncio.create_task(dispatcher.submit(message(3, 3)))
+        await asyncio.sleep(0.01)
+        waited = not blocked.done()
+        gate.set()
+        await blocked
+        await dispatcher.join()
+        return waited
+
+    assert asyncio.run(main())